@@ -1,12 +1,46 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-import pandas as pd
+import asyncio
+import hmac
+import json
 
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from api import settings
+from api.batching import BatcherStopped, MicroBatcher
+from api.decoding import (
+    ARROW_FILE_CONTENT_TYPE,
+    ARROW_STREAM_CONTENT_TYPE,
+    NPY_CONTENT_TYPE,
+    PayloadError,
+    decode_arrow,
+    decode_columnar_json,
+    decode_npy,
+    parse_json
+)
+from api.executors import create_executor
+from api.monitoring import API_BATCH_ROWS, RequestMetrics, handler_timer, render_metrics
+from api.streaming import (
+    NDJSON_CONTENT_TYPE,
+    DuplexStreamingResponse,
+    StreamLineError,
+    iter_ndjson_chunks,
+    score_ndjson_lines
+)
 from src.inference import (
     predict_single_transaction,
-    predict_batch,
-    load_inference_assets
+    predict_records,
+    predict_matrix,
+    load_inference_assets,
+    build_bundle,
+    activate_bundle,
+    draining_versions,
+    read_feature_order,
+    cache_stats
 )
+from src import metrics
+from src.model_registry import list_versions, resolve_version
 
 app = FastAPI(
     title="Credit Fraud Detection API",
@@ -14,10 +48,125 @@ app = FastAPI(
     description="API para previsão de fraudes em transações bancárias"
 )
 
+# Micro-batcher do /predict (criado no startup quando FRAUD_MICROBATCH=1)
+batcher = None
+
+# Pools dedicados: um para /predict, outro para /predict-batch
+predict_executor = None
+batch_executor = None
+
+# Ordem das colunas para decodificar corpos binários/colunares
+feature_order = None
+
+# Versão do modelo em uso e histórico de ativações (para o rollback)
+model_version = None
+version_history = []
+load_kwargs = {}
+_reload_lock = asyncio.Lock()
+
+
+class ModelVersionHeader:
+    """
+    Middleware ASGI puro: acrescenta X-Model-Version em todas as respostas,
+    sem envolver o corpo (não interfere no streaming full-duplex).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_with_version(message):
+            if message["type"] == "http.response.start" and model_version is not None:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-model-version", model_version.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_version)
+
+
+app.add_middleware(ModelVersionHeader)
+app.add_middleware(RequestMetrics)
+
+# Cronômetros das etapas dentro dos handlers
+_predict_timer = handler_timer("/predict")
+_batch_timer = handler_timer("/predict-batch")
+_stream_timer = handler_timer("/predict-stream")
+
+
 # Executado automaticamente ao iniciar a API
 @app.on_event("startup")
-def startup_event():
-    load_inference_assets()
+async def startup_event():
+    global batcher, predict_executor, batch_executor, feature_order
+    global model_version, version_history, load_kwargs
+
+    # FRAUD_METRICS=0 desliga os timers por etapa e a latência HTTP
+    metrics.configure(settings.METRICS_ENABLED)
+
+    # FRAUD_MODEL_VERSION fixa uma versão do registro; sem ela, a mais nova
+    paths = resolve_version(settings.MODEL_VERSION)
+    model_version = paths["version"]
+    version_history = [model_version]
+    feature_order = read_feature_order(paths["feature_order_path"])
+
+    # FRAUD_FUSED_SCALER=1 dobra o scaler dentro do modelo (opt-in)
+    # FRAUD_COMPILED_MODEL=1 usa o ensemble compilado em NumPy (opt-in)
+    # FRAUD_SHARED_MODEL=1 mapeia o modelo em arrays compartilhados entre workers
+    # FRAUD_CACHE_SIZE>0 liga o cache de previsões (um por processo)
+    load_kwargs = {
+        "fused": settings.FUSED_SCALER,
+        "compiled": settings.COMPILED_MODEL,
+        "shared": settings.SHARED_MODEL,
+        "cache_size": settings.CACHE_SIZE,
+        "cache_ttl": settings.CACHE_TTL_S,
+        "version": model_version
+    }
+
+    # No modo "process" o modelo vive nos workers; no modo "thread", aqui
+    if settings.EXECUTOR_KIND == "thread":
+        load_inference_assets(**load_kwargs)
+
+    predict_executor = create_executor(
+        settings.EXECUTOR_KIND, settings.PREDICT_WORKERS, load_kwargs, name="predict"
+    )
+    batch_executor = create_executor(
+        settings.EXECUTOR_KIND, settings.BATCH_WORKERS, load_kwargs, name="predict-batch"
+    )
+
+    if settings.MICROBATCH_ENABLED:
+        batcher = MicroBatcher(
+            predict_records,
+            max_batch_size=settings.MICROBATCH_MAX_SIZE,
+            max_wait_ms=settings.MICROBATCH_MAX_WAIT_MS,
+            executor=predict_executor,
+            # Um lote por worker do pool: com FRAUD_PREDICT_WORKERS > 1 os lotes não fazem fila
+            max_in_flight=settings.PREDICT_WORKERS
+        )
+        await batcher.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    global batcher, predict_executor, batch_executor
+
+    if batcher is not None:
+        await batcher.stop()
+        batcher = None
+
+    for executor in (predict_executor, batch_executor):
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+    predict_executor = batch_executor = None
+
+
+async def run_scoring(executor, fn, *args):
+    """
+    Envia a pontuação (CPU-bound) para o pool dedicado sem bloquear o event loop.
+    """
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
 
 
 # Entrada Pydantic - Todas as features do modelo
@@ -62,10 +211,18 @@ def home():
 
 # Previsão individual
 @app.post("/predict", tags=["Predictions"])
-def predict(transaction: TransactionInput):
+async def predict(transaction: TransactionInput):
 
+    timer = _predict_timer.start()
     data = transaction.dict()
-    resultado = predict_single_transaction(data)
+    if batcher is not None:
+        try:
+            resultado = await batcher.submit(data)
+        except BatcherStopped as e:
+            raise HTTPException(status_code=503, detail=str(e))
+    else:
+        resultado = await run_scoring(predict_executor, predict_single_transaction, data)
+    timer.mark("score")
 
     return {
         "fraud_probability": resultado["fraud_probability"],
@@ -74,13 +231,245 @@ def predict(transaction: TransactionInput):
 
 
 # Previsão em lote
-@app.post("/predict-batch", tags=["Predictions"])
-def predict_batch_api(transactions: list[TransactionInput]):
+_transactions_adapter = TypeAdapter(list[TransactionInput])
+
+_binary_body = {"schema": {"type": "string", "format": "binary"}}
+BATCH_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {
+                    "oneOf": [
+                        {"type": "array", "items": TransactionInput.model_json_schema()},
+                        {
+                            "type": "object",
+                            "description": "Formato colunar: uma lista de valores por feature",
+                            "additionalProperties": {"type": "array", "items": {"type": "number"}}
+                        }
+                    ]
+                }
+            },
+            NPY_CONTENT_TYPE: _binary_body,
+            ARROW_STREAM_CONTENT_TYPE: _binary_body,
+            ARROW_FILE_CONTENT_TYPE: _binary_body
+        }
+    }
+}
+
+
+@app.post("/predict-batch", tags=["Predictions"], openapi_extra=BATCH_REQUEST_BODY)
+async def predict_batch_api(request: Request):
+
+    content_type = request.headers.get("content-type", "application/json")
+    content_type = content_type.split(";")[0].strip().lower()
+    timer = _batch_timer.start()
+    body = await request.body()
+    timer.mark("read_body")
+
+    try:
+        if content_type == NPY_CONTENT_TYPE:
+            X = decode_npy(body, len(feature_order))
+        elif content_type in (ARROW_STREAM_CONTENT_TYPE, ARROW_FILE_CONTENT_TYPE):
+            X = decode_arrow(body, feature_order, file_format=content_type == ARROW_FILE_CONTENT_TYPE)
+        elif content_type == "application/json":
+            payload = parse_json(body)
+            if not isinstance(payload, dict):
+                timer.mark("decode")
+                return await predict_rows(payload, timer)
+            X = decode_columnar_json(payload, feature_order)
+        else:
+            raise HTTPException(status_code=415, detail=f"Content-Type não suportado: {content_type}")
+    except PayloadError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    timer.mark("decode")
+    if metrics.ENABLED:
+        API_BATCH_ROWS.labels("/predict-batch").observe(len(X))
+
+    resultados = await run_scoring(batch_executor, predict_matrix, X)
+    timer.mark("score")
+
+    return {"results": resultados}
+
+
+async def predict_rows(payload, timer=metrics.NULL_TIMER):
+    """
+    Formato original: lista de transações, validada linha a linha pelo pydantic.
+    """
+    try:
+        transactions = _transactions_adapter.validate_python(payload)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    timer.mark("validate")
 
     if len(transactions) == 0:
         return {"error": "Lista vazia recebida. Envie pelo menos 1 transação."}
 
-    df = pd.DataFrame([t.dict() for t in transactions])
-    resultados = predict_batch(df)
+    records = [t.dict() for t in transactions]
+    if metrics.ENABLED:
+        API_BATCH_ROWS.labels("/predict-batch").observe(len(records))
+    resultados = await run_scoring(batch_executor, predict_records, records)
+    timer.mark("score")
 
     return {"results": resultados}
+
+
+# Previsão em streaming (NDJSON): uma transação por linha, resultados por bloco
+@app.post("/predict-stream", tags=["Predictions"], openapi_extra={
+    "requestBody": {"required": True, "content": {NDJSON_CONTENT_TYPE: {"schema": {"type": "string"}}}}
+})
+async def predict_stream_api(request: Request, chunk_size: int = settings.STREAM_CHUNK_SIZE):
+
+    if not 1 <= chunk_size <= settings.STREAM_MAX_CHUNK_SIZE:
+        raise HTTPException(
+            status_code=422,
+            detail=f"chunk_size deve estar entre 1 e {settings.STREAM_MAX_CHUNK_SIZE}"
+        )
+
+    async def results():
+        try:
+            async for lines in iter_ndjson_chunks(request.stream(), chunk_size, settings.STREAM_MAX_LINE_BYTES):
+                timer = _stream_timer.start()
+                chunk = await run_scoring(batch_executor, score_ndjson_lines, lines)
+                timer.mark("score_chunk")
+                yield chunk
+        except StreamLineError as e:
+            # O status 200 já foi enviado: o erro (linha inválida ou longa demais) vira a última linha
+            yield (json.dumps({"error": str(e), "line": e.line_number}) + "\n").encode()
+
+    return DuplexStreamingResponse(results(), media_type=NDJSON_CONTENT_TYPE)
+
+
+# Métricas do micro-batching (tamanho dos lotes e atraso na fila)
+@app.get("/metrics/batching", tags=["Monitoring"])
+def batching_metrics():
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.metrics.snapshot()}
+
+
+# Métricas do cache de previsões (hits, misses, evictions)
+@app.get("/metrics/cache", tags=["Monitoring"])
+def prediction_cache_metrics():
+    if settings.EXECUTOR_KIND == "process":
+        # Cada worker tem o próprio cache; os contadores ficam nos processos
+        return {"enabled": settings.CACHE_SIZE > 0, "scope": "per-process"}
+
+    stats = cache_stats()
+    if stats is None:
+        return {"enabled": False}
+    return {"enabled": True, **stats}
+
+
+# ---------- Administração: troca de versão sem reiniciar ----------
+def check_admin_token(request: Request):
+    # Sem token configurado os endpoints /admin ficam desligados (falha fechada)
+    if settings.ADMIN_TOKEN is None:
+        raise HTTPException(status_code=403, detail="Endpoints /admin desabilitados: defina FRAUD_ADMIN_TOKEN")
+    if not hmac.compare_digest(request.headers.get("x-admin-token", ""), settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Token de administração inválido")
+
+
+async def swap_model_version(version):
+    """
+    Monta e aquece a versão pedida em segundo plano e troca de uma vez só.
+     - "thread": novo bundle em memória; chamadas em andamento terminam com o antigo
+     - "process": novos pools já aquecidos; os antigos drenam e são encerrados
+    """
+    global predict_executor, batch_executor, feature_order, model_version, load_kwargs
+
+    try:
+        paths = resolve_version(version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    new_kwargs = {**load_kwargs, "version": paths["version"]}
+    loop = asyncio.get_running_loop()
+
+    if settings.EXECUTOR_KIND == "thread":
+        bundle = await loop.run_in_executor(
+            None, build_bundle, paths["version"], new_kwargs["fused"], new_kwargs["compiled"], new_kwargs["shared"]
+        )
+        activate_bundle(bundle, cache_size=new_kwargs["cache_size"], cache_ttl=new_kwargs["cache_ttl"])
+    else:
+        new_predict = await loop.run_in_executor(
+            None, create_executor, "process", settings.PREDICT_WORKERS, new_kwargs, "predict"
+        )
+        new_batch = await loop.run_in_executor(
+            None, create_executor, "process", settings.BATCH_WORKERS, new_kwargs, "predict-batch"
+        )
+        old_executors = (predict_executor, batch_executor)
+        predict_executor, batch_executor = new_predict, new_batch
+        if batcher is not None:
+            batcher.executor = predict_executor
+
+        # Tarefas já enviadas aos pools antigos terminam antes do encerramento
+        for executor in old_executors:
+            loop.run_in_executor(None, executor.shutdown, True)
+
+    feature_order = read_feature_order(paths["feature_order_path"])
+    load_kwargs = new_kwargs
+    previous, model_version = model_version, paths["version"]
+    print(f"🔁 Versão do modelo trocada: {previous} → {model_version}")
+    return previous
+
+
+@app.get("/admin/model", tags=["Admin"])
+def model_status(request: Request):
+    check_admin_token(request)
+    return {
+        "active_version": model_version,
+        "history": version_history,
+        "available_versions": list_versions(),
+        "draining_versions": draining_versions() if settings.EXECUTOR_KIND == "thread" else []
+    }
+
+
+@app.post("/admin/reload", tags=["Admin"])
+async def reload_model(request: Request, version: str = None):
+    """
+    Carrega a versão pedida (padrão: a mais nova do registro) e ativa.
+    """
+    check_admin_token(request)
+
+    async with _reload_lock:
+        previous = await swap_model_version(version)
+        if version_history[-1] != model_version:
+            version_history.append(model_version)
+
+    return {"active_version": model_version, "previous_version": previous}
+
+
+@app.post("/admin/rollback", tags=["Admin"])
+async def rollback_model(request: Request):
+    """
+    Volta para a versão ativada antes da atual.
+    """
+    check_admin_token(request)
+
+    async with _reload_lock:
+        if len(version_history) < 2:
+            raise HTTPException(status_code=409, detail="Não há versão anterior para rollback")
+
+        previous = await swap_model_version(version_history[-2])
+        version_history.pop()
+
+    return {"active_version": model_version, "previous_version": previous}
+
+
+# Métricas no formato Prometheus (latência por etapa, HTTP, lotes, cache)
+@app.get("/metrics", tags=["Monitoring"], response_class=PlainTextResponse)
+def prometheus_metrics():
+    snapshot = batcher.metrics.snapshot() if batcher is not None else None
+    return PlainTextResponse(
+        render_metrics(snapshot, cache_stats()),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+# Resumo legível (p50/p95/p99 em ms) das mesmas métricas
+@app.get("/metrics/latency", tags=["Monitoring"])
+def latency_metrics():
+    return {"enabled": metrics.ENABLED, **metrics.latency_summary()}
@@ -0,0 +1,221 @@
+"""
+Micro-batching dinâmico para o /predict.
+
+Requisições individuais concorrentes entram numa fila; um loop em background
+junta até `max_batch_size` transações ou espera no máximo `max_wait_ms` desde
+a primeira da fila, pontua tudo numa única chamada e devolve cada resultado
+para a sua requisição. Até `max_in_flight` lotes são pontuados ao mesmo
+tempo (um por worker do executor).
+
+Uso:
+    batcher = MicroBatcher(predict_records, max_batch_size=64, max_wait_ms=2, executor=pool, max_in_flight=4)
+    await batcher.start()
+    resultado = await batcher.submit(transacao)
+"""
+
+import asyncio
+import time
+from bisect import bisect_left
+
+# Limites superiores dos buckets de atraso na fila (ms)
+DELAY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+
+class BatchingMetrics:
+    """
+    Distribuição dos tamanhos de lote e do atraso na fila.
+    """
+
+    def __init__(self, max_batch_size: int):
+        self.size_buckets = []
+        bound = 1
+        while bound < max_batch_size:
+            self.size_buckets.append(bound)
+            bound *= 2
+        self.size_buckets.append(max_batch_size)
+
+        self.size_counts = [0] * len(self.size_buckets)
+        self.delay_counts = [0] * (len(DELAY_BUCKETS_MS) + 1)
+        self.batches = 0
+        self.requests = 0
+        self.delay_sum_ms = 0.0
+        self.delay_max_ms = 0.0
+        self.scoring_sum_ms = 0.0
+
+    def observe_batch(self, size: int, delays_ms, scoring_ms: float):
+        self.batches += 1
+        self.requests += size
+        self.size_counts[bisect_left(self.size_buckets, size)] += 1
+        self.scoring_sum_ms += scoring_ms
+        for delay in delays_ms:
+            self.delay_counts[bisect_left(DELAY_BUCKETS_MS, delay)] += 1
+            self.delay_sum_ms += delay
+            if delay > self.delay_max_ms:
+                self.delay_max_ms = delay
+
+    def snapshot(self) -> dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "batch_size_histogram": {
+                f"<={bound}": count for bound, count in zip(self.size_buckets, self.size_counts)
+            },
+            "queue_delay_ms": {
+                "mean": self.delay_sum_ms / self.requests if self.requests else 0.0,
+                "max": self.delay_max_ms,
+                "histogram": {
+                    **{f"<={bound}": count for bound, count in zip(DELAY_BUCKETS_MS, self.delay_counts)},
+                    f">{DELAY_BUCKETS_MS[-1]}": self.delay_counts[-1],
+                },
+            },
+            "mean_scoring_ms": self.scoring_sum_ms / self.batches if self.batches else 0.0,
+        }
+
+
+class BatcherStopped(RuntimeError):
+    """
+    O micro-batcher foi parado com a requisição ainda na fila.
+    """
+
+
+class MicroBatcher:
+    """
+    - score_fn: recebe list[dict] e devolve a lista de resultados na mesma ordem
+    - executor: onde score_fn roda (None = executor padrão do event loop)
+    - max_in_flight: lotes pontuados ao mesmo tempo (o tamanho do executor);
+      enquanto todos estão ocupados, a fila cresce e o próximo lote sai maior
+    """
+
+    def __init__(self, score_fn, max_batch_size: int = 64, max_wait_ms: float = 2.0, executor=None,
+                 max_in_flight: int = 1):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size deve ser >= 1")
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight deve ser >= 1")
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+        self.max_in_flight = max_in_flight
+        self.metrics = BatchingMetrics(max_batch_size)
+        self._queue = None
+        self._worker = None
+        self._slots = None
+        self._in_flight = set()
+        self._collecting = []
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Para o loop, espera os lotes já despachados e falha (BatcherStopped)
+        as requisições que ainda estavam na fila: nenhuma fica pendurada.
+        """
+        if self._worker is None:
+            return
+        worker, self._worker = self._worker, None
+        worker.cancel()
+        try:
+            await worker
+        except asyncio.CancelledError:
+            pass
+
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+        pending, self._collecting = self._collecting, []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future, _ in pending:
+            if not future.done():
+                future.set_exception(BatcherStopped("Micro-batcher encerrado antes de pontuar a requisição"))
+
+    async def submit(self, data: dict) -> dict:
+        if self._worker is None:
+            raise BatcherStopped("Micro-batcher parado")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((data, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        """
+        Espera a primeira transação e junta as seguintes até encher o lote
+        ou estourar o max_wait.
+        """
+        loop = asyncio.get_running_loop()
+        # Lote em montagem fica visível para o stop(), que falha os itens se o loop for cancelado
+        batch = self._collecting = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Primeiro o que já está na fila, sem custo de timer
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            remaining = deadline - loop.time()
+            if len(batch) >= self.max_batch_size or remaining <= 0:
+                break
+            # Sem wait_for: antes do Python 3.12 ele pode descartar um item já
+            # retirado da fila quando o timeout dispara no mesmo instante
+            getter = asyncio.ensure_future(self._queue.get())
+            try:
+                done, _ = await asyncio.wait({getter}, timeout=remaining)
+            except asyncio.CancelledError:
+                getter.cancel()
+                raise
+            if done:
+                batch.append(getter.result())
+                continue
+            getter.cancel()
+            try:
+                # O get pode ter terminado junto com o timeout: o item fica no lote
+                batch.append(await getter)
+            except asyncio.CancelledError:
+                pass
+            break
+
+        self._collecting = []
+        return batch
+
+    async def _run(self):
+        while True:
+            # Só monta o próximo lote quando há executor livre para ele
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.create_task(self._score_batch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _score_batch(self, batch):
+        try:
+            # Requisições canceladas (cliente desconectou) não são pontuadas
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                return
+
+            dispatched = time.perf_counter()
+            delays_ms = [(dispatched - enqueued) * 1000 for _, _, enqueued in batch]
+
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self.score_fn, [data for data, _, _ in batch]
+                )
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            self.metrics.observe_batch(len(batch), delays_ms, (time.perf_counter() - dispatched) * 1000)
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
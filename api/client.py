@@ -1,33 +1,268 @@
+import asyncio
+import http.client
+import io
+import json
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Status que valem nova tentativa (sobrecarga ou gateway)
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+def _split_chunks(items: list, chunk_size: int) -> list:
+    return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+
+def _merge_batch_responses(responses: list) -> dict:
+    results = []
+    for response in responses:
+        results.extend(response['results'])
+    return {'results': results}
+
 
 class FraudClient:
-    def __init__(self, base_url: str):
+    """
+    Client síncrono com pool de conexões (keep-alive), timeouts e retry com
+    backoff. Lotes maiores que batch_chunk_size são divididos e enviados em
+    paralelo; os resultados voltam na ordem da entrada.
+    """
+
+    def __init__(self, base_url: str,
+                 pool_size: int = 10,
+                 timeout: tuple = (3.05, 30),
+                 max_retries: int = 3,
+                 backoff_factor: float = 0.2,
+                 batch_chunk_size: int = 1000,
+                 max_concurrency: int = 4):
         self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.batch_chunk_size = batch_chunk_size
+        self.max_concurrency = max_concurrency
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            # A previsão é idempotente, então POST também pode ser repetido
+            allowed_methods=frozenset({'GET', 'POST'}),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _post(self, path: str, **kwargs):
+        response = self.session.post(f'{self.base_url}{path}', timeout=self.timeout, **kwargs)
+
+        if response.status_code != 200:
+            raise Exception(f'Erro na API: {response.text}')
+
+        return response.json()
 
     # Testar se a API esta online
     def healthcheck(self):
         try:
-            r = requests.get(f'{self.base_url}')
+            r = self.session.get(f'{self.base_url}', timeout=self.timeout)
             return r.json()
         except Exception as e:
             return {'error': str(e)}
-        
+
     # Previsao individual
     def predict_single(self, transaction: dict):
-        url = f'{self.base_url}/predict'
-        response = requests.post(url, json=transaction)
+        return self._post('/predict', json=transaction)
+
+    # Previsao em pacote (dividida em blocos enviados em paralelo)
+    def predict_batch(self, transaction: list[dict], chunk_size: int = None):
+        chunk_size = chunk_size or self.batch_chunk_size
+
+        if len(transaction) <= chunk_size:
+            return self._post('/predict-batch', json=transaction)
+
+        chunks = _split_chunks(transaction, chunk_size)
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(chunks))) as executor:
+            responses = list(executor.map(lambda chunk: self._post('/predict-batch', json=chunk), chunks))
+
+        return _merge_batch_responses(responses)
+
+    # Previsao em pacote com corpo binario (.npy) ou colunar (JSON)
+    def predict_batch_array(self, X, feature_order: list[str] = None, fmt: str = 'npy'):
+        X = np.asarray(X)
+        if X.dtype not in (np.float32, np.float64):
+            X = X.astype(np.float64)
+
+        if fmt == 'npy':
+            buffer = io.BytesIO()
+            np.save(buffer, np.ascontiguousarray(X))
+            return self._post('/predict-batch', data=buffer.getvalue(),
+                              headers={'Content-Type': 'application/x-npy'})
+        elif fmt == 'columnar':
+            if feature_order is None:
+                raise ValueError('feature_order é obrigatório no formato colunar')
+            columns = {name: X[:, i].tolist() for i, name in enumerate(feature_order)}
+            return self._post('/predict-batch', json=columns)
+        else:
+            raise ValueError(f'Formato inválido: {fmt}')
+
+    # Previsao em streaming (NDJSON): envia e recebe ao mesmo tempo
+    def predict_stream(self, transactions, chunk_size: int = 5000, lines_per_write: int = 1000):
+        """
+        Gerador: envia as transações (qualquer iterável de dicts) em upload
+        chunked numa thread e devolve cada resultado assim que o bloco dele é
+        pontuado. Upload e download acontecem em paralelo na mesma conexão,
+        então a memória fica limitada dos dois lados. Usa uma conexão própria
+        (fora do pool), pois a requests não envia e lê ao mesmo tempo.
+        """
+        url = urlsplit(self.base_url)
+        connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        # Mesmo limite de leitura das outras chamadas: servidor travado não prende o gerador nem o upload
+        read_timeout = self.timeout[1] if isinstance(self.timeout, tuple) else self.timeout
+        conn = connection_class(url.hostname, url.port, timeout=read_timeout)
+
+        conn.putrequest('POST', f'{url.path}/predict-stream?chunk_size={chunk_size}')
+        conn.putheader('Content-Type', 'application/x-ndjson')
+        conn.putheader('Transfer-Encoding', 'chunked')
+        conn.endheaders()
+
+        upload_errors = []
+
+        def send(lines):
+            data = ''.join(lines).encode()
+            conn.send(f'{len(data):X}\r\n'.encode() + data + b'\r\n')
+
+        def upload():
+            try:
+                lines = []
+                for transaction in transactions:
+                    lines.append(json.dumps(transaction) + '\n')
+                    if len(lines) == lines_per_write:
+                        send(lines)
+                        lines = []
+                if lines:
+                    send(lines)
+                conn.send(b'0\r\n\r\n')
+            except Exception as e:
+                upload_errors.append(e)
+
+        sender = threading.Thread(target=upload, daemon=True)
+        sender.start()
+
+        try:
+            response = conn.getresponse()
+            if response.status != 200:
+                raise Exception(f'Erro na API: {response.read().decode()}')
+
+            for line in response:
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                if 'error' in result:
+                    raise Exception(f'Erro na API: {result["error"]}')
+                yield result
+
+            sender.join()
+            if upload_errors:
+                raise upload_errors[0]
+        finally:
+            conn.close()
+
+
+class AsyncFraudClient:
+    """
+    Variante asyncio do FraudClient (httpx): pool de conexões, timeouts,
+    retry com backoff exponencial e lotes divididos em blocos enviados
+    concorrentemente, com os resultados remontados na ordem da entrada.
+    """
+
+    def __init__(self, base_url: str,
+                 pool_size: int = 10,
+                 timeout: float = 30.0,
+                 max_retries: int = 3,
+                 backoff_factor: float = 0.2,
+                 batch_chunk_size: int = 1000,
+                 max_concurrency: int = 4):
+        # httpx só é necessário para o client assíncrono
+        import httpx
+
+        self._httpx = httpx
+        self.base_url = base_url.rstrip('/')
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.batch_chunk_size = batch_chunk_size
+        self.max_concurrency = max_concurrency
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def _request(self, method: str, path: str, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.client.request(method, path, **kwargs)
+            except self._httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    break
+            # Backoff exponencial com jitter
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt) * (0.5 + random.random() / 2))
 
         if response.status_code != 200:
             raise Exception(f'Erro na API: {response.text}')
-        
+
         return response.json()
-    
-    # Previsao em pacote 
-    def predict_batch(self, transaction: list[dict]):
-        url = f'{self.base_url}/predict-batch'
-        response = requests.post(url, json=transaction)
 
-        if response.status_code != 200:
-            raise Exception(f'Erro na API: {response.text}')
-        
-        return response.json()
\ No newline at end of file
+    # Testar se a API esta online
+    async def healthcheck(self):
+        try:
+            return await self._request('GET', '/')
+        except Exception as e:
+            return {'error': str(e)}
+
+    # Previsao individual
+    async def predict_single(self, transaction: dict):
+        return await self._request('POST', '/predict', json=transaction)
+
+    # Previsao em pacote (blocos enviados concorrentemente)
+    async def predict_batch(self, transaction: list[dict], chunk_size: int = None):
+        chunk_size = chunk_size or self.batch_chunk_size
+
+        if len(transaction) <= chunk_size:
+            return await self._request('POST', '/predict-batch', json=transaction)
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def send(chunk):
+            async with semaphore:
+                return await self._request('POST', '/predict-batch', json=chunk)
+
+        responses = await asyncio.gather(*(send(chunk) for chunk in _split_chunks(transaction, chunk_size)))
+        return _merge_batch_responses(responses)
@@ -0,0 +1,145 @@
+"""
+Decodificação dos corpos binários/colunares do /predict-batch.
+
+Formatos aceitos (escolhidos pelo Content-Type):
+ - application/x-npy: buffer .npy float32/float64 com formato (n, n_features)
+ - application/vnd.apache.arrow.stream / .file: Apache Arrow IPC
+ - application/json com objeto {feature: [valores]} (uma lista por feature)
+
+Todos viram a matriz (n x n_features) na ordem de feature_order.json, com
+validação vetorizada de formato, dtype e NaN/inf no lugar do pydantic por linha.
+"""
+
+import io
+import json
+
+import numpy as np
+
+NPY_CONTENT_TYPE = "application/x-npy"
+ARROW_STREAM_CONTENT_TYPE = "application/vnd.apache.arrow.stream"
+ARROW_FILE_CONTENT_TYPE = "application/vnd.apache.arrow.file"
+
+ALLOWED_DTYPES = (np.dtype(np.float32), np.dtype(np.float64))
+
+
+class PayloadError(ValueError):
+    """
+    Corpo da requisição inválido (vira HTTP 422 na API).
+    """
+
+
+def validate_matrix(X: np.ndarray, n_features: int) -> np.ndarray:
+    """
+    Checa formato, dtype e valores finitos da matriz inteira de uma vez.
+    """
+    if X.ndim != 2 or X.shape[1] != n_features:
+        raise PayloadError(f"Esperado formato (n, {n_features}), recebido {X.shape}")
+    if X.shape[0] == 0:
+        raise PayloadError("Lote vazio recebido. Envie pelo menos 1 transação.")
+    if X.dtype not in ALLOWED_DTYPES:
+        raise PayloadError(f"dtype {X.dtype} não suportado; use float32 ou float64")
+
+    finite = np.isfinite(X)
+    if not finite.all():
+        bad = np.argwhere(~finite)[:5].tolist()
+        raise PayloadError(f"Valores NaN/inf nas posições (linha, coluna): {bad}")
+    return X
+
+
+def decode_npy(body: bytes, n_features: int) -> np.ndarray:
+    """
+    Lê o cabeçalho .npy e cria a matriz sobre o próprio buffer (zero-copy).
+    """
+    buffer = io.BytesIO(body)
+    try:
+        version = np.lib.format.read_magic(buffer)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(buffer)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(buffer)
+    except ValueError as e:
+        raise PayloadError(f"Corpo .npy inválido: {e}") from e
+
+    if dtype not in ALLOWED_DTYPES:
+        raise PayloadError(f"dtype {dtype} não suportado; use float32 ou float64")
+
+    count = int(np.prod(shape))
+    if len(body) - buffer.tell() != count * dtype.itemsize:
+        raise PayloadError("Tamanho do corpo .npy não bate com o cabeçalho")
+
+    X = np.frombuffer(body, dtype=dtype, count=count, offset=buffer.tell())
+    X = X.reshape(shape, order="F" if fortran_order else "C")
+    return validate_matrix(X, n_features)
+
+
+def decode_arrow(body: bytes, feature_order: list, file_format: bool = False) -> np.ndarray:
+    """
+    Lê uma tabela Arrow IPC (stream ou file) direto do buffer do corpo e
+    copia as colunas, uma vez, para a matriz na ordem das features.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise PayloadError("Suporte a Arrow requer o pacote pyarrow instalado") from e
+
+    try:
+        source = pa.py_buffer(body)
+        reader = pa.ipc.open_file(source) if file_format else pa.ipc.open_stream(source)
+        table = reader.read_all()
+    except pa.ArrowInvalid as e:
+        raise PayloadError(f"Corpo Arrow inválido: {e}") from e
+
+    missing = [name for name in feature_order if name not in table.column_names]
+    if missing:
+        raise PayloadError(f"Colunas ausentes: {missing}")
+
+    columns = []
+    for name in feature_order:
+        column = table.column(name)
+        if column.null_count:
+            raise PayloadError(f"Coluna {name} contém valores nulos")
+        if not pa.types.is_floating(column.type) and not pa.types.is_integer(column.type):
+            raise PayloadError(f"Coluna {name} deve ser numérica, recebido {column.type}")
+        columns.append(column.to_numpy())
+
+    return validate_matrix(_stack_columns(columns), len(feature_order))
+
+
+def decode_columnar_json(payload: dict, feature_order: list) -> np.ndarray:
+    """
+    Objeto JSON com uma lista de valores por feature.
+    """
+    missing = [name for name in feature_order if name not in payload]
+    if missing:
+        raise PayloadError(f"Colunas ausentes: {missing}")
+
+    try:
+        columns = [np.asarray(payload[name], dtype=np.float64) for name in feature_order]
+    except (TypeError, ValueError) as e:
+        raise PayloadError(f"Valores não numéricos no JSON colunar: {e}") from e
+
+    if any(column.ndim != 1 for column in columns):
+        raise PayloadError("Cada feature deve ser uma lista de números")
+    return validate_matrix(_stack_columns(columns), len(feature_order))
+
+
+def _stack_columns(columns):
+    # Cópia única das colunas para a matriz (n x n_features) em ordem C
+    lengths = {len(column) for column in columns}
+    if len(lengths) > 1:
+        raise PayloadError(f"Colunas com tamanhos diferentes: {sorted(lengths)}")
+
+    dtype = np.result_type(*columns) if columns else np.float64
+    if dtype not in ALLOWED_DTYPES:
+        dtype = np.float64
+    X = np.empty((lengths.pop() if lengths else 0, len(columns)), dtype=dtype)
+    for i, column in enumerate(columns):
+        X[:, i] = column
+    return X
+
+
+def parse_json(body: bytes):
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise PayloadError(f"JSON inválido: {e}") from e
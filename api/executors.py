@@ -0,0 +1,109 @@
+"""
+Executores dedicados para a pontuação (CPU-bound) da API.
+
+Cada tipo de tráfego ganha o seu pool, para que um /predict-batch grande não
+segure as chamadas individuais do /predict:
+ - "thread": ThreadPoolExecutor (xgboost/lightgbm liberam o GIL na predição)
+ - "process": ProcessPoolExecutor com o modelo pré-carregado em cada worker;
+   as medições de src.metrics feitas no worker (etapas da inferência) voltam
+   com o resultado de cada chamada e entram no registro do processo pai
+
+Uso:
+    executor = create_executor("process", max_workers=4, load_kwargs={"fused": True})
+    resultado = await loop.run_in_executor(executor, predict_single_transaction, data)
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor, ThreadPoolExecutor
+
+from src import metrics
+
+EXECUTOR_KINDS = ("thread", "process")
+
+
+def _init_worker(load_kwargs, metrics_enabled=True):
+    """
+    Initializer dos processos: carrega modelo, scaler e colunas uma vez.
+    """
+    from src.inference import load_inference_assets
+
+    metrics.configure(metrics_enabled)
+    load_inference_assets(**load_kwargs)
+
+
+def _call_with_metrics(fn, *args, **kwargs):
+    """
+    Roda fn no worker e devolve o resultado junto com o que ela mediu.
+    """
+    try:
+        return fn(*args, **kwargs), metrics.drain()
+    except BaseException:
+        metrics.drain()
+        raise
+
+
+class MeteredProcessPoolExecutor(ProcessPoolExecutor):
+    """
+    ProcessPoolExecutor que traz de volta as métricas de cada chamada: o
+    worker devolve (resultado, medições) e o pai registra as medições antes
+    de entregar o resultado. Sem isso os histogramas das etapas ficariam
+    presos nos processos e o /metrics mostraria séries sempre vazias.
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        inner = super().submit(_call_with_metrics, fn, *args, **kwargs)
+        outer = Future()
+
+        def settle(done):
+            if done.cancelled():
+                outer.cancel()
+                return
+            try:
+                error = done.exception()
+                if error is None:
+                    result, samples = done.result()
+                    metrics.merge(samples)
+                    outer.set_result(result)
+                else:
+                    outer.set_exception(error)
+            except InvalidStateError:
+                # outer já foi cancelado por quem esperava
+                pass
+
+        def propagate_cancel(done):
+            if done.cancelled():
+                inner.cancel()
+
+        outer.add_done_callback(propagate_cancel)
+        inner.add_done_callback(settle)
+        return outer
+
+
+def _warmup():
+    return os.getpid()
+
+
+def create_executor(kind: str, max_workers: int, load_kwargs: dict = None, name: str = "inference"):
+    """
+    Cria o pool do tipo pedido. No modo "process" os workers sobem já com o
+    modelo carregado (load_inference_assets(**load_kwargs)).
+    """
+    if kind not in EXECUTOR_KINDS:
+        raise ValueError(f"Executor inválido: {kind}. Use um de {EXECUTOR_KINDS}")
+    if max_workers < 1:
+        raise ValueError("max_workers deve ser >= 1")
+
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    executor = MeteredProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(load_kwargs or {}, metrics.ENABLED)
+    )
+    # Sobe todos os workers agora, e não na primeira requisição
+    for future in [executor.submit(_warmup) for _ in range(max_workers)]:
+        future.result()
+    return executor
@@ -0,0 +1,119 @@
+"""
+Instrumentação HTTP da API e exposição das métricas no formato Prometheus.
+
+ - RequestMetrics: middleware ASGI puro que mede cada requisição do início
+   até o último byte da resposta (inclusive streams), por método, rota e status
+ - API_STAGE_SECONDS: etapas dentro dos handlers (leitura do corpo,
+   decodificação, validação, pontuação no pool)
+ - render_metrics: texto do GET /metrics, juntando src.metrics com os
+   contadores do micro-batching e do cache de previsões
+"""
+
+import time
+
+from src import metrics
+
+HTTP_SECONDS = metrics.histogram(
+    "fraud_http_request_duration_seconds", "Latência das requisições HTTP", ("method", "path", "status")
+)
+HTTP_REQUESTS = metrics.counter(
+    "fraud_http_requests_total", "Requisições HTTP atendidas", ("method", "path", "status")
+)
+API_STAGE_SECONDS = metrics.histogram(
+    "fraud_api_stage_seconds", "Tempo de cada etapa dos handlers da API", ("endpoint", "stage")
+)
+API_BATCH_ROWS = metrics.histogram(
+    "fraud_api_batch_rows", "Transações por requisição de lote", ("endpoint",), buckets=metrics.ROW_BUCKETS
+)
+
+
+class RequestMetrics:
+    """
+    Middleware ASGI puro (não envolve o corpo, então não interfere no
+    streaming full-duplex). A rota vem do endpoint resolvido pelo roteador,
+    para não criar uma série por URL.
+    """
+
+    def __init__(self, app, route_paths=None):
+        self.app = app
+        self.route_paths = route_paths
+
+    def _route_path(self, scope):
+        endpoint = scope.get("endpoint")
+        if self.route_paths is None:
+            # Rotas só existem depois que o app foi montado
+            router = scope.get("app")
+            routes = getattr(router, "routes", []) if router is not None else []
+            self.route_paths = {route.endpoint: route.path for route in routes if hasattr(route, "endpoint")}
+        return self.route_paths.get(endpoint, "other")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metrics.ENABLED:
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_and_measure(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            labels = (scope["method"], self._route_path(scope), str(status))
+            HTTP_SECONDS.labels(*labels).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(*labels).inc()
+
+
+def handler_timer(endpoint: str):
+    return metrics.StageTimer(API_STAGE_SECONDS, endpoint)
+
+
+def _batching_lines(snapshot):
+    lines = [
+        "# HELP fraud_microbatch_batches_total Lotes pontuados pelo micro-batching",
+        "# TYPE fraud_microbatch_batches_total counter",
+        f"fraud_microbatch_batches_total {snapshot['batches']}",
+        "# HELP fraud_microbatch_requests_total Requisições atendidas pelo micro-batching",
+        "# TYPE fraud_microbatch_requests_total counter",
+        f"fraud_microbatch_requests_total {snapshot['requests']}",
+        "# HELP fraud_microbatch_size Tamanho dos lotes do micro-batching",
+        "# TYPE fraud_microbatch_size histogram",
+    ]
+    cumulative = 0
+    for bucket, count in snapshot["batch_size_histogram"].items():
+        cumulative += count
+        lines.append(f'fraud_microbatch_size_bucket{{le="{bucket[2:]}"}} {cumulative}')
+    lines.append(f'fraud_microbatch_size_bucket{{le="+Inf"}} {cumulative}')
+    lines.append(f"fraud_microbatch_size_sum {snapshot['requests']}")
+    lines.append(f"fraud_microbatch_size_count {snapshot['batches']}")
+    return lines
+
+
+def _cache_lines(stats):
+    lines = []
+    for name in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        lines += [
+            f"# HELP fraud_prediction_cache_{name}_total Cache de previsões: {name}",
+            f"# TYPE fraud_prediction_cache_{name}_total counter",
+            f"fraud_prediction_cache_{name}_total {stats[name]}",
+        ]
+    lines += [
+        "# HELP fraud_prediction_cache_size Entradas no cache de previsões",
+        "# TYPE fraud_prediction_cache_size gauge",
+        f"fraud_prediction_cache_size {stats['size']}",
+    ]
+    return lines
+
+
+def render_metrics(batching_snapshot=None, cache_stats=None) -> str:
+    extra = []
+    if batching_snapshot is not None:
+        extra += _batching_lines(batching_snapshot)
+    if cache_stats is not None:
+        extra += _cache_lines(cache_stats)
+    text = metrics.render_prometheus()
+    return text + ("\n".join(extra) + "\n" if extra else "")
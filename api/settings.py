@@ -0,0 +1,50 @@
+"""
+Configuração da API via variáveis de ambiente (lidas no import).
+"""
+
+import os
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+# Carregamento do modelo
+MODEL_VERSION = os.getenv("FRAUD_MODEL_VERSION") or None   # None = mais nova do registro
+ADMIN_TOKEN = os.getenv("FRAUD_ADMIN_TOKEN") or None       # exigido nos endpoints /admin (sem ele, /admin responde 403)
+FUSED_SCALER = _env_flag("FRAUD_FUSED_SCALER")
+COMPILED_MODEL = _env_flag("FRAUD_COMPILED_MODEL")
+SHARED_MODEL = _env_flag("FRAUD_SHARED_MODEL")        # arrays mapeados, compartilhados entre workers
+
+# Cache LRU/TTL de previsões (0 = desligado)
+CACHE_SIZE = _env_int("FRAUD_CACHE_SIZE", 0)
+CACHE_TTL_S = _env_float("FRAUD_CACHE_TTL_S", 60.0)
+
+# Métricas por etapa e latência HTTP (GET /metrics)
+METRICS_ENABLED = _env_flag("FRAUD_METRICS", True)
+
+# Micro-batching do /predict
+MICROBATCH_ENABLED = _env_flag("FRAUD_MICROBATCH")
+MICROBATCH_MAX_SIZE = _env_int("FRAUD_MICROBATCH_MAX_SIZE", 64)
+MICROBATCH_MAX_WAIT_MS = _env_float("FRAUD_MICROBATCH_MAX_WAIT_MS", 2.0)
+
+# Executores da pontuação: "thread" ou "process", um pool por tipo de tráfego
+EXECUTOR_KIND = os.getenv("FRAUD_EXECUTOR", "thread")
+PREDICT_WORKERS = _env_int("FRAUD_PREDICT_WORKERS", 4)
+BATCH_WORKERS = _env_int("FRAUD_BATCH_WORKERS", 2)
+
+# Streaming NDJSON (/predict-stream): linhas pontuadas por bloco
+STREAM_CHUNK_SIZE = _env_int("FRAUD_STREAM_CHUNK_SIZE", 5000)
+STREAM_MAX_CHUNK_SIZE = _env_int("FRAUD_STREAM_MAX_CHUNK_SIZE", 100000)
+STREAM_MAX_LINE_BYTES = _env_int("FRAUD_STREAM_MAX_LINE_BYTES", 65536)   # linha maior encerra o stream com erro
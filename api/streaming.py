@@ -0,0 +1,133 @@
+"""
+Pontuação em streaming (NDJSON) para lotes muito grandes.
+
+O corpo é lido aos poucos, as linhas são agrupadas em blocos de tamanho fixo
+e cada bloco é pontuado por predict_pipeline e devolvido assim que termina,
+então a memória fica limitada a um bloco, qualquer que seja o tamanho da entrada.
+"""
+
+import json
+
+import numpy as np
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+from src.inference import active_bundle, predict_matrix
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+# Uma transação tem ~1 KB em JSON; linhas maiores são rejeitadas
+MAX_LINE_BYTES = 64 * 1024
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse cujo gerador lê o próprio corpo da requisição.
+
+    O StreamingResponse padrão escuta desconexões chamando receive() em
+    paralelo, o que consome os pedaços do corpo antes do gerador. Aqui só o
+    gerador chama receive(); uma desconexão aparece como erro no send().
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+
+        if self.background is not None:
+            await self.background()
+
+
+class StreamLineError(ValueError):
+    """
+    Linha inválida no stream (args simples para atravessar o ProcessPool).
+    """
+
+    def __init__(self, line_number: int, message: str):
+        super().__init__(line_number, message)
+        self.line_number = line_number
+        self.message = message
+
+    def __str__(self):
+        return f"Linha {self.line_number}: {self.message}"
+
+
+def score_ndjson_lines(lines: list) -> bytes:
+    """
+    Recebe as linhas de um bloco como (número da linha, bytes) e devolve os
+    resultados em NDJSON. Roda no executor de lote (thread ou processo).
+    """
+    bundle = active_bundle()
+    X = np.empty((len(lines), len(bundle.feature_order)), dtype=np.float64)
+    for row, (line_number, line) in enumerate(lines):
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise StreamLineError(line_number, f"JSON inválido ({e})") from e
+        if not isinstance(record, dict):
+            raise StreamLineError(line_number, "cada linha deve ser um objeto JSON")
+        X[row] = _line_values(line_number, record, bundle)
+
+    results = predict_matrix(X)
+    return "".join(json.dumps(result) + "\n" for result in results).encode()
+
+
+def _line_values(line_number: int, record: dict, bundle) -> np.ndarray:
+    """
+    Valores de uma linha na ordem de feature_order, com as mesmas regras do
+    /predict-batch binário (validate_matrix): só números finitos.
+    """
+    try:
+        values = np.array(bundle.feature_getter(record), dtype=np.float64).reshape(len(bundle.feature_order))
+    except KeyError as e:
+        raise StreamLineError(line_number, f"feature ausente: {e}") from e
+    except (TypeError, ValueError) as e:
+        raise StreamLineError(line_number, f"valor não numérico ({e})") from e
+
+    finite = np.isfinite(values)
+    if not finite.all():
+        bad = [name for name, ok in zip(bundle.feature_order, finite) if not ok]
+        raise StreamLineError(line_number, f"valores nulos ou NaN/inf em {bad}")
+    return values
+
+
+async def iter_ndjson_chunks(byte_stream, chunk_size: int, max_line_bytes: int = MAX_LINE_BYTES):
+    """
+    Agrupa as linhas não vazias de um stream de bytes em blocos de até
+    chunk_size linhas, cada uma como (número da linha, bytes).
+
+    Só o pedaço novo é dividido (o resto pendente nunca é reprocessado) e
+    uma linha maior que max_line_bytes vira StreamLineError, então um
+    cliente sem quebras de linha não faz a memória crescer sem limite.
+    """
+    pending = []
+    pending_size = 0
+    lines = []
+    line_number = 0
+
+    async for piece in byte_stream:
+        *complete, rest = piece.split(b"\n")
+        if complete:
+            # A primeira linha completa termina o que estava pendente
+            complete[0] = b"".join(pending) + complete[0]
+            pending, pending_size = [], 0
+        for line in complete:
+            line_number += 1
+            if len(line) > max_line_bytes:
+                raise StreamLineError(line_number, f"linha maior que {max_line_bytes} bytes")
+            if line.strip():
+                lines.append((line_number, line))
+            if len(lines) == chunk_size:
+                yield lines
+                lines = []
+        if rest:
+            pending.append(rest)
+            pending_size += len(rest)
+            if pending_size > max_line_bytes:
+                raise StreamLineError(line_number + 1, f"linha maior que {max_line_bytes} bytes")
+
+    last = b"".join(pending)
+    if last.strip():
+        lines.append((line_number + 1, last))
+    if lines:
+        yield lines
@@ -0,0 +1,146 @@
+"""
+Modos de balanceamento do treino lado a lado: tempo e pico de memória do
+balanceamento, linhas de treino resultantes, tempo do tuning e métricas de
+teste de cada modelo.
+
+Modos comparados (src.preprocessing.BALANCING_MODES):
+ - smote: SMOTE do imblearn até a paridade (o pipeline original)
+ - smote_parallel: mesma interpolação em blocos, com --n-jobs threads
+ - smote_ratio: SMOTE parcial (--ratio; ex.: 0.1 = minoritária em 10% da majoritária)
+ - weights: sem linhas sintéticas; o tuning usa class_weight/scale_pos_weight
+
+Os dados são os do pré-processamento (divisão estratificada e StandardScaler);
+sem --input, um conjunto sintético com ~0,17% de fraudes, como o original.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_balancing --rows 284807 --n-jobs 4
+    python -m benchmarks.bench_balancing --input data/raw/creditcard.csv --models LightGBM XGBoost
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from src import tuning
+from src.preprocessing import TARGET, balance_training_data, load_data, scale_features, train_test_split_custom
+
+MODELS = {
+    "LogisticRegression": tuning.tune_logistic_regression,
+    "RandomForest": tuning.tune_random_forest,
+    "GradientBoosting": tuning.tune_gradient_boosting,
+    "XGBoost": tuning.tune_XGboost,
+    "LightGBM": tuning.tune_LightGBM,
+}
+
+
+def synthetic_transactions(n_rows, fraud_rate=0.0017, seed=42):
+    """
+    DataFrame no formato do creditcard.csv (Time, V1..V28, Amount, Class),
+    com as fraudes deslocadas em algumas features.
+    """
+    rng = np.random.default_rng(seed)
+    y = (rng.random(n_rows) < fraud_rate).astype(int)
+    V = rng.normal(size=(n_rows, 28))
+    V[y == 1, :6] += rng.normal(2.0, 1.0, size=(int(y.sum()), 6))
+    df = pd.DataFrame(V, columns=[f"V{i}" for i in range(1, 29)])
+    df.insert(0, "Time", rng.uniform(0, 172800, n_rows))
+    df["Amount"] = rng.exponential(90, n_rows)
+    df[TARGET] = y
+    return df
+
+
+def balancing_cases(ratio, n_jobs):
+    return {
+        "smote": dict(balancing="smote"),
+        f"smote_parallel (n_jobs={n_jobs})": dict(balancing="smote_parallel", n_jobs=n_jobs),
+        f"smote_ratio ({ratio:g})": dict(balancing="smote", sampling_ratio=ratio),
+        "weights": dict(balancing="weights"),
+    }
+
+
+def run_case(case, data, models):
+    X_train, y_train, X_test, y_test = data
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        X_bal, y_bal = balance_training_data(X_train, y_train, **case)
+        balance_s = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    class_weight = "balanced" if case["balancing"] == "weights" else None
+    result = {
+        "balance_s": balance_s,
+        "balance_peak_mb": peak / 1024 ** 2,
+        "train_rows": int(len(y_bal)),
+        "train_mb": X_bal.nbytes / 1024 ** 2,
+        "models": {},
+    }
+    for name in models:
+        start = time.perf_counter()
+        # Silencia o "Fitting ..." da busca
+        with contextlib.redirect_stdout(io.StringIO()):
+            tuned = MODELS[name](X_bal, y_bal, X_test, y_test, class_weight=class_weight)
+        metrics = tuned["final_metrics"]
+        result["models"][name] = {
+            "tune_s": time.perf_counter() - start,
+            "roc_auc": float(metrics["roc_auc"]),
+            "recall": float(metrics["recall"]),
+            "precision": float(metrics["precision"]),
+        }
+    return result
+
+
+def print_report(results, models):
+    print(f"\n{'modo':28} {'balanceamento':>13} {'pico':>9} {'linhas treino':>14} {'matriz':>9}")
+    for label, r in results.items():
+        print(f"{label:28} {r['balance_s']:12.2f}s {r['balance_peak_mb']:7.0f}MB {r['train_rows']:14d} "
+              f"{r['train_mb']:7.0f}MB")
+
+    for name in models:
+        print(f"\n{name}")
+        print(f"{'modo':28} {'tuning':>9} {'ROC-AUC':>8} {'recall':>8} {'precision':>10}")
+        for label, r in results.items():
+            m = r["models"][name]
+            print(f"{label:28} {m['tune_s']:8.1f}s {m['roc_auc']:8.4f} {m['recall']:8.4f} {m['precision']:10.4f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Modos de balanceamento lado a lado")
+    parser.add_argument("--input", help="CSV bruto (padrão: dados sintéticos)")
+    parser.add_argument("--rows", type=int, default=284_807, help="Linhas dos dados sintéticos")
+    parser.add_argument("--ratio", type=float, default=0.1, help="Razão do SMOTE parcial")
+    parser.add_argument("--n-jobs", type=int, default=4, help="Threads do smote_parallel")
+    parser.add_argument("--models", nargs="+", choices=list(MODELS), default=["LogisticRegression", "LightGBM"])
+    parser.add_argument("--output", help="Grava os resultados em JSON")
+    args = parser.parse_args(argv)
+
+    df = load_data(args.input) if args.input else synthetic_transactions(args.rows)
+    X, y = df.drop(TARGET, axis=1), df[TARGET]
+    X_train, X_test, y_train, y_test = train_test_split_custom(X, y)
+    X_train, X_test, _ = scale_features(X_train, X_test)
+    data = (X_train, np.asarray(y_train), X_test, np.asarray(y_test))
+    print(f"⚖️ Treino: {len(y_train)} linhas ({int(np.sum(y_train))} fraudes); teste: {len(y_test)}")
+
+    results = {}
+    for label, case in balancing_cases(args.ratio, args.n_jobs).items():
+        print(f"   ▶ {label}")
+        results[label] = run_case(case, data, args.models)
+
+    print_report(results, args.models)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Resultados gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark do avaliador compilado (src.compiled_trees) contra o predict_proba
+das bibliotecas, para cada ensemble de árvores tunado em models/.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_compiled --sizes 1 10 100 1000 10000
+"""
+
+import argparse
+import time
+
+import joblib
+import numpy as np
+
+from src.compiled_trees import compile_model
+
+TREE_MODELS = {
+    "Random Forest (Tuned)": "models/random_forest_tuned.pkl",
+    "Gradient Boosting (Tuned)": "models/gradient_boosting_tuned.pkl",
+    "XGBoost (Tuned)": "models/xgboost_tuned.pkl",
+    "LightGBM (Tuned)": "models/lightgbm_tuned.pkl",
+}
+
+
+def best_time(fn, X, repeat):
+    """
+    Menor tempo (s) entre `repeat` execuções de fn(X).
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do ensemble compilado")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+
+    for name, path in TREE_MODELS.items():
+        try:
+            model = joblib.load(path)
+        except Exception as e:
+            print(f"\n⚠️ {name}: não foi possível carregar {path} ({e})")
+            continue
+
+        compiled = compile_model(model)
+        print(f"\n🌲 {name} — {compiled.n_trees} árvores, profundidade {compiled.max_depth}")
+        print(f"{'linhas':>8} {'biblioteca':>14} {'compilado':>14} {'speedup':>9}")
+
+        for size in args.sizes:
+            X = rng.normal(size=(size, compiled.n_features_in_))
+            lib = best_time(model.predict_proba, X, args.repeat)
+            fast = best_time(compiled.predict_proba, X, args.repeat)
+            print(f"{size:>8} {lib * 1e3:>12.3f}ms {fast * 1e3:>12.3f}ms {lib / fast:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
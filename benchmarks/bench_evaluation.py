@@ -0,0 +1,73 @@
+"""
+Benchmark da avaliação em uma passada (src.evaluation) contra o caminho
+antigo (predict + predict_proba + roc_auc_score, recall_score,
+precision_score e confusion_matrix), para cada modelo tunado em models/.
+
+X de teste sintético com o tamanho do teste original (56.962 linhas) e
+~0,17% de fraudes; as métricas dos dois caminhos têm de coincidir.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_evaluation --rows 56962 --repeat 5
+"""
+
+import argparse
+import time
+
+import joblib
+import numpy as np
+from sklearn.metrics import confusion_matrix, precision_score, recall_score, roc_auc_score
+
+from src.evaluation import evaluate
+from src.modeling import MODEL_PATHS
+
+
+def sklearn_metrics(model, X, y):
+    y_pred = model.predict(X)
+    y_proba = model.predict_proba(X)[:, 1]
+    return {
+        "roc_auc": roc_auc_score(y, y_proba),
+        "recall": recall_score(y, y_pred, zero_division=0),
+        "precision": precision_score(y, y_pred, zero_division=0),
+        "confusion_matrix": confusion_matrix(y, y_pred),
+    }
+
+
+def best_time(fn, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Avaliação em uma passada vs. sklearn")
+    parser.add_argument("--rows", type=int, default=56_962)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(args.rows, 30))
+    y = (rng.random(args.rows) < 0.0017).astype(int)
+    X[y == 1, :6] += 2
+
+    print(f"{'modelo':30} {'sklearn':>9} {'uma passada':>12} {'ganho':>7} {'mesmas métricas':>16}")
+    for name, path in MODEL_PATHS.items():
+        try:
+            model = joblib.load(path)
+        except Exception as e:  # pickles de outra versão do sklearn
+            print(f"{name:30} ⚠ não carregou: {e}")
+            continue
+        baseline, expected = best_time(lambda: sklearn_metrics(model, X, y), args.repeat)
+        single, result = best_time(lambda: evaluate(model, X, y), args.repeat)
+
+        same = (np.isclose(expected["roc_auc"], result["roc_auc"])
+                and expected["recall"] == result["recall"] and expected["precision"] == result["precision"]
+                and (expected["confusion_matrix"] == result["confusion_matrix"]).all())
+        print(f"{name:30} {baseline * 1e3:7.1f}ms {single * 1e3:10.1f}ms {baseline / single:6.2f}x "
+              f"{'✔' if same else '❌':>16}")
+
+
+if __name__ == "__main__":
+    main()
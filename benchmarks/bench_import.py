@@ -0,0 +1,97 @@
+"""
+Benchmark do cold start (tempo de import) da API.
+
+Roda `python -X importtime -c "import api.app"` em processos novos, lê o tempo
+acumulado do módulo e falha (código de saída 1) se a mediana passar do
+orçamento. Também confere que as bibliotecas pesadas de treino/relatórios
+não entram no grafo de import do serving.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_import --runs 5 --budget-ms 1000
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+
+import numpy as np
+
+# Só devem ser importadas ao carregar o modelo (ou nunca, no serving)
+HEAVY_MODULES = (
+    "pandas", "sklearn", "scipy", "joblib", "matplotlib", "seaborn",
+    "xgboost", "lightgbm", "pyarrow", "imblearn", "reportlab", "openpyxl",
+)
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def import_profile(module: str = "api.app"):
+    """
+    Importa o módulo num processo novo. Retorna (ms acumulados do módulo,
+    {módulo: ms acumulados} de todos os imports).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True
+    )
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2)) / 1000
+    return cumulative[module], cumulative
+
+
+def loaded_heavy_modules(module: str = "api.app"):
+    """
+    Bibliotecas pesadas presentes em sys.modules logo após o import.
+    """
+    code = (
+        f"import sys, {module}; "
+        f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do tempo de import da API")
+    parser.add_argument("--module", default="api.app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    parser.add_argument("--top", type=int, default=10, help="Imports mais lentos a listar")
+    args = parser.parse_args()
+
+    totals = []
+    profile = {}
+    for _ in range(args.runs):
+        total, profile = import_profile(args.module)
+        totals.append(total)
+
+    p50 = float(np.median(totals))
+    print(f"\n⏱️ import {args.module}: p50={p50:.0f}ms  min={min(totals):.0f}ms  "
+          f"max={max(totals):.0f}ms ({args.runs} processos)")
+
+    print(f"\n🐢 {args.top} imports mais caros (acumulado, última execução):")
+    ranked = sorted(((ms, name) for name, ms in profile.items() if name != args.module), reverse=True)
+    for ms, name in ranked[:args.top]:
+        print(f"   {ms:8.1f}ms  {name}")
+
+    heavy = loaded_heavy_modules(args.module)
+    failed = False
+    if heavy:
+        print(f"\n❌ Bibliotecas pesadas no import: {heavy}")
+        failed = True
+    if p50 > args.budget_ms:
+        print(f"\n❌ Cold start acima do orçamento: {p50:.0f}ms > {args.budget_ms:.0f}ms")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print(f"\n✔ Dentro do orçamento de {args.budget_ms:.0f}ms, sem bibliotecas pesadas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark do caminho de 1 transação.
+
+Compara o pipeline com DataFrame (predict_batch) com o caminho rápido
+(predict_single_transaction) usando o modelo carregado de models/.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_inference --repeat 2000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src import inference
+from tests.test_inference import TRANSACTION
+
+
+def time_calls(fn, data, repeat):
+    """
+    Executa fn(data) `repeat` vezes e devolve a latência de cada chamada em µs.
+    """
+    timings = np.empty(repeat)
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(data)
+        timings[i] = time.perf_counter() - start
+    return timings * 1e6
+
+
+def summarize(name, timings):
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    print(f"{name:28} p50={p50:9.1f}µs  p95={p95:9.1f}µs  p99={p99:9.1f}µs")
+    return p50
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de inferência individual")
+    parser.add_argument("--repeat", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    args = parser.parse_args()
+
+    inference.load_inference_assets()
+
+    cases = {
+        "predict_batch (DataFrame)": lambda d: inference.predict_batch(pd.DataFrame([d]))[0],
+        "predict_single_transaction": inference.predict_single_transaction,
+    }
+
+    print(f"\n⏱️ {args.repeat} chamadas por caso (modelo: {type(inference.model_final).__name__})")
+    medians = {}
+    for name, fn in cases.items():
+        time_calls(fn, TRANSACTION, args.warmup)
+        medians[name] = summarize(name, time_calls(fn, TRANSACTION, args.repeat))
+
+    baseline, fast = medians.values()
+    print(f"\n🚀 Speedup (p50): {baseline / fast:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
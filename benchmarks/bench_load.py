@@ -0,0 +1,361 @@
+"""
+Teste de carga HTTP da API de fraude, ponta a ponta.
+
+Dois modos:
+ - closed-loop (--concurrency N): N usuários, cada um envia a próxima
+   requisição assim que a anterior volta. Mede a capacidade máxima, mas
+   quando o servidor engasga os usuários param de enviar e as latências
+   altas somem da amostra (coordinated omission)
+ - open-loop (--rate R): requisições agendadas em instantes fixos (R/s),
+   independentes das respostas. A latência é contada do instante agendado,
+   então fila e atraso do próprio gerador entram na conta, como o
+   usuário real os veria
+
+No closed-loop os percentis corrigidos usam a correção do HdrHistogram:
+cada amostra maior que o intervalo esperado gera as amostras que teriam
+sido feitas enquanto ela estava parada (--expected-interval-ms; padrão: a
+mediana da própria rodada).
+
+O servidor pode ser uma URL já no ar (--url), a API na mesma máquina numa
+thread (--server inprocess) ou um processo uvicorn (--server uvicorn, com
+--workers e --env FRAUD_EXECUTOR=process etc.). As requisições usam o
+FraudClient sem retry, para os erros aparecerem na taxa de erro. No modo
+inprocess o gerador divide o GIL com a API; para números de capacidade,
+prefira --server uvicorn. --env só vale com --server uvicorn: no modo
+inprocess a API já foi importada (api.settings lê o ambiente no import).
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_load --server inprocess --concurrency 8 --duration 20
+    python -m benchmarks.bench_load --server uvicorn --workers 4 --rate 500 --endpoint predict-batch --batch-size 100
+    python -m benchmarks.bench_load --url http://127.0.0.1:8000 --rate 200 --output reports/load.jsonl --label exec-thread
+"""
+
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from api.client import FraudClient
+from tests.test_inference import random_transactions
+
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+
+# ---------- Servidor ----------
+class LocalServer:
+    """
+    Sobe a API para o teste: numa thread (inprocess) ou num subprocesso uvicorn.
+    """
+
+    def __init__(self, mode="inprocess", workers=1, env=None, startup_timeout=120):
+        if mode == "inprocess" and env:
+            # api.settings já leu o ambiente no import: as variáveis seriam ignoradas
+            raise ValueError("env só é aplicado com mode='uvicorn' (subprocesso)")
+        self.mode = mode
+        self.workers = workers
+        self.env = env or {}
+        self.startup_timeout = startup_timeout
+        self.url = None
+        self._server = None
+        self._thread = None
+        self._process = None
+
+    def __enter__(self):
+        from tests.conftest import free_port
+
+        port = free_port()
+        self.url = f"http://127.0.0.1:{port}"
+
+        if self.mode == "inprocess":
+            import uvicorn
+
+            from api import app as api_app
+
+            config = uvicorn.Config(api_app.app, host="127.0.0.1", port=port, log_level="warning")
+            self._server = uvicorn.Server(config)
+            self._thread = threading.Thread(target=self._server.run, daemon=True)
+            self._thread.start()
+        else:
+            self._process = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "api.app:app", "--host", "127.0.0.1",
+                 "--port", str(port), "--workers", str(self.workers), "--log-level", "warning"],
+                env={**os.environ, **self.env},
+            )
+
+        self._wait_ready()
+        return self
+
+    def _wait_ready(self):
+        deadline = time.monotonic() + self.startup_timeout
+        with FraudClient(self.url, max_retries=0, timeout=(1, 5)) as client:
+            while time.monotonic() < deadline:
+                if self._process is not None and self._process.poll() is not None:
+                    raise RuntimeError("O uvicorn terminou antes de ficar pronto.")
+                if "error" not in client.healthcheck():
+                    return
+                time.sleep(0.2)
+        raise TimeoutError(f"API não respondeu em {self.startup_timeout}s")
+
+    def __exit__(self, *exc):
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join()
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait(timeout=30)
+
+
+# ---------- Geração de carga ----------
+def make_request(client, endpoint, payloads):
+    """
+    Função que envia uma requisição; payloads são reaproveitados em rodízio.
+    """
+    cycle = itertools.cycle(payloads)
+    lock = threading.Lock()
+
+    def next_payload():
+        with lock:
+            return next(cycle)
+
+    if endpoint == "predict":
+        return lambda: client.predict_single(next_payload())
+    # Um único POST por lote: sem a divisão em blocos do client
+    return lambda: client._post("/predict-batch", json=next_payload())
+
+
+def closed_loop(send, concurrency, duration):
+    """
+    `concurrency` usuários enviando em sequência durante `duration` segundos.
+    Retorna listas de (latência, erro) e o tempo total.
+    """
+    samples = []
+    stop_at = time.perf_counter() + duration
+
+    def user():
+        local = []
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                send()
+                error = False
+            except Exception:
+                error = True
+            local.append((time.perf_counter() - start, error))
+        samples.extend(local)
+
+    start = time.perf_counter()
+    _run_threads(user, concurrency)
+    return samples, time.perf_counter() - start
+
+
+def open_loop(send, rate, duration, max_in_flight=64):
+    """
+    Requisições agendadas a `rate` por segundo durante `duration` segundos.
+    Cada amostra traz a latência desde o instante agendado e o tempo de
+    serviço (desde o envio real).
+    """
+    total = int(rate * duration)
+    counter = itertools.count()
+    samples = []
+    t0 = time.perf_counter() + 0.05
+
+    def sender():
+        local = []
+        while True:
+            i = next(counter)
+            if i >= total:
+                break
+            intended = t0 + i / rate
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            start = time.perf_counter()
+            try:
+                send()
+                error = False
+            except Exception:
+                error = True
+            end = time.perf_counter()
+            local.append((end - intended, end - start, error))
+        samples.extend(local)
+
+    _run_threads(sender, max_in_flight)
+    return samples, time.perf_counter() - t0
+
+
+def _run_threads(target, n):
+    threads = [threading.Thread(target=target, daemon=True) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+# ---------- Estatísticas ----------
+def correct_coordinated_omission(latencies, expected_interval):
+    """
+    Correção do HdrHistogram (recordValueWithExpectedInterval): para cada
+    latência L > intervalo esperado, acrescenta L - k·intervalo para k = 1, 2, ...
+    enquanto o valor não ficar abaixo do intervalo.
+    """
+    latencies = np.asarray(latencies, dtype=np.float64)
+    if expected_interval <= 0:
+        return latencies
+    extra = []
+    for value in latencies[latencies > expected_interval]:
+        # Quantos intervalos inteiros a amostra cobriu (tolerância p/ arredondamento)
+        missing = int(np.floor(value / expected_interval + 1e-9)) - 1
+        extra.append(value - expected_interval * np.arange(1, missing + 1))
+    return np.concatenate([latencies, *extra]) if extra else latencies
+
+
+def percentiles_ms(latencies):
+    if len(latencies) == 0:
+        return {}
+    values = np.percentile(latencies, PERCENTILES) * 1e3
+    stats = {f"p{p:g}": round(float(v), 3) for p, v in zip(PERCENTILES, values)}
+    stats["max"] = round(float(np.max(latencies)) * 1e3, 3)
+    return stats
+
+
+def summarize(samples, elapsed, rows_per_request, mode, expected_interval=None):
+    errors = sum(1 for s in samples if s[-1])
+    ok = len(samples) - errors
+    report = {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": ok / elapsed,
+        "rows_per_s": ok * rows_per_request / elapsed,
+    }
+
+    if mode == "open":
+        # Do instante agendado (corrigida) e do envio real (serviço)
+        report["latency_ms"] = percentiles_ms([s[0] for s in samples])
+        report["service_ms"] = percentiles_ms([s[1] for s in samples])
+    else:
+        service = np.array([s[0] for s in samples])
+        interval = expected_interval if expected_interval is not None else float(np.median(service))
+        report["service_ms"] = percentiles_ms(service)
+        report["latency_ms"] = percentiles_ms(correct_coordinated_omission(service, interval))
+        report["expected_interval_ms"] = round(interval * 1e3, 3)
+    return report
+
+
+def run_load(url, endpoint="predict", batch_size=100, concurrency=None, rate=None, duration=10.0,
+             max_in_flight=64, expected_interval=None, warmup=1.0):
+    """
+    Executa um cenário contra `url` e retorna o relatório (dict).
+    Passe concurrency (closed-loop) ou rate (open-loop).
+    """
+    if (concurrency is None) == (rate is None):
+        raise ValueError("Informe concurrency (closed-loop) ou rate (open-loop).")
+
+    if endpoint == "predict":
+        payloads = random_transactions(256)
+    else:
+        payloads = [random_transactions(batch_size, seed=seed) for seed in range(8)]
+    rows_per_request = 1 if endpoint == "predict" else batch_size
+
+    pool_size = concurrency or max_in_flight
+    with FraudClient(url, pool_size=pool_size, max_retries=0) as client:
+        send = make_request(client, endpoint, payloads)
+        if warmup > 0:
+            closed_loop(send, min(pool_size, 4), warmup)
+
+        if concurrency is not None:
+            samples, elapsed = closed_loop(send, concurrency, duration)
+            mode = "closed"
+        else:
+            samples, elapsed = open_loop(send, rate, duration, max_in_flight)
+            mode = "open"
+
+    report = summarize(samples, elapsed, rows_per_request, mode, expected_interval)
+    report["scenario"] = {
+        "mode": mode, "endpoint": endpoint, "batch_size": rows_per_request,
+        "concurrency": concurrency, "rate": rate, "duration_s": duration,
+    }
+    return report
+
+
+def print_report(report):
+    scenario = report["scenario"]
+    load = f"{scenario['concurrency']} usuários" if scenario["mode"] == "closed" else f"{scenario['rate']} req/s"
+    print(f"\n🚦 {scenario['mode']}-loop /{scenario['endpoint']} ({load}, lote {scenario['batch_size']})")
+    print(f"   {report['requests']} requisições em {report['elapsed_s']:.1f}s: "
+          f"{report['throughput_rps']:,.1f} req/s, {report['rows_per_s']:,.0f} linhas/s, "
+          f"erros {report['error_rate']:.2%}")
+    for name in ("latency_ms", "service_ms"):
+        stats = report[name]
+        label = "latência (corrigida)" if name == "latency_ms" else "tempo de serviço"
+        print(f"   {label:22} " + "  ".join(f"{k}={v:.2f}" for k, v in stats.items()) + " ms")
+
+
+def _parse_env(pairs):
+    env = {}
+    for pair in pairs:
+        name, sep, value = pair.partition("=")
+        if not sep:
+            raise argparse.ArgumentTypeError(f"--env espera NOME=valor, recebeu {pair!r}")
+        env[name] = value
+    return env
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga da API de fraude")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="API já no ar")
+    target.add_argument("--server", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--workers", type=int, default=1, help="Workers do uvicorn (--server uvicorn)")
+    parser.add_argument("--env", nargs="*", default=[], help="Variáveis FRAUD_* do servidor (NOME=valor)")
+
+    load = parser.add_mutually_exclusive_group(required=True)
+    load.add_argument("--concurrency", type=int, help="Closed-loop: usuários simultâneos")
+    load.add_argument("--rate", type=float, help="Open-loop: requisições por segundo")
+
+    parser.add_argument("--endpoint", choices=["predict", "predict-batch"], default="predict")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--max-in-flight", type=int, default=64, help="Open-loop: conexões simultâneas")
+    parser.add_argument("--expected-interval-ms", type=float, default=None,
+                        help="Closed-loop: intervalo esperado da correção (padrão: mediana)")
+    parser.add_argument("--output", help="Acrescenta o relatório (JSON por linha) neste arquivo")
+    parser.add_argument("--label", default=None, help="Nome do cenário no arquivo de saída")
+    args = parser.parse_args(argv)
+
+    kwargs = dict(
+        endpoint=args.endpoint, batch_size=args.batch_size, concurrency=args.concurrency,
+        rate=args.rate, duration=args.duration, max_in_flight=args.max_in_flight,
+        expected_interval=None if args.expected_interval_ms is None else args.expected_interval_ms / 1e3,
+    )
+    env = _parse_env(args.env)
+    if env and (args.url or args.server == "inprocess"):
+        parser.error("--env só vale com --server uvicorn (inprocess/--url usam as configurações já carregadas)")
+
+    if args.url:
+        report = run_load(args.url, **kwargs)
+    else:
+        with LocalServer(args.server, args.workers, env) as server:
+            report = run_load(server.url, **kwargs)
+        report["server"] = {"mode": args.server, "workers": args.workers, "env": env}
+
+    report["label"] = args.label
+    print_report(report)
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "a") as f:
+            f.write(json.dumps(report) + "\n")
+        print(f"\n✔ Relatório acrescentado em: {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark de memória por worker: modelo privado (pickle) x compartilhado (mmap).
+
+Sobe N processos (spawn, como os workers do uvicorn), cada um carrega o
+modelo com load_inference_assets e pontua algumas transações. Com todos vivos
+ao mesmo tempo, cada worker lê RSS e PSS em /proc/self/smaps_rollup. O PSS
+divide as páginas compartilhadas entre os processos que as usam, então é a
+medida honesta do custo de cada worker a mais.
+
+Uso (Linux, a partir da raiz do projeto):
+    python -m benchmarks.bench_memory --workers 1 4 16
+"""
+
+import argparse
+import multiprocessing
+
+import numpy as np
+
+MODES = {
+    "pickle": {},
+    "shared": {"shared": True},
+    "shared+fused": {"shared": True, "fused": True},
+}
+
+
+def read_memory_kb():
+    """
+    RSS e PSS do processo atual em kB (Linux).
+    """
+    values = {}
+    with open("/proc/self/smaps_rollup", "r") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss"):
+                values[name] = int(rest.split()[0])
+    return values["Rss"], values["Pss"]
+
+
+def _worker(load_kwargs, loaded, measured, results):
+    from src import inference
+
+    inference.load_inference_assets(**load_kwargs)
+    X = np.random.default_rng(0).normal(size=(256, len(inference.feature_order)))
+    inference.predict_matrix(X)
+
+    # Todos carregados antes de medir; todos medidos antes de sair
+    loaded.wait()
+    results.put(read_memory_kb())
+    measured.wait()
+
+
+def measure(load_kwargs, n_workers):
+    context = multiprocessing.get_context("spawn")
+    loaded = context.Barrier(n_workers)
+    measured = context.Barrier(n_workers)
+    results = context.Queue()
+
+    workers = [
+        context.Process(target=_worker, args=(load_kwargs, loaded, measured, results))
+        for _ in range(n_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    samples = [results.get() for _ in range(n_workers)]
+    for worker in workers:
+        worker.join()
+
+    rss, pss = np.array(samples, dtype=np.float64).T / 1024
+    return {"rss_mb": rss.mean(), "pss_mb": pss.mean(), "total_pss_mb": pss.sum()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RSS/PSS por worker com o modelo privado ou compartilhado")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    # Exporta antes, para os workers só mapearem (sem corrida na exportação)
+    from src import inference
+    for mode in args.modes:
+        if MODES[mode]:
+            inference.build_bundle(**MODES[mode])
+
+    print(f"\n{'modo':14} {'workers':>7} {'RSS/worker':>11} {'PSS/worker':>11} {'PSS total':>10}")
+    for mode in args.modes:
+        for n_workers in args.workers:
+            stats = measure(MODES[mode], n_workers)
+            print(f"{mode:14} {n_workers:7d} {stats['rss_mb']:9.1f}MB {stats['pss_mb']:9.1f}MB "
+                  f"{stats['total_pss_mb']:8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Custo da instrumentação por etapa (src.metrics).
+
+Mede os mesmos caminhos com as métricas ligadas e desligadas, alternando os
+modos a cada rodada para diluir ruído, e mostra o overhead relativo (pelo
+mínimo de cada modo). Como a diferença fica abaixo do ruído da máquina, o
+orçamento é conferido pela estimativa: marks por chamada x custo de um mark().
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_metrics --rounds 20
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src import inference, metrics
+from tests.test_inference import TRANSACTION, random_transactions
+
+
+def mark_cost_ns(n=200_000):
+    timer = metrics.StageTimer(inference.STAGE_SECONDS, "bench").start()
+    start = time.perf_counter()
+    for _ in range(n):
+        timer.mark("noop")
+    return (time.perf_counter() - start) / n * 1e9
+
+
+def marks_per_call(fn, arg):
+    """
+    Quantos histogramas de etapa uma chamada alimenta.
+    """
+    def observed():
+        return sum(child.count for _, child in inference.STAGE_SECONDS.children())
+
+    metrics.configure(True)
+    before = observed()
+    fn(arg)
+    return observed() - before
+
+
+def run_case(fn, arg, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn(arg)
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overhead das métricas por etapa")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--budget", type=float, default=0.01, help="Overhead máximo aceitável (fração)")
+    parser.add_argument("--compiled", action="store_true",
+                        help="Ensemble compilado (sem o pool de threads do sklearn, bem menos ruído)")
+    args = parser.parse_args()
+
+    inference.load_inference_assets(compiled=args.compiled)
+    records = random_transactions(100)
+    X = np.random.default_rng(0).normal(size=(10_000, len(inference.feature_order)))
+
+    cases = {
+        "predict_single_transaction": (inference.predict_single_transaction, TRANSACTION, 20),
+        "predict_records (100)": (inference.predict_records, records, 5),
+        "predict_matrix (10k)": (inference.predict_matrix, X, 3),
+    }
+
+    mark_ns = mark_cost_ns()
+    print(f"\n⏱️ mark(): {mark_ns:.0f} ns por etapa")
+    print(f"\n{'caso':28} {'desligado':>12} {'ligado':>12} {'medido':>9} {'marks':>6} {'estimado':>9}")
+
+    worst = 0.0
+    for name, (fn, arg, calls) in cases.items():
+        timings = {False: [], True: []}
+        run_case(fn, arg, calls)
+        for round_ in range(args.rounds):
+            # Alterna quem roda primeiro, para não favorecer um dos modos
+            for enabled in ((False, True) if round_ % 2 else (True, False)):
+                metrics.configure(enabled)
+                timings[enabled].append(run_case(fn, arg, calls))
+        # O mínimo das rodadas é o menos sujeito a ruído do sistema
+        off, on = min(timings[False]), min(timings[True])
+        marks = marks_per_call(fn, arg)
+        estimated = marks * mark_ns * 1e-9 / off
+        worst = max(worst, estimated)
+        print(f"{name:28} {off * 1e3:10.3f}ms {on * 1e3:10.3f}ms {on / off - 1:+8.2%} {marks:6d} {estimated:8.2%}")
+
+    metrics.configure(True)
+    status = "✔" if worst <= args.budget else "❌"
+    print(f"\n{status} Pior overhead estimado: {worst:.2%} (orçamento {args.budget:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Suíte de microbenchmarks da inferência, com baselines em JSON.
+
+Casos medidos:
+ - pipeline/predict_single_transaction: caminho rápido de 1 transação
+ - pipeline/predict_batch: pipeline completo (DataFrame → scaler → modelo)
+   em cada tamanho de lote
+ - bare/<modelo>: só o predict_proba de cada modelo em models/, com a
+   matriz já escalada, em cada tamanho de lote
+
+Para cada caso: distribuição de latência (p50/p95/p99/média/mínimo), linhas
+por segundo pelo p50 e pico de memória alocada numa chamada (tracemalloc,
+medido numa execução à parte para não pesar nos tempos).
+
+O modo compare confronta dois resultados e marca como regressão todo caso
+cuja métrica piorou além do limiar; sai com código 1 se houver alguma.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_suite run --output benchmarks/results/atual.json
+    python -m benchmarks.bench_suite run --quick --models modelo_final
+    python -m benchmarks.bench_suite compare benchmarks/results/base.json benchmarks/results/atual.json
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+DEFAULT_SIZES = [1, 10, 100, 1_000, 10_000, 100_000]
+QUICK_SIZES = [1, 10, 100, 1_000]
+MODELS_DIR = "models"
+RESULTS_DIR = "benchmarks/results"
+
+# Métricas comparáveis: True quando "maior é melhor"
+METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "mean_ms": False,
+    "rows_per_s": True,
+    "peak_mem_mb": False,
+}
+
+
+# ---------- Medição ----------
+def time_calls(fn, arg, min_time=0.5, min_repeat=5, max_repeat=2000):
+    """
+    Latências (s) de fn(arg): repete até somar min_time, respeitando os limites.
+    """
+    timings = []
+    total = 0.0
+    while len(timings) < max_repeat and (len(timings) < min_repeat or total < min_time):
+        start = time.perf_counter()
+        fn(arg)
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        total += elapsed
+    return np.array(timings)
+
+
+def peak_memory_mb(fn, arg):
+    """
+    Pico de memória alocada (MB) durante uma chamada de fn(arg).
+    """
+    tracemalloc.start()
+    try:
+        fn(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024 ** 2
+
+
+def measure(fn, arg, rows, min_time=0.5, warmup=2):
+    for _ in range(warmup):
+        fn(arg)
+    timings = time_calls(fn, arg, min_time=min_time)
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    return {
+        "rows": rows,
+        "repeat": len(timings),
+        "p50_ms": p50 * 1e3,
+        "p95_ms": p95 * 1e3,
+        "p99_ms": p99 * 1e3,
+        "mean_ms": timings.mean() * 1e3,
+        "min_ms": timings.min() * 1e3,
+        "rows_per_s": rows / p50,
+        "peak_mem_mb": peak_memory_mb(fn, arg),
+    }
+
+
+# ---------- Casos ----------
+def synthetic_matrix(scaler, n_rows, seed=42):
+    """
+    Linhas brutas com a média e a escala vistas pelo scaler no treino.
+    """
+    rng = np.random.default_rng(seed)
+    return scaler.mean_ + scaler.scale_ * rng.normal(size=(n_rows, len(scaler.mean_)))
+
+
+def model_paths(names=None):
+    paths = {}
+    for path in sorted(glob.glob(os.path.join(MODELS_DIR, "*.pkl"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name == "scaler":
+            continue
+        if names is None or name in names:
+            paths[name] = path
+    return paths
+
+
+def run_suite(sizes=DEFAULT_SIZES, models=None, min_time=0.5, log=print):
+    import joblib
+    import pandas as pd
+
+    from src import inference
+
+    inference.load_inference_assets()
+    scaler = inference.scaler
+    columns = inference.feature_order
+    X_raw = synthetic_matrix(scaler, max(sizes))
+    X_scaled = scaler.transform(pd.DataFrame(X_raw, columns=columns))
+    transaction = dict(zip(columns, X_raw[0].tolist()))
+
+    cases = {}
+
+    def record(key, fn, arg, rows):
+        cases[key] = measure(fn, arg, rows, min_time=min_time)
+        stats = cases[key]
+        log(f"{key:48} p50={stats['p50_ms']:10.3f}ms  p99={stats['p99_ms']:10.3f}ms  "
+            f"{stats['rows_per_s']:>12,.0f} linhas/s  pico={stats['peak_mem_mb']:8.2f}MB")
+
+    record("pipeline/predict_single_transaction/n=1", inference.predict_single_transaction, transaction, 1)
+    for size in sizes:
+        df = pd.DataFrame(X_raw[:size], columns=columns)
+        record(f"pipeline/predict_batch/n={size}", inference.predict_batch, df, size)
+
+    for name, path in model_paths(models).items():
+        try:
+            model = joblib.load(path)
+        except Exception as e:
+            log(f"⚠️ {name}: não foi possível carregar {path} ({e})")
+            continue
+        for size in sizes:
+            record(f"bare/{name}/n={size}", model.predict_proba, X_scaled[:size], size)
+
+    return {"environment": environment(), "sizes": list(sizes), "cases": cases}
+
+
+def environment():
+    import sklearn
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+# ---------- Comparação ----------
+def compare(baseline: dict, current: dict, threshold=0.10, metrics=("p50_ms", "rows_per_s")):
+    """
+    Lista de diferenças por caso e métrica. Uma linha é regressão quando a
+    métrica piorou mais que `threshold` (fração) em relação ao baseline.
+    """
+    rows = []
+    for key in sorted(set(baseline["cases"]) & set(current["cases"])):
+        for metric in metrics:
+            before = baseline["cases"][key][metric]
+            after = current["cases"][key][metric]
+            change = after / before - 1 if before else 0.0
+            worse = -change if METRICS[metric] else change
+            rows.append({
+                "case": key,
+                "metric": metric,
+                "baseline": before,
+                "current": after,
+                "change": change,
+                "regression": worse > threshold,
+            })
+    return rows
+
+
+def print_comparison(rows, threshold):
+    print(f"\n{'caso':48} {'métrica':12} {'baseline':>12} {'atual':>12} {'variação':>9}")
+    for row in rows:
+        flag = "❌" if row["regression"] else "  "
+        print(f"{row['case']:48} {row['metric']:12} {row['baseline']:12.4g} {row['current']:12.4g} "
+              f"{row['change']:+8.1%} {flag}")
+
+    regressions = [row for row in rows if row["regression"]]
+    if regressions:
+        print(f"\n❌ {len(regressions)} regressão(ões) acima de {threshold:.0%}")
+    else:
+        print(f"\n✔ Nenhuma regressão acima de {threshold:.0%}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks da inferência")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Executa a suíte e grava o JSON")
+    run.add_argument("--output", default=None, help=f"Arquivo de saída (padrão: {RESULTS_DIR}/<data>.json)")
+    run.add_argument("--sizes", type=int, nargs="+", default=None)
+    run.add_argument("--quick", action="store_true", help=f"Lotes até {QUICK_SIZES[-1]} linhas")
+    run.add_argument("--models", nargs="+", default=None, help="Nomes em models/ (padrão: todos)")
+    run.add_argument("--min-time", type=float, default=0.5, help="Segundos medidos por caso")
+
+    cmp = commands.add_parser("compare", help="Compara dois resultados")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=0.10, help="Piora máxima aceitável (fração)")
+    cmp.add_argument("--metrics", nargs="+", choices=list(METRICS), default=["p50_ms", "rows_per_s"])
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+        result = run_suite(sizes, args.models, args.min_time)
+
+        output = args.output or os.path.join(
+            RESULTS_DIR, datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+        )
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\n✔ Resultados salvos em: {output}")
+        return 0
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    with open(args.current, "r") as f:
+        current = json.load(f)
+    regressions = print_comparison(compare(baseline, current, args.threshold, args.metrics), args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Tempo de tuning do XGBoost e do LightGBM com e sem reaproveitar os datasets
+quantizados por fold (src.native_search).
+
+Os dados são sintéticos, no formato do treino balanceado (30 features; o
+SMOTE deixa ~455k linhas, das quais o tuning usa 10%). As duas buscas
+avaliam os mesmos candidatos nos mesmos folds, então o melhor score tem de
+ser idêntico; a diferença de tempo é o custo de refazer bins e datasets.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_tuning --rows 455000 --repeat 3
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from src import tuning
+
+MODELS = {
+    "XGBoost": tuning.tune_XGboost,
+    "LightGBM": tuning.tune_LightGBM,
+}
+
+
+def synthetic_data(n_rows, n_features=30, seed=42):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_features))
+    signal = X[:, 0] + 0.5 * X[:, 1] - 0.3 * X[:, 2] + rng.normal(size=n_rows)
+    y = (signal > np.median(signal)).astype(int)
+    split = int(n_rows * 0.9)
+    return X[:split], y[:split], X[split:], y[split:]
+
+
+def best_run(tune_fn, data, reuse, repeat):
+    """
+    Menor tempo entre `repeat` execuções e o resultado da última.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        # Silencia o "Fitting ..." da busca
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = tune_fn(*data, reuse_datasets=reuse)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tuning com e sem reaproveitar datasets por fold")
+    parser.add_argument("--rows", type=int, default=455_000, help="Linhas do treino (o tuning usa 10%%)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--models", nargs="+", choices=list(MODELS), default=list(MODELS))
+    args = parser.parse_args()
+
+    data = synthetic_data(args.rows)
+    print(f"\n⚙️ {tuning.N_ITER} candidatos x {tuning.CV_FOLDS} folds sobre {int(len(data[0]) * 0.1)} linhas")
+    print(f"{'modelo':10} {'sem reuso':>11} {'com reuso':>11} {'economia':>10} {'mesmo score':>12}")
+
+    for name in args.models:
+        baseline, expected = best_run(MODELS[name], data, reuse=False, repeat=args.repeat)
+        reused, result = best_run(MODELS[name], data, reuse=True, repeat=args.repeat)
+        same = np.isclose(expected["best_cv_score"], result["best_cv_score"])
+        print(f"{name:10} {baseline:10.2f}s {reused:10.2f}s {1 - reused / baseline:+9.1%} "
+              f"{'✔' if same else '❌':>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Pontuação em massa fora da memória (backtests em arquivos históricos).
+
+Lê CSV ou Parquet em blocos, distribui os blocos para um pool de processos
+(modelo carregado uma vez por worker) e grava probabilidades e classes em
+formato colunar, um arquivo por bloco. A memória fica limitada a alguns blocos
+em voo, qualquer que seja o tamanho do arquivo.
+
+O progresso é salvo em <saida>/_progress.json; rodar de novo com --resume
+continua a partir do último bloco concluído.
+
+Uso:
+    python -m src.bulk_scoring data/raw/creditcard.csv reports/scores \
+        --format parquet --chunksize 100000 --workers 4 --resume
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from src.inference import read_feature_order
+from src.model_registry import resolve_version
+
+PROGRESS_FILE = "_progress.json"
+OUTPUT_FORMATS = ("parquet", "npy")
+
+
+# ---------- Leitura em blocos ----------
+def iter_chunks(path: str, feature_order: list, chunksize: int, skip_chunks: int = 0):
+    """
+    Gera (índice do bloco, matriz float64 na ordem de feature_order).
+    Os `skip_chunks` primeiros blocos são pulados sem conversão.
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=feature_order)
+        for index, batch in enumerate(batches):
+            if index < skip_chunks:
+                continue
+            columns = [batch.column(name).to_numpy(zero_copy_only=False) for name in feature_order]
+            yield index, np.column_stack(columns).astype(np.float64, copy=False)
+    else:
+        reader = pd.read_csv(
+            path,
+            usecols=feature_order,
+            dtype={name: np.float64 for name in feature_order},
+            chunksize=chunksize,
+            skiprows=range(1, skip_chunks * chunksize + 1)
+        )
+        for index, chunk in enumerate(reader, start=skip_chunks):
+            yield index, chunk[feature_order].to_numpy()
+
+
+# ---------- Workers ----------
+def _init_worker(load_kwargs):
+    from src.inference import load_inference_assets
+
+    load_inference_assets(**load_kwargs)
+
+
+def part_path(output_dir: str, index: int, fmt: str) -> str:
+    return os.path.join(output_dir, f"part-{index:05d}.{fmt}")
+
+
+def _score_chunk(index: int, X: np.ndarray, output_dir: str, fmt: str, threshold: float):
+    """
+    Pontua um bloco e grava o arquivo dele (escrita atômica via rename).
+    """
+    from src.inference import score_matrix
+
+    prob = score_matrix(X)
+    prediction = (prob >= threshold).astype(np.int8)
+
+    final_path = part_path(output_dir, index, fmt)
+    tmp_path = final_path + ".tmp"
+
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.table({"fraud_probability": prob, "prediction": prediction})
+        pq.write_table(table, tmp_path)
+    else:
+        scores = np.empty(len(prob), dtype=[("fraud_probability", "f8"), ("prediction", "i1")])
+        scores["fraud_probability"] = prob
+        scores["prediction"] = prediction
+        with open(tmp_path, "wb") as f:
+            np.save(f, scores)
+
+    os.replace(tmp_path, final_path)
+    return index, len(prob)
+
+
+# ---------- Progresso ----------
+def _input_fingerprint(path: str, chunksize: int, fmt: str) -> dict:
+    stat = os.stat(path)
+    return {
+        "input": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "chunksize": chunksize,
+        "format": fmt,
+    }
+
+
+def _load_progress(output_dir: str, fingerprint: dict) -> dict:
+    path = os.path.join(output_dir, PROGRESS_FILE)
+    if not os.path.exists(path):
+        return {"fingerprint": fingerprint, "done": {}}
+
+    with open(path, "r") as f:
+        progress = json.load(f)
+    if progress.get("fingerprint") != fingerprint:
+        raise ValueError(
+            f"{path} pertence a outra execução (arquivo, chunksize ou formato diferentes). "
+            "Use outra pasta de saída ou remova o progresso antigo."
+        )
+    return progress
+
+
+def _save_progress(output_dir: str, progress: dict):
+    path = os.path.join(output_dir, PROGRESS_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(progress, f)
+    os.replace(path + ".tmp", path)
+
+
+def _finished_prefix(done: dict) -> int:
+    """
+    Quantidade de blocos concluídos em sequência desde o início.
+    """
+    count = 0
+    while str(count) in done:
+        count += 1
+    return count
+
+
+# ---------- Principal ----------
+def score_file(input_path: str,
+               output_dir: str,
+               fmt: str = "parquet",
+               chunksize: int = 100_000,
+               workers: int = None,
+               resume: bool = False,
+               threshold: float = 0.5,
+               load_kwargs: dict = None,
+               feature_order_path: str = None):
+    """
+    Pontua input_path bloco a bloco e grava os resultados em output_dir.
+    Retorna um resumo com linhas, blocos e linhas/s.
+
+    A versão do modelo (load_kwargs["version"], padrão: a mais nova do
+    registro) é resolvida uma vez aqui: a ordem das colunas vem dela
+    (salvo feature_order_path explícito) e todos os workers carregam a mesma.
+    """
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Formato inválido: {fmt}. Use um de {OUTPUT_FORMATS}")
+
+    workers = workers or os.cpu_count() or 1
+    paths = resolve_version((load_kwargs or {}).get("version"))
+    load_kwargs = {**(load_kwargs or {}), "version": paths["version"]}
+    feature_order = read_feature_order(feature_order_path or paths["feature_order_path"])
+    os.makedirs(output_dir, exist_ok=True)
+
+    fingerprint = _input_fingerprint(input_path, chunksize, fmt)
+    if resume:
+        progress = _load_progress(output_dir, fingerprint)
+    else:
+        progress = {"fingerprint": fingerprint, "done": {}}
+    done = progress["done"]
+
+    skip = _finished_prefix(done)
+    if skip:
+        print(f"⏩ Retomando: {skip} blocos já concluídos")
+
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(load_kwargs,)
+    )
+
+    start = time.perf_counter()
+    rows_scored = 0
+    max_in_flight = workers * 2
+    in_flight = set()
+
+    def collect(futures):
+        nonlocal rows_scored
+        for future in futures:
+            index, rows = future.result()
+            done[str(index)] = rows
+            rows_scored += rows
+        _save_progress(output_dir, progress)
+        elapsed = time.perf_counter() - start
+        print(f"   {len(done)} blocos | {rows_scored:,} linhas | {rows_scored / elapsed:,.0f} linhas/s")
+
+    try:
+        for index, X in iter_chunks(input_path, feature_order, chunksize, skip_chunks=skip):
+            if str(index) in done:
+                continue
+            if len(in_flight) >= max_in_flight:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished)
+            in_flight.add(executor.submit(_score_chunk, index, X, output_dir, fmt, threshold))
+
+        if in_flight:
+            collect(wait(in_flight).done)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "chunks": len(done),
+        "rows_scored": rows_scored,
+        "rows_total": sum(done.values()),
+        "seconds": elapsed,
+        "rows_per_second": rows_scored / elapsed if elapsed > 0 else 0.0,
+    }
+    print(f"✔ Pontuação concluída: {summary['rows_total']:,} linhas em {output_dir} "
+          f"({summary['rows_per_second']:,.0f} linhas/s)")
+    return summary
+
+
+def load_scores(output_dir: str) -> pd.DataFrame:
+    """
+    Junta os arquivos de saída, na ordem das linhas da entrada.
+    """
+    with open(os.path.join(output_dir, PROGRESS_FILE), "r") as f:
+        progress = json.load(f)
+    fmt = progress["fingerprint"]["format"]
+    indexes = sorted(int(i) for i in progress["done"])
+
+    parts = []
+    for index in indexes:
+        path = part_path(output_dir, index, fmt)
+        parts.append(pd.read_parquet(path) if fmt == "parquet" else pd.DataFrame(np.load(path)))
+    return pd.concat(parts, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pontuação em massa de arquivos CSV/Parquet")
+    parser.add_argument("input", help="Arquivo .csv ou .parquet com as features")
+    parser.add_argument("output", help="Pasta de saída (um arquivo por bloco)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="parquet")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--resume", action="store_true", help="Continua do último bloco concluído")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--fused", action="store_true", help="Carrega o modelo com o scaler fundido")
+    parser.add_argument("--compiled", action="store_true", help="Usa o ensemble compilado em NumPy")
+    parser.add_argument("--shared", action="store_true",
+                        help="Workers mapeiam o modelo em arrays compartilhados (menos RAM por worker)")
+    parser.add_argument("--version", default=None, help="Versão do registro (padrão: a mais nova)")
+    args = parser.parse_args()
+
+    score_file(
+        args.input,
+        args.output,
+        fmt=args.format,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        resume=args.resume,
+        threshold=args.threshold,
+        load_kwargs={"fused": args.fused, "compiled": args.compiled, "shared": args.shared,
+                     "version": args.version}
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+"""
+Compilador de ensembles de árvores para arrays NumPy.
+
+Achata as árvores de RandomForest, GradientBoosting, XGBoost e LightGBM em
+arrays empacotados (feature, threshold, left, right, value) e avalia lotes
+inteiros com uma travessia vetorizada: cada iteração desce um nível de TODAS
+as árvores para TODAS as linhas, sem Python por linha.
+
+As folhas apontam para si mesmas (left = right = próprio nó), então a
+travessia pode rodar até a profundidade máxima sem máscaras.
+
+Uso:
+    from src.compiled_trees import compile_model, CompiledEnsemble
+    compiled = compile_model(modelo)
+    compiled.save("models/modelo_final_compiled.npz")
+    compiled = CompiledEnsemble.load("models/modelo_final_compiled.npz")
+    compiled.predict_proba(X)
+
+Compilar o modelo final a partir da linha de comando:
+    python -m src.compiled_trees models/modelo_final.pkl
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+from src.fusion import fold_thresholds
+
+COMPILED_MODEL_PATH = "models/modelo_final_compiled.npz"
+
+# Limite de elementos (linhas x árvores) processados por vez na travessia
+_CHUNK_ELEMENTS = 1 << 16
+
+_ARRAYS = ("feature", "threshold", "left", "right", "value", "default_left", "roots")
+
+
+class CompiledEnsemble:
+    """
+    Ensemble de árvores em arrays planos, com a mesma interface de
+    predict_proba dos modelos originais (classificação binária).
+
+    - aggregation: "mean" (florestas) ou "sum" (boosting)
+    - link: "identity" (probabilidade direta) ou "sigmoid" (margem)
+    - input_dtype: dtype para o qual X é convertido antes da comparação
+    - strict: True compara x < threshold (XGBoost), False compara x <= threshold
+    """
+
+    def __init__(self, feature, threshold, left, right, value, default_left, roots,
+                 n_features, max_depth, aggregation="sum", link="sigmoid",
+                 base_score=0.0, sigmoid_scale=1.0, input_dtype="float64",
+                 strict=False, source="", children=None, is_split=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.default_left = np.ascontiguousarray(default_left, dtype=bool)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.n_features_in_ = int(n_features)
+        self.max_depth = int(max_depth)
+        self.aggregation = aggregation
+        self.link = link
+        self.base_score = float(base_score)
+        self.sigmoid_scale = float(sigmoid_scale)
+        self.input_dtype = np.dtype(input_dtype)
+        self.strict = bool(strict)
+        self.source = source
+        self.classes_ = np.array([0, 1])
+
+        # Filhos intercalados (esq, dir) para um único gather por nível.
+        # Podem vir prontos (arrays mapeados em memória, ver src.shared_model)
+        if children is None:
+            children = np.column_stack([self.left, self.right]).ravel()
+        if is_split is None:
+            is_split = self.left != np.arange(len(self.left), dtype=np.int32)
+        self._children = np.ascontiguousarray(children, dtype=np.int32)
+        self._is_split = np.ascontiguousarray(is_split, dtype=bool)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _leaf_values(self, X, has_missing):
+        n = X.shape[0]
+        idx = np.broadcast_to(self.roots, (n, self.n_trees)).copy()
+        offsets = (np.arange(n, dtype=np.int64) * X.shape[1])[:, None]
+        flat = X.ravel()
+
+        for _ in range(self.max_depth):
+            x = flat[offsets + self.feature[idx]]
+            # go_right = not (x <= thr): escolhe o filho em children[2*idx + go_right]
+            go_right = x >= self.threshold[idx] if self.strict else x > self.threshold[idx]
+            if has_missing:
+                missing = np.isnan(x)
+                go_right[missing] = ~self.default_left[idx[missing]]
+            idx = self._children[2 * idx + go_right]
+            if not self._is_split[idx].any():
+                break
+
+        return self.value[idx]
+
+    def decision_function(self, X):
+        """
+        Saída agregada antes da função de ligação (margem ou probabilidade).
+        """
+        X = np.ascontiguousarray(X, dtype=self.input_dtype)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X deve ter formato (n, {self.n_features_in_}), recebido {X.shape}"
+            )
+
+        has_missing = bool(np.isnan(X).any())
+        out = np.empty(X.shape[0], dtype=np.float64)
+        step = max(1, _CHUNK_ELEMENTS // max(1, self.n_trees))
+        for start in range(0, X.shape[0], step):
+            leaves = self._leaf_values(X[start:start + step], has_missing)
+            if self.aggregation == "mean":
+                out[start:start + step] = leaves.mean(axis=1)
+            else:
+                out[start:start + step] = leaves.sum(axis=1)
+        return out + self.base_score
+
+    def predict_proba(self, X):
+        raw = self.decision_function(X)
+        if self.link == "sigmoid":
+            with np.errstate(over="ignore"):
+                prob = 1.0 / (1.0 + np.exp(-self.sigmoid_scale * raw))
+        else:
+            prob = raw
+        return np.column_stack([1.0 - prob, prob])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+    def fold_scaler(self, mean, scale):
+        """
+        Dobra um StandardScaler nos thresholds (ver src.fusion): o ensemble
+        passa a receber as features brutas.
+        """
+        split = self._is_split
+        features = self.feature[split]
+        self.threshold[split] = fold_thresholds(
+            self.threshold[split], mean[features], scale[features], self.input_dtype, self.strict
+        )
+        return self
+
+    def arrays(self, derived=False):
+        """
+        Arrays do ensemble por nome; com derived=True inclui os derivados
+        (children, is_split) para quem quer carregá-los sem recalcular.
+        """
+        arrays = {name: getattr(self, name) for name in _ARRAYS}
+        if derived:
+            arrays["children"] = self._children
+            arrays["is_split"] = self._is_split
+        return arrays
+
+    def _meta(self):
+        return {
+            "n_features": self.n_features_in_,
+            "max_depth": self.max_depth,
+            "aggregation": self.aggregation,
+            "link": self.link,
+            "base_score": self.base_score,
+            "sigmoid_scale": self.sigmoid_scale,
+            "input_dtype": self.input_dtype.name,
+            "strict": self.strict,
+            "source": self.source,
+        }
+
+    def save(self, path=COMPILED_MODEL_PATH, source_sha256=None):
+        """
+        Grava o .npz; source_sha256 identifica o pickle de origem (ver source_sha256()).
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, meta=np.array(json.dumps(self._meta())), source_sha256=np.array(source_sha256 or ""),
+                 **self.arrays())
+        print(f"✔ Modelo compilado salvo em: {path}")
+
+    @classmethod
+    def load(cls, path=COMPILED_MODEL_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in _ARRAYS}
+            meta = json.loads(str(data["meta"]))
+        return cls(**arrays, **meta)
+
+
+# ---------- Montagem dos arrays ----------
+def _pack(trees, n_features, **params):
+    """
+    trees: lista de dicts por árvore com arrays locais feature, threshold,
+    left, right (-1 nas folhas), value e default_left.
+    """
+    parts = {name: [] for name in ("feature", "threshold", "left", "right", "value", "default_left")}
+    roots = []
+    max_depth = 0
+    offset = 0
+
+    for tree in trees:
+        left = np.asarray(tree["left"], dtype=np.int64)
+        right = np.asarray(tree["right"], dtype=np.int64)
+        nodes = np.arange(len(left))
+        leaf = left < 0
+
+        parts["feature"].append(np.where(leaf, 0, tree["feature"]))
+        parts["threshold"].append(np.where(leaf, 0.0, tree["threshold"]))
+        parts["left"].append(np.where(leaf, nodes, left) + offset)
+        parts["right"].append(np.where(leaf, nodes, right) + offset)
+        parts["value"].append(np.where(leaf, tree["value"], 0.0))
+        parts["default_left"].append(np.asarray(tree["default_left"], dtype=bool))
+
+        roots.append(offset)
+        offset += len(left)
+        max_depth = max(max_depth, _depth(left, right))
+
+    arrays = {name: np.concatenate(chunks) for name, chunks in parts.items()}
+    return CompiledEnsemble(**arrays, roots=np.array(roots), n_features=n_features,
+                            max_depth=max_depth, **params)
+
+
+def _depth(left, right):
+    # A ordem dos nós não garante filho depois do pai, então a profundidade
+    # é propagada a partir da raiz
+    depth = np.zeros(len(left), dtype=np.int64)
+    stack = [0]
+    while stack:
+        node = stack.pop()
+        if left[node] >= 0:
+            for child in (left[node], right[node]):
+                depth[child] = depth[node] + 1
+                stack.append(child)
+    return int(depth.max())
+
+
+# ---------- Extratores por biblioteca ----------
+def _sklearn_tree(estimator, value):
+    t = estimator.tree_
+    missing_left = getattr(t, "missing_go_to_left", np.zeros(t.node_count, dtype=bool))
+    return {
+        "feature": t.feature,
+        "threshold": t.threshold,
+        "left": t.children_left,
+        "right": t.children_right,
+        "value": value,
+        "default_left": np.asarray(missing_left, dtype=bool),
+    }
+
+
+def _compile_random_forest(model):
+    if len(model.classes_) != 2:
+        raise ValueError("Apenas classificação binária é suportada.")
+    trees = []
+    for estimator in model.estimators_:
+        counts = estimator.tree_.value[:, 0, :]
+        proba = counts[:, 1] / counts.sum(axis=1)
+        trees.append(_sklearn_tree(estimator, proba))
+    return _pack(trees, model.n_features_in_, aggregation="mean", link="identity",
+                 input_dtype="float32", source="RandomForestClassifier")
+
+
+def _compile_gradient_boosting(model):
+    if model.loss not in ("log_loss", "deviance") or len(model.classes_) != 2:
+        raise ValueError("Apenas GradientBoosting binário com log_loss é suportado.")
+    trees = []
+    for stage in model.estimators_:
+        estimator = stage[0]
+        trees.append(_sklearn_tree(estimator, estimator.tree_.value[:, 0, 0] * model.learning_rate))
+    base = model._raw_predict_init(np.zeros((1, model.n_features_in_), dtype=np.float32))[0, 0]
+    return _pack(trees, model.n_features_in_, aggregation="sum", link="sigmoid",
+                 base_score=base, input_dtype="float32", source="GradientBoostingClassifier")
+
+
+def _compile_xgboost(model):
+    booster = model.get_booster()
+    raw = json.loads(booster.save_raw("json"))
+    learner = raw["learner"]
+
+    if learner["objective"]["name"] != "binary:logistic":
+        raise ValueError("Apenas XGBoost com objective binary:logistic é suportado.")
+
+    gbm = learner["gradient_booster"]
+    if gbm.get("name", "gbtree") != "gbtree":
+        raise ValueError("Apenas o booster gbtree do XGBoost é suportado.")
+
+    trees_json = gbm["model"]["trees"]
+    per_iteration = int(gbm["model"]["gbtree_model_param"].get("num_parallel_tree", 1))
+    try:
+        trees_json = trees_json[:(model.best_iteration + 1) * per_iteration]
+    except AttributeError:
+        pass
+
+    trees = []
+    for tree in trees_json:
+        if any(tree.get("split_type", [])):
+            raise ValueError("Splits categóricos do XGBoost não são suportados.")
+        trees.append({
+            "feature": tree["split_indices"],
+            "threshold": np.asarray(tree["split_conditions"], dtype=np.float32),
+            "left": tree["left_children"],
+            "right": tree["right_children"],
+            "value": tree["split_conditions"],
+            "default_left": tree["default_left"],
+        })
+
+    base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+    margin = np.log(base_score / (1.0 - base_score))
+    return _pack(trees, model.n_features_in_, aggregation="sum", link="sigmoid",
+                 base_score=margin, input_dtype="float32", strict=True, source="XGBClassifier")
+
+
+def _lightgbm_tree(structure):
+    feature, threshold, left, right, value, default_left = [], [], [], [], [], []
+
+    def visit(node):
+        i = len(left)
+        for column in (feature, threshold, left, right, value, default_left):
+            column.append(0)
+        if "leaf_value" in node:
+            left[i] = right[i] = -1
+            value[i] = node["leaf_value"]
+            return i
+
+        if node["decision_type"] != "<=":
+            raise ValueError("Splits categóricos do LightGBM não são suportados.")
+        if node["missing_type"] == "Zero":
+            raise ValueError("LightGBM com zero_as_missing não é suportado.")
+
+        feature[i] = node["split_feature"]
+        threshold[i] = node["threshold"]
+        # missing_type None: NaN vira 0.0 e segue a comparação normal
+        if node["missing_type"] == "NaN":
+            default_left[i] = node["default_left"]
+        else:
+            default_left[i] = 0.0 <= node["threshold"]
+        left[i] = visit(node["left_child"])
+        right[i] = visit(node["right_child"])
+        return i
+
+    visit(structure)
+    return {"feature": feature, "threshold": threshold, "left": left,
+            "right": right, "value": value, "default_left": default_left}
+
+
+def _compile_lightgbm(model):
+    dump = model.booster_.dump_model()
+    objective = dump["objective"].split()
+    if objective[0] != "binary":
+        raise ValueError("Apenas LightGBM com objective binary é suportado.")
+    sigmoid = float(objective[1].split(":")[1]) if len(objective) > 1 else 1.0
+
+    trees = [_lightgbm_tree(info["tree_structure"]) for info in dump["tree_info"]]
+    aggregation = "mean" if dump.get("average_output") else "sum"
+    return _pack(trees, model.n_features_in_, aggregation=aggregation, link="sigmoid",
+                 sigmoid_scale=sigmoid, input_dtype="float64", source="LGBMClassifier")
+
+
+def compile_model(model):
+    """
+    Converte um ensemble de árvores treinado em CompiledEnsemble.
+    """
+    compilers = {
+        "RandomForestClassifier": _compile_random_forest,
+        "GradientBoostingClassifier": _compile_gradient_boosting,
+        "XGBClassifier": _compile_xgboost,
+        "LGBMClassifier": _compile_lightgbm,
+    }
+    name = type(model).__name__
+    if name not in compilers:
+        raise TypeError(f"Modelo não suportado pelo compilador de árvores: {name}")
+    return compilers[name](model)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_sha256(path: str = COMPILED_MODEL_PATH):
+    """
+    sha256 do pickle que gerou o .npz (None em arquivos antigos, sem o registro).
+    Compara conteúdo, não mtime: checkout e retreino no mesmo segundo não enganam.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        if "source_sha256" not in data.files:
+            return None
+        return str(data["source_sha256"]) or None
+
+
+def save_compiled_model(model_path="models/modelo_final.pkl", output_path=COMPILED_MODEL_PATH):
+    """
+    Compila o modelo salvo em model_path e grava o .npz ao lado dos pickles.
+    Retorna None quando o modelo não é um ensemble de árvores.
+    """
+    import joblib
+
+    model = joblib.load(model_path)
+    try:
+        compiled = compile_model(model)
+    except TypeError as e:
+        print(f"⚠️ Modelo não compilado: {e}")
+        return None
+    compiled.save(output_path, source_sha256=file_sha256(model_path))
+    return output_path
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    save_compiled_model(*args)
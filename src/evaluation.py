@@ -0,0 +1,158 @@
+"""
+Avaliação em uma passada: um único predict_proba (em blocos) sobre o teste
+e uma única ordenação dos scores; ROC, curva precision-recall, métricas em
+qualquer limiar e matriz de confusão saem das contagens acumuladas de
+verdadeiros e falsos positivos.
+
+Antes cada avaliação fazia predict e predict_proba (duas inferências
+completas) e quatro chamadas ao sklearn, cada uma percorrendo os rótulos
+de novo.
+
+O limiar padrão (0.5, estrito: positivo se score > limiar) é o do predict
+dos modelos, então recall, precision e matriz de confusão são os mesmos
+de antes; ROC-AUC e average precision são idênticos aos do sklearn.
+
+Uso:
+    metrics = evaluate(model, X_test, y_test)
+    metrics["roc_auc"], metrics["recall"], metrics["confusion_matrix"]
+    metrics["sweep"].at(0.3)           # métricas em outro limiar
+    metrics["sweep"].table()           # varredura completa de limiares
+"""
+
+import numpy as np
+import pandas as pd
+
+# Linhas por chamada de predict_proba (limita a memória temporária do modelo)
+EVAL_CHUNK = 65_536
+DEFAULT_THRESHOLD = 0.5
+
+# np.trapezoid só existe a partir do NumPy 2.0 (antes: np.trapz)
+_trapezoid = getattr(np, "trapezoid", None) or np.trapz
+
+
+def predict_scores(model, X, chunk_size: int = EVAL_CHUNK) -> np.ndarray:
+    """
+    Probabilidade da classe positiva, em blocos de chunk_size linhas.
+    """
+    scores = np.empty(len(X), dtype=np.float64)
+    for start in range(0, len(X), chunk_size):
+        scores[start:start + chunk_size] = model.predict_proba(X[start:start + chunk_size])[:, 1]
+    return scores
+
+
+class ThresholdSweep:
+    """
+    Contagens acumuladas por limiar distinto, do maior score para o menor:
+    com limiar thresholds[i], os positivos previstos são os scores >=
+    thresholds[i], com tps[i] verdadeiros e fps[i] falsos positivos.
+    """
+
+    def __init__(self, y_true, scores):
+        y_true = np.asarray(y_true).astype(bool, copy=False)
+        scores = np.asarray(scores, dtype=np.float64)
+
+        order = np.argsort(scores, kind="mergesort")[::-1]
+        sorted_scores = scores[order]
+        cum_tp = np.cumsum(y_true[order], dtype=np.int64)
+
+        # Último índice de cada score distinto
+        last = np.r_[np.flatnonzero(np.diff(sorted_scores)), len(scores) - 1]
+        self.thresholds = sorted_scores[last]
+        self.tps = cum_tp[last]
+        self.fps = last + 1 - self.tps
+        self.n_pos = int(cum_tp[-1]) if len(scores) else 0
+        self.n_neg = len(scores) - self.n_pos
+
+    def counts_at(self, threshold: float, strict: bool = True):
+        """
+        (tp, fp) prevendo positivo quando score > threshold (ou >= sem strict).
+        """
+        # thresholds é decrescente; conta quantos limiares distintos passam
+        descending = -self.thresholds
+        k = np.searchsorted(descending, -threshold, side="left" if strict else "right")
+        if k == 0:
+            return 0, 0
+        return int(self.tps[k - 1]), int(self.fps[k - 1])
+
+    def at(self, threshold: float = DEFAULT_THRESHOLD, strict: bool = True) -> dict:
+        tp, fp = self.counts_at(threshold, strict)
+        fn, tn = self.n_pos - tp, self.n_neg - fp
+        return {
+            "threshold": threshold,
+            "recall": tp / self.n_pos if self.n_pos else 0.0,
+            "precision": tp / (tp + fp) if tp + fp else 0.0,
+            "confusion_matrix": np.array([[tn, fp], [fn, tp]]),
+        }
+
+    def roc_curve(self):
+        """
+        (fpr, tpr, thresholds) como o roc_curve do sklearn sem
+        drop_intermediate: começa em (0, 0) com limiar infinito.
+        """
+        tps = np.r_[0, self.tps]
+        fps = np.r_[0, self.fps]
+        thresholds = np.r_[np.inf, self.thresholds]
+        fpr = fps / self.n_neg if self.n_neg else np.full(len(fps), np.nan)
+        tpr = tps / self.n_pos if self.n_pos else np.full(len(tps), np.nan)
+        return fpr, tpr, thresholds
+
+    def roc_auc(self) -> float:
+        if not self.n_pos or not self.n_neg:
+            return float("nan")
+        fpr, tpr, _ = self.roc_curve()
+        return float(_trapezoid(tpr, fpr))
+
+    def pr_curve(self):
+        """
+        (precision, recall, thresholds) por limiar distinto, do maior para o
+        menor score.
+        """
+        precision = self.tps / (self.tps + self.fps)
+        recall = self.tps / self.n_pos if self.n_pos else np.zeros(len(self.tps))
+        return precision, recall, self.thresholds
+
+    def average_precision(self) -> float:
+        precision, recall, _ = self.pr_curve()
+        return float(np.sum(np.diff(np.r_[0.0, recall]) * precision))
+
+    def table(self) -> pd.DataFrame:
+        """
+        Varredura completa: uma linha por limiar distinto.
+        """
+        precision, recall, _ = self.pr_curve()
+        return pd.DataFrame({
+            "threshold": self.thresholds,
+            "tp": self.tps,
+            "fp": self.fps,
+            "fn": self.n_pos - self.tps,
+            "tn": self.n_neg - self.fps,
+            "precision": precision,
+            "recall": recall,
+            "fpr": self.fps / self.n_neg if self.n_neg else np.nan,
+        })
+
+
+def evaluate_scores(y_true, scores, threshold: float = DEFAULT_THRESHOLD) -> dict:
+    """
+    Métricas a partir dos scores já calculados: ROC-AUC, average precision e,
+    no limiar, recall, precision e matriz de confusão; "sweep" traz as
+    curvas e a varredura de limiares.
+    """
+    sweep = ThresholdSweep(y_true, scores)
+    at = sweep.at(threshold)
+    return {
+        "roc_auc": sweep.roc_auc(),
+        "recall": at["recall"],
+        "precision": at["precision"],
+        "confusion_matrix": at["confusion_matrix"],
+        "average_precision": sweep.average_precision(),
+        "threshold": threshold,
+        "sweep": sweep,
+    }
+
+
+def evaluate(model, X, y_true, threshold: float = DEFAULT_THRESHOLD, chunk_size: int = EVAL_CHUNK) -> dict:
+    """
+    Uma passada de predict_proba sobre X e todas as métricas (ver evaluate_scores).
+    """
+    return evaluate_scores(y_true, predict_scores(model, X, chunk_size), threshold)
@@ -0,0 +1,207 @@
+"""
+Fusão do StandardScaler no modelo.
+
+O StandardScaler é uma transformação afim (x - média) / escala, então pode ser
+"dobrado" dentro do modelo uma única vez no carregamento:
+ - Regressão logística: coeficientes e intercepto são reescalados
+ - Modelos de árvore: os thresholds dos splits voltam para a escala original
+
+Com o modelo fundido, as features brutas vão direto para o predict_proba.
+
+t·s + m arredondado pode cair um ulp do lado errado do split (XGBoost e
+sklearn comparam em float32), então fold_thresholds procura a fronteira
+exata de cada split: todo valor bruto representável no dtype da comparação
+segue o mesmo ramo que seguia escalado.
+
+Uso:
+    from src.fusion import fuse_scaler
+    modelo_fundido = fuse_scaler(modelo, scaler)
+"""
+
+import copy
+import json
+
+import numpy as np
+
+
+def _scaler_arrays(scaler, n_features):
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+    return np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64)
+
+
+def _goes_left(x, t, mean, scale, dtype, strict):
+    """
+    Ramo do modelo original para o valor bruto x: o scaler roda em float64
+    e o motor da árvore converte o resultado para dtype antes de comparar.
+    """
+    with np.errstate(over="ignore"):
+        z = ((x.astype(np.float64) - mean) / scale).astype(dtype)
+    return z < t if strict else z <= t
+
+
+def _ordered(x, utype):
+    """
+    Inteiro com a mesma ordem dos floats (negativos invertidos; -0 == +0).
+    """
+    bits = x.view(utype).astype(np.uint64)
+    sign = np.uint64(1 << (utype.itemsize * 8 - 1))
+    magnitude = (bits & (sign - np.uint64(1))).astype(np.int64)
+    return np.where(bits & sign, -magnitude, magnitude)
+
+
+def _from_ordered(key, dtype, utype):
+    sign = np.uint64(1 << (utype.itemsize * 8 - 1))
+    bits = np.where(key < 0, np.abs(key).astype(np.uint64) | sign, key.astype(np.uint64))
+    return bits.astype(utype).view(dtype)
+
+
+def fold_thresholds(threshold, mean, scale, dtype=np.float64, strict=False):
+    """
+    Thresholds na escala bruta para splits "x <= t" (strict=False) ou
+    "x < t" (strict=True), com x convertido para dtype pelo motor da árvore.
+    mean e scale são os do scaler para a feature de cada split.
+
+    Busca binária (na ordem dos floats de dtype) pelo maior x que o modelo
+    original mandava para a esquerda; com strict o threshold é o valor
+    seguinte (np.nextafter). Exato para toda entrada representável em dtype.
+    """
+    dtype = np.dtype(dtype)
+    utype = np.dtype(f"uint{dtype.itemsize * 8}")
+    t = np.asarray(threshold, dtype=np.float64)
+    mean = np.broadcast_to(np.asarray(mean, dtype=np.float64), t.shape)
+    scale = np.broadcast_to(np.asarray(scale, dtype=np.float64), t.shape)
+    folded = t * scale + mean
+
+    idx = np.flatnonzero(np.isfinite(t))
+    t, mean, scale = t[idx], mean[idx], scale[idx]
+    largest = np.finfo(dtype).max
+
+    def left(key):
+        return _goes_left(_from_ordered(key, dtype, utype), t, mean, scale, dtype, strict)
+
+    # Invariante: lo vai para a esquerda, hi não
+    lo = np.full(idx.size, _ordered(np.array([-largest], dtype=dtype), utype)[0])
+    hi = np.full(idx.size, _ordered(np.array([largest], dtype=dtype), utype)[0])
+    everything_left = left(hi)
+    for _ in range(dtype.itemsize * 8 + 1):
+        mid = (lo >> 1) + (hi >> 1) + (lo & hi & 1)
+        goes_left = left(mid)
+        lo = np.where(goes_left, mid, lo)
+        hi = np.where(goes_left, hi, mid)
+
+    boundary = _from_ordered(np.where(everything_left, hi, lo), dtype, utype)
+    if strict:
+        boundary = np.nextafter(boundary, dtype.type(np.inf))
+    folded[idx] = boundary
+    return folded
+
+
+def _fuse_linear(model, mean, scale):
+    """
+    w·((x - m) / s) + b  ==  (w / s)·x + (b - Σ w·m / s)
+    """
+    coef = model.coef_ / scale
+    model.intercept_ = model.intercept_ - (coef * mean).sum(axis=1)
+    model.coef_ = coef
+    return model
+
+
+def _fuse_sklearn_tree(tree, mean, scale):
+    """
+    (x - m) / s <= t  ==  x <= t·s + m   (s > 0). Folhas têm feature < 0.
+    O sklearn converte X para float32 antes de comparar.
+    """
+    t = tree.tree_
+    split = t.feature >= 0
+    features = t.feature[split]
+    t.threshold[split] = fold_thresholds(t.threshold[split], mean[features], scale[features], np.float32)
+    return tree
+
+
+def _fuse_random_forest(model, mean, scale):
+    for estimator in model.estimators_:
+        _fuse_sklearn_tree(estimator, mean, scale)
+    return model
+
+
+def _fuse_gradient_boosting(model, mean, scale):
+    for stage in model.estimators_:
+        for estimator in stage:
+            _fuse_sklearn_tree(estimator, mean, scale)
+    return model
+
+
+def _fuse_xgboost(model, mean, scale):
+    booster = model.get_booster()
+    raw = json.loads(booster.save_raw("json"))
+
+    for tree in raw["learner"]["gradient_booster"]["model"]["trees"]:
+        left = np.asarray(tree["left_children"])
+        features = np.asarray(tree["split_indices"])
+        # O JSON traz o repr curto do float32: ler como float64 mudaria o valor
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32).astype(np.float64)
+        split = left != -1
+        # XGBoost: esquerda se x < threshold, com x e threshold em float32
+        conditions[split] = fold_thresholds(
+            conditions[split], mean[features[split]], scale[features[split]], np.float32, strict=True
+        )
+        tree["split_conditions"] = conditions.tolist()
+
+    booster.load_model(bytearray(json.dumps(raw), "utf-8"))
+    return model
+
+
+def _fuse_lightgbm(model, mean, scale):
+    import lightgbm as lgb
+
+    lines = model.booster_.model_to_string().split("\n")
+    split_features = None
+
+    for i, line in enumerate(lines):
+        if line.startswith("Tree="):
+            split_features = None
+        elif line.startswith("split_feature="):
+            split_features = np.array(line.split("=", 1)[1].split(), dtype=int)
+        elif line.startswith("threshold=") and split_features is not None:
+            thresholds = np.array(line.split("=", 1)[1].split(), dtype=np.float64)
+            # LightGBM compara x <= threshold em float64
+            thresholds = fold_thresholds(thresholds, mean[split_features], scale[split_features])
+            lines[i] = "threshold=" + " ".join(repr(float(v)) for v in thresholds)
+        elif line.startswith("decision_type=") and split_features is not None:
+            # bit 0 marca split categórico (threshold é índice, não valor)
+            if any(int(v) & 1 for v in line.split("=", 1)[1].split()):
+                raise ValueError("Splits categóricos do LightGBM não podem ser fundidos com o scaler.")
+
+    # tree_sizes guarda o tamanho em bytes de cada árvore; como os thresholds
+    # reescritos mudam esse tamanho, o LightGBM passa a ler as árvores em sequência
+    lines = [line for line in lines if not line.startswith("tree_sizes=")]
+    model._Booster = lgb.Booster(model_str="\n".join(lines))
+    return model
+
+
+def _fuse_compiled(model, mean, scale):
+    return model.fold_scaler(mean, scale)
+
+
+def fuse_scaler(model, scaler):
+    """
+    Retorna uma cópia do modelo que recebe as features brutas (sem scaler).
+    Modelos suportados: LogisticRegression, RandomForest, GradientBoosting,
+    XGBoost, LightGBM e CompiledEnsemble (src.compiled_trees).
+    """
+    name = type(model).__name__
+    fusers = {
+        "LogisticRegression": _fuse_linear,
+        "RandomForestClassifier": _fuse_random_forest,
+        "GradientBoostingClassifier": _fuse_gradient_boosting,
+        "XGBClassifier": _fuse_xgboost,
+        "LGBMClassifier": _fuse_lightgbm,
+        "CompiledEnsemble": _fuse_compiled,
+    }
+
+    if name not in fusers:
+        raise TypeError(f"Modelo não suportado para fusão com o scaler: {name}")
+
+    mean, scale = _scaler_arrays(scaler, model.n_features_in_)
+    return fusers[name](copy.deepcopy(model), mean, scale)
@@ -1,30 +1,299 @@
-import joblib
-import numpy as np
-import pandas as pd
+"""
+Caminho de serving: carrega uma versão do modelo e pontua transações.
+
+Este módulo fica fora do grafo de treino/relatórios (src.modeling, matplotlib,
+seaborn...) para a API subir rápido: no import só entram NumPy e o que é nosso.
+joblib, pandas e a biblioteca do modelo (sklearn, xgboost, lightgbm) só são
+importados quando uma versão é carregada ou um DataFrame é recebido.
+"""
+
 import json
-from src.modeling import select_best_model
+import os
+import threading
+import weakref
+from operator import itemgetter
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from src.fusion import fuse_scaler
+from src.compiled_trees import CompiledEnsemble, compile_model, file_sha256, source_sha256
+from src.model_registry import resolve_version
+from src import metrics
+from src.prediction_cache import PredictionCache
+from src.shared_model import export_shared_model, is_fresh, load_shared_model
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Versão ativa (ModelBundle). Trocada de uma vez só por activate_bundle: cada
+# chamada de pontuação lê _active uma única vez e usa só aquele bundle.
+_active = None
+_swap_lock = threading.Lock()
 
-# Variáveis globais (carregadas no startup)
+# Bundles substituídos que ainda têm requisições em andamento (referência fraca:
+# somem sozinhos quando a última requisição termina)
+_retired = weakref.WeakSet()
+
+# Espelhos da versão ativa, mantidos por compatibilidade
 model_final = None
 scaler = None
 feature_order = None
+fused_mode = False
+feature_index = None
+prediction_cache = None
+
+# Buffers de linha do caminho rápido, um por thread
+_row_buffers = threading.local()
+
+# Instrumentação: tempo por etapa de cada caminho e linhas por chamada
+STAGE_SECONDS = metrics.histogram(
+    "fraud_inference_stage_seconds", "Tempo de cada etapa da inferência", ("path", "stage")
+)
+BATCH_ROWS = metrics.histogram(
+    "fraud_inference_batch_rows", "Linhas pontuadas por chamada", ("path",), buckets=metrics.ROW_BUCKETS
+)
+_timers = {path: metrics.StageTimer(STAGE_SECONDS, path) for path in ("pipeline", "records", "row", "matrix")}
+_batch_rows = {path: BATCH_ROWS.labels(path) for path in ("pipeline", "records", "matrix")}
+
+
+class ModelBundle:
+    """
+    Tudo o que uma versão precisa para pontuar: modelo, scaler, ordem das
+    colunas e o estado pré-calculado do caminho rápido.
+    """
 
+    def __init__(self, version, model, scaler, feature_order, fused=False, metadata=None, fingerprint=None):
+        self.version = version
+        self.model = model
+        self.scaler = scaler
+        self.feature_order = feature_order
+        self.fused = fused
+        self.metadata = metadata or {}
+        self.fingerprint = fingerprint
+        self.cache = None
 
-def load_inference_assets():
+        # Caminho rápido: índice das features, extrator dos valores do dict e
+        # média/escala do scaler como arrays puros
+        self.feature_index = {name: i for i, name in enumerate(feature_order)}
+        self.feature_getter = itemgetter(*feature_order)
+
+        n_features = len(feature_order)
+        if fused:
+            self.scaler_mean = self.scaler_scale = None
+        else:
+            self.scaler_mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+            self.scaler_scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+
+    def warmup(self):
+        """
+        Uma previsão descartável para pagar a inicialização preguiçosa do modelo
+        antes de receber tráfego.
+        """
+        X = np.zeros((1, len(self.feature_order)))
+        if not self.fused:
+            X = (X - self.scaler_mean) / self.scaler_scale
+        self.model.predict_proba(X)
+
+
+def load_inference_assets(fused: bool = False,
+                          compiled: bool = False,
+                          cache_size: int = 0,
+                          cache_ttl: float = 60.0,
+                          version: str = None,
+                          shared: bool = False):
     """
     Carrega modelo, scaler e ordem das colunas uma única vez (startup da API).
+    Com fused=True o scaler é dobrado dentro do modelo (ver src.fusion) e a
+    inferência passa as features brutas direto para o modelo.
+    Com compiled=True usa o ensemble compilado em NumPy (ver src.compiled_trees)
+    no lugar do objeto da biblioteca.
+    Com cache_size > 0 liga o cache LRU/TTL de previsões; ele é esvaziado
+    sempre que modelo, scaler ou colunas carregados forem diferentes.
+    version escolhe a versão do registro (src.model_registry); None = a mais nova.
+    Com shared=True o modelo (em arrays) e o scaler são mapeados somente
+    leitura de arquivos .npy, compartilhados entre processos (ver src.shared_model).
+    Retorna o nome da versão carregada.
+    """
+    bundle = build_bundle(version, fused=fused, compiled=compiled, shared=shared)
+    activate_bundle(bundle, cache_size=cache_size, cache_ttl=cache_ttl)
+
+    print(f"✔ Modelo, scaler e colunas carregados com sucesso! (versão {bundle.version})")
+    return bundle.version
+
+
+def build_bundle(version: str = None, fused: bool = False, compiled: bool = False, shared: bool = False):
+    """
+    Monta e aquece uma versão sem tocar na versão ativa (pode rodar em
+    segundo plano enquanto a API atende com a versão atual).
+    """
+    paths = resolve_version(version)
+
+    print(f"🔄 Carregando modelo e scaler para inferência (versão {paths['version']})...")
+
+    order = read_feature_order(paths["feature_order_path"])
+
+    if shared:
+        model, scaler_obj = _load_shared_model(paths, fused)
+    else:
+        import joblib
+
+        if compiled:
+            model = _load_compiled_model(paths["model_path"], paths["compiled_path"])
+        else:
+            model = joblib.load(paths["model_path"])
+        scaler_obj = joblib.load(paths["scaler_path"])
+
+        if fused:
+            model = fuse_scaler(model, scaler_obj)
+            print("✔ Scaler fundido no modelo (modo fused)")
+
+    bundle = ModelBundle(
+        paths["version"],
+        model,
+        scaler_obj,
+        order,
+        fused=fused,
+        metadata=paths["metadata"],
+        fingerprint=_assets_fingerprint(
+            (paths["model_path"], paths["scaler_path"], paths["feature_order_path"]), fused, compiled or shared
+        )
+    )
+    bundle.warmup()
+    return bundle
+
+
+def activate_bundle(bundle: ModelBundle, cache_size: int = 0, cache_ttl: float = 60.0):
+    """
+    Troca a versão ativa de forma atômica. Requisições em andamento terminam
+    com o bundle antigo; ele é liberado quando a última delas acaba.
+    Retorna o nome da versão anterior (ou None).
+    """
+    global _active, model_final, scaler, feature_order, fused_mode, feature_index, prediction_cache
+
+    with _swap_lock:
+        previous = _active
+        bundle.cache = _cache_for(bundle, previous, cache_size, cache_ttl)
+
+        _active = bundle
+
+        model_final = bundle.model
+        scaler = bundle.scaler
+        feature_order = bundle.feature_order
+        fused_mode = bundle.fused
+        feature_index = bundle.feature_index
+        prediction_cache = bundle.cache
+
+        if previous is not None and previous is not bundle:
+            _retired.add(previous)
+
+    return None if previous is None else previous.version
+
+
+def active_bundle():
+    return _active
+
+
+def active_version():
+    return None if _active is None else _active.version
+
+
+def draining_versions():
+    """
+    Versões substituídas que ainda estão em memória (requisições em andamento).
+    """
+    return sorted(bundle.version for bundle in list(_retired) if bundle is not _active)
+
+
+def read_feature_order(path="models/feature_order.json"):
+    """
+    Lê a ordem das colunas usada no treino.
+    """
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _load_compiled_model(model_path, compiled_path):
+    """
+    Lê o .npz compilado se ele foi gerado a partir deste pickle (sha256
+    registrado no .npz); senão compila de novo e salva ao lado dos pickles.
+    """
+    import joblib
+
+    model_sha256 = file_sha256(model_path)
+    if os.path.exists(compiled_path) and source_sha256(compiled_path) == model_sha256:
+        print(f"✔ Usando modelo compilado: {compiled_path}")
+        return CompiledEnsemble.load(compiled_path)
+
+    print("🔧 Compilando modelo final para arrays NumPy...")
+    compiled = compile_model(joblib.load(model_path))
+    compiled.save(compiled_path, source_sha256=model_sha256)
+    return compiled
+
+
+def _load_shared_model(paths, fused):
+    """
+    Mapeia a exportação em arrays da versão; exporta antes se ela não
+    existir ou for de outro pickle/modo.
+    """
+    output_dir = paths["shared_path"] + ("-fused" if fused else "")
+    if not is_fresh(output_dir, paths["model_path"], paths["scaler_path"], fused):
+        print("🔧 Exportando modelo em arrays para memória compartilhada...")
+        export_shared_model(paths["model_path"], paths["scaler_path"], output_dir, fused=fused)
+
+    print(f"✔ Modelo mapeado em memória compartilhada: {output_dir}")
+    return load_shared_model(output_dir)
+
+
+def _assets_fingerprint(paths, fused, compiled):
+    """
+    Identidade dos artefatos carregados: tamanho e mtime dos arquivos + modo.
     """
-    global model_final, scaler, feature_order
+    files = []
+    for path in paths:
+        stat = os.stat(path)
+        files.append((path, stat.st_size, stat.st_mtime_ns))
+    return (tuple(files), fused, compiled)
 
-    print("🔄 Carregando modelo e scaler para inferência...")
 
-    model_final = joblib.load("models/modelo_final.pkl")
-    scaler = joblib.load("models/scaler.pkl")
+def _cache_for(bundle, previous, cache_size, cache_ttl):
+    """
+    Cache de previsões da nova versão. Com a mesma configuração e os mesmos
+    artefatos o cache da versão anterior continua valendo; com artefatos
+    diferentes a nova versão ganha um cache vazio (as requisições antigas em
+    andamento só escrevem no cache antigo).
+    """
+    if cache_size <= 0:
+        return None
+
+    cache = None if previous is None else previous.cache
+    if cache is None or cache.max_size != cache_size or cache.ttl_seconds != cache_ttl:
+        cache = PredictionCache(max_size=cache_size, ttl_seconds=cache_ttl)
+        cache.fingerprint = bundle.fingerprint
+        print(f"✔ Cache de previsões ligado ({cache_size} entradas, TTL {cache_ttl}s)")
+    elif cache.fingerprint != bundle.fingerprint:
+        cache = cache.renewed(bundle.fingerprint)
+        print("♻️ Modelo/scaler diferentes: cache de previsões invalidado")
+    return cache
+
+
+def cache_stats():
+    """
+    Contadores do cache de previsões (None se estiver desligado).
+    """
+    cache = None if _active is None else _active.cache
+    return None if cache is None else cache.stats()
 
-    with open("models/feature_order.json", "r") as f:
-        feature_order = json.load(f)
 
-    print("✔ Modelo, scaler e colunas carregados com sucesso!")
+def _row_buffer(n_features):
+    """
+    Linha contígua (1 x n_features) pré-alocada, uma por thread.
+    """
+    row = getattr(_row_buffers, "row", None)
+    if row is None or row.shape[1] != n_features:
+        row = np.empty((1, n_features), dtype=np.float64)
+        _row_buffers.row = row
+    return row
 
 
 def predict_pipeline(input_data):
@@ -32,44 +301,187 @@ def predict_pipeline(input_data):
     Pipeline unificado — aceita dict ou DataFrame.
     Usa SEMPRE o modelo carregado em memória.
     """
+    bundle = _active
 
-    # 1 — Converter para DataFrame
+    # 1 — Dict vira matriz direto (sem DataFrame); DataFrame segue abaixo
     if isinstance(input_data, dict):
-        df = pd.DataFrame([input_data])
-    else:
-        df = input_data.copy()
+        return predict_records([input_data])
+
+    timer = _timers["pipeline"].start()
+    df = input_data
 
-    # 2 — Ordenar colunas na ordem correta
-    df = df[feature_order]
+    # 2 — Ordenar colunas na ordem correta (cria um novo DataFrame, sem alterar a entrada)
+    df = df[bundle.feature_order]
+    timer.mark("reorder")
+    _observe_rows("pipeline", len(df))
 
-    # 3 — Aplicar scaler
-    X = scaler.transform(df)
+    # 3 e 4 com cache: só as linhas ausentes do cache vão para o modelo
+    if bundle.cache is not None:
+        X = df.to_numpy(dtype=np.float64)
+        timer.mark("to_numpy")
+        return _format_results(_score_cached(bundle, X, timer), timer)
+
+    # 3 — Aplicar scaler (no modo fused o modelo já recebe as features brutas)
+    if bundle.fused:
+        X = df.to_numpy(dtype=np.float64)
+    else:
+        X = bundle.scaler.transform(df)
+    timer.mark("scale")
 
     # 4 — Obter probabilidades (classe 1)
-    prob = model_final.predict_proba(X)[:, 1]
+    prob = bundle.model.predict_proba(X)[:, 1]
+    timer.mark("predict_proba")
+
+    # 5 e 6 — Classes finais e resposta formatada
+    return _format_results(prob, timer)
+
 
-    # 5 — Classes finais
+def _format_results(prob, timer=metrics.NULL_TIMER):
+    """
+    Converte o vetor de probabilidades na lista de respostas da API.
+    """
     classes = (prob >= 0.5).astype(int)
+    timer.mark("threshold")
 
-    # 6 — Formatando a resposta
-    return [
+    results = [
         {
-            "fraud_probability": float(prob[i]),
-            "prediction": int(classes[i])
+            "fraud_probability": p,
+            "prediction": c
         }
-        for i in range(len(df))
+        for p, c in zip(prob.tolist(), classes.tolist())
     ]
+    timer.mark("format")
+    return results
+
+
+def _observe_rows(path, n):
+    if metrics.ENABLED:
+        _batch_rows[path].observe(n)
+
+
+def predict_row(data: dict):
+    """
+    Caminho rápido para 1 transação, sem DataFrame: os valores do dict são
+    escritos direto numa linha NumPy pré-alocada, escalados em arrays puros
+    e enviados ao modelo.
+    """
+    bundle = _active
+    timer = _timers["row"].start()
+    row = _row_buffer(len(bundle.feature_order))
+
+    # 1 — Valores na ordem correta (KeyError se faltar feature, como no DataFrame)
+    row[0] = bundle.feature_getter(data)
+    timer.mark("extract")
+
+    # Cache: a chave é o vetor bruto, antes do scaler
+    cache = bundle.cache
+    key = prob = None
+    if cache is not None:
+        key = row.tobytes()
+        prob = cache.get(key)
+        timer.mark("cache_lookup")
+
+    if prob is None:
+        # 2 — Scaler como operação vetorial in-place
+        if not bundle.fused:
+            row -= bundle.scaler_mean
+            row /= bundle.scaler_scale
+            timer.mark("scale")
+
+        # 3 — Probabilidade e classe
+        prob = float(bundle.model.predict_proba(row)[0, 1])
+        timer.mark("predict_proba")
+        if cache is not None:
+            cache.put(key, prob)
+            timer.mark("cache_store")
+
+    return {
+        "fraud_probability": prob,
+        "prediction": int(prob >= 0.5)
+    }
 
 
 def predict_single_transaction(data: dict):
     """
     Aceita apenas 1 transação (dict)
     """
-    return predict_pipeline(data)[0]
+    return predict_row(data)
 
 
-def predict_batch(df: pd.DataFrame):
+def predict_batch(df: "pd.DataFrame"):
     """
     Aceita DataFrame com várias linhas
     """
     return predict_pipeline(df)
+
+
+def predict_records(records: list):
+    """
+    Aceita lista de transações (dicts) e pontua todas numa única chamada.
+    Os valores vão dos dicts direto para a matriz, sem passar por pandas.
+    """
+    bundle = _active
+    timer = _timers["records"].start()
+    X = _records_matrix(bundle, records)
+    timer.mark("build_matrix")
+    _observe_rows("records", len(records))
+    return _format_results(_score(bundle, X, timer), timer)
+
+
+def _records_matrix(bundle, records):
+    """
+    Matriz (n x n_features) na ordem de feature_order a partir de dicts
+    (KeyError se faltar feature, como no DataFrame).
+    """
+    getter = bundle.feature_getter
+    return np.array([getter(record) for record in records], dtype=np.float64).reshape(
+        len(records), len(bundle.feature_order)
+    )
+
+
+def score_matrix(X: np.ndarray):
+    """
+    Probabilidades de fraude para uma matriz (n x n_features) já na ordem de
+    feature_order, sem passar por DataFrame. O scaler é aplicado como operação
+    vetorial em arrays puros. Com o cache ligado, só as linhas ausentes
+    são pontuadas e o resultado volta na ordem original.
+    """
+    _observe_rows("matrix", len(X))
+    return _score(_active, X, _timers["matrix"].start())
+
+
+def _score(bundle, X: np.ndarray, timer):
+    if bundle.cache is None:
+        return _score_raw(bundle, X, timer)
+    return _score_cached(bundle, X, timer)
+
+
+def _score_cached(bundle, X: np.ndarray, timer=metrics.NULL_TIMER):
+    cache = bundle.cache
+    prob, missing, keys = cache.lookup_matrix(X)
+    timer.mark("cache_lookup")
+    if len(missing):
+        scored = _score_raw(bundle, np.asarray(X)[missing], timer)
+        prob[missing] = scored
+        cache.put_many([keys[i] for i in missing], scored.tolist())
+        timer.mark("cache_store")
+    return prob
+
+
+def _score_raw(bundle, X: np.ndarray, timer=metrics.NULL_TIMER):
+    if not bundle.fused:
+        X = (X - bundle.scaler_mean) / bundle.scaler_scale
+    timer.mark("scale")
+
+    prob = bundle.model.predict_proba(X)[:, 1]
+    timer.mark("predict_proba")
+    return prob
+
+
+def predict_matrix(X: np.ndarray):
+    """
+    Igual a score_matrix, mas no formato de resposta da API.
+    """
+    timer = _timers["matrix"].start()
+    _observe_rows("matrix", len(X))
+    return _format_results(_score(_active, X, timer), timer)
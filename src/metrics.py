@@ -0,0 +1,323 @@
+"""
+Métricas de latência e volume da inferência, em memória e baratas.
+
+ - Histogram: buckets fixos (escala log), soma e contagem; p50/p95/p99 são
+   estimados por interpolação dentro do bucket, como no Prometheus
+ - Counter: contador monotônico
+ - StageTimer: cronômetro por etapa; cada mark("etapa") registra o tempo
+   desde o mark anterior no histograma da etapa
+
+Tudo é registrado num registro global e exposto no formato texto do
+Prometheus por render_prometheus() (rota GET /metrics da API). Com
+configure(enabled=False) os timers viram no-op. Medições feitas em outro
+processo voltam ao registro do pai com drain() (no processo filho) e
+merge() (no pai).
+
+Uso:
+    STAGES = histogram("fraud_inference_stage_seconds", "Tempo por etapa", ("path", "stage"))
+    timer = StageTimer(STAGES, "pipeline").start()
+    ...
+    timer.mark("scale")
+"""
+
+import math
+import threading
+import time
+from bisect import bisect_left
+
+ENABLED = True
+
+# 1 µs até ~16 s, dobrando a cada bucket
+LATENCY_BUCKETS = tuple(1e-6 * 2 ** i for i in range(25))
+
+# Linhas por chamada: 1, 2, 4, ... 1M
+ROW_BUCKETS = tuple(float(2 ** i) for i in range(21))
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def configure(enabled: bool = True):
+    global ENABLED
+    ENABLED = enabled
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def clear(self):
+        with self._lock:
+            self.value = 0.0
+
+
+class Histogram:
+    """
+    observe() não usa lock: é o que fica no caminho quente de cada requisição
+    e o lock custaria mais que o resto da medição. Sob o GIL, uma troca de
+    thread no meio do incremento pode perder uma contagem, raro e aceitável
+    para monitoramento.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def clear(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimativa do quantil q (0..1) por interpolação linear no bucket.
+        """
+        counts = list(self.counts)
+        total = sum(counts)
+        if total == 0:
+            return math.nan
+
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class MetricFamily:
+    """
+    Métrica com labels: um Counter ou Histogram por combinação de valores.
+    """
+
+    def __init__(self, name, documentation, kind, labelnames=(), buckets=None):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    if len(values) != len(self.labelnames):
+                        raise ValueError(f"{self.name} espera os labels {self.labelnames}")
+                    child = Histogram(self.buckets) if self.kind == "histogram" else Counter()
+                    self._children[values] = child
+        return child
+
+    def children(self):
+        return sorted(self._children.items())
+
+    def clear(self):
+        # Zera no lugar: os cronômetros guardam referência aos filhos
+        for child in list(self._children.values()):
+            child.clear()
+
+
+def histogram(name, documentation, labelnames=(), buckets=LATENCY_BUCKETS) -> MetricFamily:
+    return _register(MetricFamily(name, documentation, "histogram", labelnames, buckets))
+
+
+def counter(name, documentation, labelnames=()) -> MetricFamily:
+    return _register(MetricFamily(name, documentation, "counter", labelnames))
+
+
+def _register(family):
+    with _registry_lock:
+        for existing in _registry:
+            if existing.name == family.name:
+                return existing
+        _registry.append(family)
+    return family
+
+
+def reset():
+    """
+    Zera todas as métricas registradas (útil em testes e benchmarks).
+    """
+    for family in list(_registry):
+        family.clear()
+
+
+def drain() -> list:
+    """
+    Retira do registro tudo que foi medido desde o último drain(): lista de
+    (nome, labels, contagens/valor, soma, total) pronta para picklar. Usado
+    nos processos do pool para devolver as medições junto com o resultado.
+    """
+    samples = []
+    for family in list(_registry):
+        for values, child in family.children():
+            if family.kind == "counter":
+                if child.value:
+                    samples.append((family.name, values, child.value, None, None))
+                    child.clear()
+            elif child.count:
+                samples.append((family.name, values, list(child.counts), child.sum, child.count))
+                child.clear()
+    return samples
+
+
+def merge(samples):
+    """
+    Soma ao registro local as medições devolvidas por drain() em outro processo.
+    """
+    families = {family.name: family for family in list(_registry)}
+    for name, values, counts, total_sum, total in samples:
+        family = families.get(name)
+        if family is None:
+            continue
+        child = family.labels(*values)
+        if family.kind == "counter":
+            child.inc(counts)
+            continue
+        for i, count in enumerate(counts):
+            child.counts[i] += count
+        child.sum += total_sum
+        child.count += total
+
+
+# ---------- Cronômetro por etapa ----------
+class _NullTimer:
+    def start(self):
+        return self
+
+    def mark(self, stage):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _RunningTimer:
+    __slots__ = ("_owner", "_histograms", "_last")
+
+    def __init__(self, owner):
+        self._owner = owner
+        self._histograms = owner._cache
+        self._last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            histogram = self._owner._stage(stage)
+        histogram.observe(now - self._last)
+        self._last = now
+
+
+class StageTimer:
+    """
+    Fábrica de cronômetros de um caminho (ex.: "pipeline"). start() devolve
+    um cronômetro novo, ou um no-op se as métricas estiverem desligadas.
+    """
+
+    def __init__(self, family: MetricFamily, *labels):
+        self._family = family
+        self._labels = labels
+        self._cache = {}
+
+    def _stage(self, stage):
+        child = self._cache.get(stage)
+        if child is None:
+            child = self._cache[stage] = self._family.labels(*self._labels, stage)
+        return child
+
+    def start(self):
+        if not ENABLED:
+            return NULL_TIMER
+        return _RunningTimer(self)
+
+
+# ---------- Exposição ----------
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+def render_prometheus() -> str:
+    """
+    Todas as métricas no formato texto de exposição do Prometheus (0.0.4).
+    """
+    lines = []
+    for family in list(_registry):
+        children = family.children()
+        lines.append(f"# HELP {family.name} {family.documentation}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+
+        for values, child in children:
+            if family.kind == "counter":
+                lines.append(f"{family.name}{_format_labels(family.labelnames, values)} {_format_value(child.value)}")
+                continue
+
+            counts = list(child.counts)
+            total, total_sum = sum(counts), child.sum
+            cumulative = 0
+            for bound, count in zip(child.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(family.labelnames, values, [("le", _format_value(bound))])
+                lines.append(f"{family.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(family.labelnames, values)
+            lines.append(f"{family.name}_sum{labels} {_format_value(total_sum)}")
+            lines.append(f"{family.name}_count{labels} {total}")
+
+    return "\n".join(lines) + "\n"
+
+
+def latency_summary() -> dict:
+    """
+    p50/p95/p99 (em ms) de todos os histogramas de latência, para leitura humana.
+    """
+    summary = {}
+    for family in list(_registry):
+        if family.kind != "histogram" or family.buckets is not LATENCY_BUCKETS:
+            continue
+        for values, child in family.children():
+            if child.count == 0:
+                continue
+            stats = child.summary()
+            key = "/".join(str(v) for v in values) or family.name
+            summary.setdefault(family.name, {})[key] = {
+                "count": stats["count"],
+                **{q: round(stats[q] * 1e3, 4) for q in ("p50", "p95", "p99")},
+            }
+    return summary
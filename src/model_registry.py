@@ -0,0 +1,183 @@
+"""
+Registro versionado dos artefatos de inferência.
+
+Cada versão é uma pasta imutável em models/registry/<versão>/ com tudo o que a
+API precisa para pontuar:
+ - modelo_final.pkl
+ - scaler.pkl
+ - feature_order.json
+ - modelo_final_compiled.npz (só para modelos de árvore)
+ - metadata.json (origem, data, hash do modelo, métricas)
+ - shared/ (arrays .npy para mmap, criados no primeiro load com shared=True)
+
+Sem nenhuma versão registrada, a API usa os arquivos soltos em models/
+(versão "legacy"), como antes.
+
+Uso:
+    python -m src.model_registry publish --metrics reports/metrics.json
+    python -m src.model_registry list
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+from datetime import datetime, timezone
+
+from src.compiled_trees import COMPILED_MODEL_PATH, save_compiled_model
+
+REGISTRY_DIR = "models/registry"
+LEGACY_VERSION = "legacy"
+
+MODEL_FILE = "modelo_final.pkl"
+SCALER_FILE = "scaler.pkl"
+FEATURE_ORDER_FILE = "feature_order.json"
+COMPILED_FILE = "modelo_final_compiled.npz"
+METADATA_FILE = "metadata.json"
+SHARED_DIR = "shared"
+
+_VERSION_PATTERN = re.compile(r"^v(\d+)$")
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_versions(registry_dir: str = None) -> list:
+    """
+    Versões publicadas, da mais antiga para a mais nova.
+    """
+    registry_dir = registry_dir or REGISTRY_DIR
+    if not os.path.isdir(registry_dir):
+        return []
+
+    versions = []
+    for name in os.listdir(registry_dir):
+        match = _VERSION_PATTERN.match(name)
+        if match and os.path.exists(os.path.join(registry_dir, name, METADATA_FILE)):
+            versions.append((int(match.group(1)), name))
+    return [name for _, name in sorted(versions)]
+
+
+def latest_version(registry_dir: str = None):
+    versions = list_versions(registry_dir)
+    return versions[-1] if versions else None
+
+
+def resolve_version(version: str = None, registry_dir: str = None) -> dict:
+    """
+    Caminhos e metadados de uma versão (None = a mais nova registrada,
+    ou "legacy" se o registro estiver vazio). Só aceita "legacy" ou vNNNN:
+    o nome nunca vira um caminho arbitrário (ValueError).
+    """
+    registry_dir = registry_dir or REGISTRY_DIR
+    if version is None:
+        version = latest_version(registry_dir) or LEGACY_VERSION
+    if version != LEGACY_VERSION and not _VERSION_PATTERN.match(version):
+        raise ValueError(f"Versão inválida: {version!r} (use {LEGACY_VERSION!r} ou v<número>)")
+
+    if version == LEGACY_VERSION:
+        return {
+            "version": LEGACY_VERSION,
+            "model_path": os.path.join("models", MODEL_FILE),
+            "scaler_path": os.path.join("models", SCALER_FILE),
+            "feature_order_path": os.path.join("models", FEATURE_ORDER_FILE),
+            "compiled_path": COMPILED_MODEL_PATH,
+            "shared_path": os.path.join("models", SHARED_DIR),
+            "metadata": {"version": LEGACY_VERSION},
+        }
+
+    folder = os.path.join(registry_dir, version)
+    metadata_path = os.path.join(folder, METADATA_FILE)
+    if not os.path.exists(metadata_path):
+        raise FileNotFoundError(f"Versão não encontrada no registro: {version}")
+
+    with open(metadata_path, "r") as f:
+        metadata = json.load(f)
+
+    return {
+        "version": version,
+        "model_path": os.path.join(folder, MODEL_FILE),
+        "scaler_path": os.path.join(folder, SCALER_FILE),
+        "feature_order_path": os.path.join(folder, FEATURE_ORDER_FILE),
+        "compiled_path": os.path.join(folder, COMPILED_FILE),
+        "shared_path": os.path.join(folder, SHARED_DIR),
+        "metadata": metadata,
+    }
+
+
+def publish_version(model_path: str = "models/modelo_final.pkl",
+                    scaler_path: str = "models/scaler.pkl",
+                    feature_order_path: str = "models/feature_order.json",
+                    metadata: dict = None,
+                    registry_dir: str = None) -> str:
+    """
+    Copia os artefatos para uma nova versão imutável e devolve o nome dela.
+    A pasta é montada num diretório temporário e renomeada no fim, então uma
+    versão pela metade nunca aparece no registro.
+    """
+    registry_dir = registry_dir or REGISTRY_DIR
+    os.makedirs(registry_dir, exist_ok=True)
+
+    versions = list_versions(registry_dir)
+    number = int(_VERSION_PATTERN.match(versions[-1]).group(1)) + 1 if versions else 1
+    version = f"v{number:04d}"
+
+    folder = os.path.join(registry_dir, version)
+    tmp_folder = folder + ".tmp"
+    shutil.rmtree(tmp_folder, ignore_errors=True)
+    os.makedirs(tmp_folder)
+
+    shutil.copy(model_path, os.path.join(tmp_folder, MODEL_FILE))
+    shutil.copy(scaler_path, os.path.join(tmp_folder, SCALER_FILE))
+    shutil.copy(feature_order_path, os.path.join(tmp_folder, FEATURE_ORDER_FILE))
+    save_compiled_model(os.path.join(tmp_folder, MODEL_FILE), os.path.join(tmp_folder, COMPILED_FILE))
+
+    info = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "source_model": model_path,
+        "model_sha256": _file_sha256(model_path),
+        "scaler_sha256": _file_sha256(scaler_path),
+    }
+    info.update(metadata or {})
+    with open(os.path.join(tmp_folder, METADATA_FILE), "w") as f:
+        json.dump(info, f, indent=2)
+
+    os.replace(tmp_folder, folder)
+    print(f"📦 Versão {version} publicada em {folder}")
+    return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registro versionado de modelos")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    publish = commands.add_parser("publish", help="Publica models/modelo_final.pkl como nova versão")
+    publish.add_argument("--model", default="models/modelo_final.pkl")
+    publish.add_argument("--scaler", default="models/scaler.pkl")
+    publish.add_argument("--feature-order", default="models/feature_order.json")
+    publish.add_argument("--metrics", help="JSON com métricas para guardar nos metadados")
+
+    commands.add_parser("list", help="Lista as versões registradas")
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        metadata = None
+        if args.metrics:
+            with open(args.metrics, "r") as f:
+                metadata = {"metrics": json.load(f)}
+        publish_version(args.model, args.scaler, args.feature_order, metadata)
+    else:
+        for version in list_versions():
+            print(version)
+
+
+if __name__ == "__main__":
+    main()
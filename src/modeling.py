@@ -4,23 +4,28 @@ from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 import os
 import joblib
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from xgboost import XGBClassifier
 from lightgbm import LGBMClassifier
-from sklearn.metrics import roc_auc_score,recall_score,precision_score,confusion_matrix
+from src.evaluation import evaluate
+from src.reporting import curve_figures, metric_figures, render_figures, save_metrics_table
 
-def load_processed_data(base_path="data/processed/"):
+def load_processed_data(base_path="data/processed/", mmap_mode=None):
+    """
+    Arrays do pré-processamento. Com mmap_mode="r" os .npy são mapeados
+    somente leitura em vez de copiados para a RAM: processos que leem os
+    mesmos arquivos (ex.: tuning em paralelo) compartilham as páginas do
+    page cache do sistema.
+    """
 
     path_xtrain = os.path.join(base_path, "X_train_bal.npy")
     path_ytrain = os.path.join(base_path, "y_train_bal.npy")
     path_xtest  = os.path.join(base_path, "X_test.npy")
     path_ytest  = os.path.join(base_path, "y_test.npy")
 
-    X_train = np.load(path_xtrain)
-    y_train = np.load(path_ytrain)
-    X_test  = np.load(path_xtest)
-    y_test  = np.load(path_ytest)
+    X_train = np.load(path_xtrain, mmap_mode=mmap_mode)
+    y_train = np.load(path_ytrain, mmap_mode=mmap_mode)
+    X_test  = np.load(path_xtest, mmap_mode=mmap_mode)
+    y_test  = np.load(path_ytest, mmap_mode=mmap_mode)
     
     return X_train, y_train, X_test, y_test
 
@@ -66,24 +71,38 @@ def train_lightgbm(X_train, y_train):
     model.fit(X_train, y_train)
     return model
 
-def build_metrics_dataframe(results: dict):
+# Nome do modelo → arquivo .pkl
+MODEL_PATHS = {
+    "Logistic Regression (Tuned)": "models/logistic_regression_tuned.pkl",
+    "Random Forest (Tuned)": "models/random_forest_tuned.pkl",
+    "Gradient Boosting (Tuned)": "models/gradient_boosting_tuned.pkl",
+    "XGBoost (Tuned)": "models/xgboost_tuned.pkl",
+    "LightGBM (Tuned)": "models/lightgbm_tuned.pkl"
+}
 
-    os.makedirs("reports", exist_ok=True)
 
+def build_metrics_dataframe(results: dict, formats=("xlsx",), cache=None):
+
+    df = metrics_dataframe(results)
+
+    # xlsx, csv e/ou parquet; arquivos com os mesmos valores não são regravados
+    save_metrics_table(df, "reports/model_metrics", formats, cache=cache)
+
+    return df
+
+
+def metrics_dataframe(results: dict):
     rows = []
     for model_name, metrics in results.items():
         rows.append({
             "model": model_name,
             "roc_auc": metrics["roc_auc"],
             "recall": metrics["recall"],
-            "precision": metrics["precision"]
+            "precision": metrics["precision"],
+            "average_precision": metrics.get("average_precision", np.nan)
         })
 
-    df = pd.DataFrame(rows)
-
-    df.to_excel("reports/model_metrics.xlsx", index=False)
-
-    return df
+    return pd.DataFrame(rows)
 
 def select_best_model(df_tuned):
 
@@ -102,16 +121,7 @@ def select_best_model(df_tuned):
     best_row = df_tuned.loc[df_tuned["composite_score"].idxmax()]
     best_model_name = best_row["model"]
 
-    # Mapeamento nome → arquivo .pkl
-    mapping = {
-        "Logistic Regression (Tuned)": "models/logistic_regression_tuned.pkl",
-        "Random Forest (Tuned)": "models/random_forest_tuned.pkl",
-        "Gradient Boosting (Tuned)": "models/gradient_boosting_tuned.pkl",
-        "XGBoost (Tuned)": "models/xgboost_tuned.pkl",
-        "LightGBM (Tuned)": "models/lightgbm_tuned.pkl"
-    }
-
-    best_model_path = mapping[best_model_name]
+    best_model_path = MODEL_PATHS[best_model_name]
 
     return {
         "best_model_name": best_model_name,
@@ -121,33 +131,31 @@ def select_best_model(df_tuned):
 
 
 
-def plot_model_metrics(df):
-    os.makedirs("reports/plots", exist_ok=True)
-    metrics = ['roc_auc', 'recall', 'precision']
-    for metric in metrics:
-        plt.figure(figsize=(12, 6))
-        sns.barplot(x=df.index.tolist(), y=df[metric])
-        plt.xlabel("Modelo")
-        plt.ylabel(metric.upper())
-        plt.title(f"{metric.upper()} — Comparação entre Modelos")
-        plt.tight_layout()
-        plt.savefig(f"reports/plots/{metric}_comparison.png")
-        plt.close()
+def plot_model_metrics(df, n_jobs=None):
+    """
+    Barras de ROC-AUC, recall e precision por modelo; só refaz as que mudaram.
+    """
+    return render_figures(metric_figures(df), "reports/plots", n_jobs)
+
+
+def plot_model_curves(results: dict, figures_dir="reports/plots", n_jobs=None):
+    """
+    Curvas ROC e precision-recall de todos os modelos, a partir da varredura
+    de limiares guardada na avaliação (sem nova inferência).
+    """
+    return render_figures(curve_figures(results), figures_dir, n_jobs)
 
 
 def evaluate_model(model, X_test, y_test):
-    y_pred = model.predict(X_test)
-    y_proba = model.predict_proba(X_test)[:, 1]
-    roc_auc = roc_auc_score(y_test, y_proba)
-    recall = recall_score(y_test, y_pred)
-    precision = precision_score(y_test, y_pred)
-    cm = confusion_matrix(y_test, y_pred)
+    metrics = evaluate(model, X_test, y_test)
 
     return {
-    "roc_auc": roc_auc,
-    "recall": recall,
-    "precision": precision,
-    "conf_matrix": cm
+    "roc_auc": metrics["roc_auc"],
+    "recall": metrics["recall"],
+    "precision": metrics["precision"],
+    "conf_matrix": metrics["confusion_matrix"],
+    "average_precision": metrics["average_precision"],
+    "sweep": metrics["sweep"]
     }
 
 def save_model(model, path):
@@ -0,0 +1,156 @@
+"""
+Busca aleatória para XGBoost e LightGBM reaproveitando os datasets
+quantizados entre candidatos.
+
+No RandomizedSearchCV cada candidato x fold entrega arrays float64 crus à
+biblioteca, que refaz os bins dos histogramas e o dataset interno do zero.
+Aqui os folds são calculados uma vez e cada fold vira um único dataset
+quantizado (QuantileDMatrix no XGBoost, lgb.Dataset no LightGBM), reusado
+por todos os candidatos com a mesma configuração de binning.
+
+Candidatos (ParameterSampler com a mesma semente), folds (StratifiedKFold)
+e métrica (ROC-AUC no fold de validação) são os do RandomizedSearchCV, e o
+melhor candidato é reajustado com o estimador sklearn da biblioteca, então
+o resultado é o mesmo da busca original.
+
+Uso:
+    best_params, best_score, best_model = native_random_search(
+        XGBClassifier(tree_method="hist"), param_grid, X, y, n_iter=5, cv=2)
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import ParameterSampler, StratifiedKFold
+from sklearn.utils.class_weight import compute_sample_weight
+
+from src.evaluation import ThresholdSweep
+
+# Parâmetros do sklearn wrapper do LightGBM que não vão para lgb.train
+_LGBM_SKIP = {"n_estimators", "class_weight", "importance_type", "objective"}
+
+# Parâmetros que mudam os bins (candidatos diferentes aqui não compartilham dataset)
+XGB_BINNING = ("max_bin", "max_cat_to_onehot", "enable_categorical")
+LGBM_BINNING = ("max_bin", "min_data_in_bin", "subsample_for_bin")
+
+
+def supports(model) -> bool:
+    return type(model).__name__ in ("XGBClassifier", "LGBMClassifier")
+
+
+class FoldDatasets:
+    """
+    Datasets quantizados por (fold, configuração de binning), criados sob
+    demanda uma única vez e compartilhados pelos candidatos.
+    """
+
+    def __init__(self, X, y, folds, kind):
+        self.X = np.ascontiguousarray(X)
+        self.y = np.asarray(y)
+        self.folds = folds
+        self.kind = kind
+        self.builds = 0
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def get(self, fold: int, binning: tuple, class_weight=None):
+        key = (fold, binning, repr(class_weight))
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = self._build(fold, dict(binning), class_weight)
+                self.builds += 1
+            return self._cache[key]
+
+    def _build(self, fold, binning, class_weight=None):
+        train_idx, val_idx = self.folds[fold]
+        X_train, y_train = self.X[train_idx], self.y[train_idx]
+        X_val, y_val = self.X[val_idx], self.y[val_idx]
+
+        if self.kind == "xgboost":
+            import xgboost
+
+            train = xgboost.QuantileDMatrix(X_train, y_train, **binning)
+            # A validação usa os mesmos cortes do treino (ref)
+            val = xgboost.QuantileDMatrix(X_val, y_val, ref=train, **binning)
+            return train, val, y_val
+
+        import lightgbm
+
+        params = {**binning, "feature_pre_filter": False, "verbose": -1}
+        # class_weight do LGBMClassifier vira peso por linha, como no fit do sklearn
+        weight = compute_sample_weight(class_weight, y_train) if class_weight is not None else None
+        train = lightgbm.Dataset(X_train, y_train, weight=weight, params=params, free_raw_data=False).construct()
+        return train, X_val, y_val
+
+
+def _xgb_fit_score(estimator, datasets, fold):
+    import xgboost
+
+    params = estimator.get_xgb_params()
+    binning = tuple(sorted((k, params[k]) for k in XGB_BINNING if params.get(k) is not None))
+    train, val, y_val = datasets.get(fold, binning)
+
+    booster = xgboost.train(params, train, num_boost_round=estimator.n_estimators)
+    return ThresholdSweep(y_val, booster.predict(val)).roc_auc()
+
+
+def lightgbm_params(estimator) -> dict:
+    """
+    Parâmetros do LGBMClassifier no formato do lgb.train (os nomes do
+    sklearn são aliases aceitos pela biblioteca).
+    """
+    params = {k: v for k, v in estimator.get_params().items() if v is not None and k not in _LGBM_SKIP}
+    params.update(objective="binary", verbose=-1)
+    return params
+
+
+def _lgbm_fit_score(estimator, datasets, fold):
+    import lightgbm
+
+    params = lightgbm_params(estimator)
+    binning = tuple(sorted((k, params[k]) for k in LGBM_BINNING if k in params))
+    train, X_val, y_val = datasets.get(fold, binning, estimator.class_weight)
+
+    booster = lightgbm.train(params, train, num_boost_round=estimator.n_estimators)
+    return ThresholdSweep(y_val, booster.predict(X_val)).roc_auc()
+
+
+def native_random_search(model, param_grid, X, y, n_iter, cv, n_jobs=1, random_state=42, verbose=1):
+    """
+    Equivalente ao RandomizedSearchCV(scoring="roc_auc", refit=True) com
+    datasets reaproveitados. n_jobs avalia candidatos x folds em paralelo
+    (threads; as bibliotecas liberam o GIL durante o treino).
+    Retorna (best_params, best_score, best_model, n_datasets).
+    """
+    kind = "xgboost" if type(model).__name__ == "XGBClassifier" else "lightgbm"
+    fit_score = _xgb_fit_score if kind == "xgboost" else _lgbm_fit_score
+
+    folds = list(StratifiedKFold(n_splits=cv).split(X, y))
+    datasets = FoldDatasets(X, y, folds, kind)
+    candidates = list(ParameterSampler(param_grid, n_iter, random_state=random_state))
+
+    if verbose:
+        print(f"Fitting {cv} folds for each of {len(candidates)} candidates, "
+              f"totalling {cv * len(candidates)} fits (datasets reaproveitados)")
+
+    tasks = [(i, fold) for i in range(len(candidates)) for fold in range(cv)]
+
+    def run(task):
+        i, fold = task
+        estimator = clone(model).set_params(**candidates[i])
+        return fit_score(estimator, datasets, fold)
+
+    with ThreadPoolExecutor(max_workers=max(1, n_jobs)) as executor:
+        scores = np.array(list(executor.map(run, tasks))).reshape(len(candidates), cv)
+
+    mean_scores = scores.mean(axis=1)
+    # Mesmo desempate do sklearn: o primeiro candidato com a melhor média
+    best = int(np.argmax(mean_scores))
+    best_params = candidates[best]
+
+    best_model = clone(model).set_params(**best_params)
+    best_model.fit(X, y)
+
+    return best_params, float(mean_scores[best]), best_model, datasets.builds
@@ -0,0 +1,344 @@
+"""
+Pipeline de treino em estágios com cache endereçado por conteúdo.
+
+Estágios: preprocess → tune (um por modelo) → evaluate → select → report.
+
+Cada estágio tem uma chave sha256 derivada das suas entradas:
+ - tune: fingerprint dos dados processados (manifesto do pré-processamento),
+   código da função de tuning (grid e configuração do modelo), sha256 dos
+   módulos que implementam a busca (src/tuning.py, src/native_search.py,
+   src/evaluation.py), constantes da busca, modo de busca, semente e
+   versões das bibliotecas
+ - evaluate/select/report: chaves dos estágios anteriores
+
+O resultado do tuning de cada modelo fica em models/cache/tune/<chave>.pkl;
+um modelo cuja chave já está no cache não é retunado. Os arquivos gerados
+(pickles, modelo final, tabela de métricas, gráficos, PDF) guardam em
+models/cache/outputs.json a chave que os produziu e só são reescritos
+quando ela muda. Mudou o grid de um modelo? Só ele é retunado e só os
+estágios que dependem dele são refeitos.
+
+Mudanças fora desses módulos (ex.: em sklearn/xgboost sem troca de versão)
+não entram na chave: nesse caso aumente CACHE_VERSION ou rode com --force.
+
+Uso:
+    python train_model.py                 # só o que mudou
+    python train_model.py --only xgb lgbm # retuna esses modelos
+    python train_model.py --force         # refaz tudo
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+
+import joblib
+
+from src import evaluation, native_search, tuning
+from src.preprocessing import (
+    MANIFEST_FILE,
+    PROCESSED_ARRAYS,
+    file_sha256,
+    preprocess_with_params,
+    read_manifest,
+)
+
+CACHE_DIR = "models/cache"
+OUTPUTS_FILE = "outputs.json"
+
+# Aumente para invalidar todo o cache (mudanças que a chave não enxerga)
+CACHE_VERSION = 3
+
+# Módulos cujo código decide o resultado do tuning além da função tune_*
+TUNING_MODULES = (tuning, native_search, evaluation)
+
+# Apelidos aceitos em --only
+MODEL_ALIASES = {
+    "lr": "Logistic Regression (Tuned)",
+    "rf": "Random Forest (Tuned)",
+    "gb": "Gradient Boosting (Tuned)",
+    "xgb": "XGBoost (Tuned)",
+    "lgbm": "LightGBM (Tuned)",
+}
+
+
+def stable_hash(value) -> str:
+    """
+    sha256 de um valor serializável em JSON (chaves ordenadas).
+    """
+    payload = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def library_versions() -> dict:
+    import lightgbm
+    import numpy
+    import sklearn
+    import xgboost
+
+    return {
+        "numpy": numpy.__version__,
+        "sklearn": sklearn.__version__,
+        "xgboost": xgboost.__version__,
+        "lightgbm": lightgbm.__version__,
+    }
+
+
+def data_fingerprint(base_path: str = "data/processed") -> str:
+    """
+    Identidade dos dados processados: o manifesto do pré-processamento
+    (hash do CSV, parâmetros e shapes) quando existe; senão o hash dos .npy.
+    """
+    manifest_path = os.path.join(base_path, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        manifest.pop("created_at", None)
+        return stable_hash(manifest)
+
+    return stable_hash({name: file_sha256(os.path.join(base_path, f"{name}.npy")) for name in PROCESSED_ARRAYS})
+
+
+def tuning_sources() -> dict:
+    """
+    sha256 do código-fonte dos módulos de busca (helpers, busca nativa,
+    métricas de avaliação), para que mudanças neles invalidem o tuning.
+    """
+    return {module.__name__: file_sha256(inspect.getsourcefile(module)) for module in TUNING_MODULES}
+
+
+def search_settings(search: str, class_weight=None) -> dict:
+    return {
+        "search": search,
+        "class_weight": class_weight,
+        "n_iter": tuning.N_ITER,
+        "cv_folds": tuning.CV_FOLDS,
+        "halving_candidates": tuning.HALVING_CANDIDATES,
+        "halving_factor": tuning.HALVING_FACTOR,
+        "early_stopping_rounds": tuning.EARLY_STOPPING_ROUNDS,
+        "validation_fraction": tuning.VALIDATION_FRACTION,
+        "seed": tuning.RANDOM_STATE,
+    }
+
+
+def tune_key(job, data_fp: str, search: str, class_weight=None) -> str:
+    return stable_hash({
+        "stage": "tune",
+        "cache_version": CACHE_VERSION,
+        "model": job.name,
+        "code": inspect.getsource(job.tune_fn),
+        "sources": tuning_sources(),
+        "settings": search_settings(search, class_weight),
+        "data": data_fp,
+        "versions": library_versions(),
+    })
+
+
+def resolve_models(names) -> set:
+    """
+    Nomes completos dos modelos a partir de nomes ou apelidos (lr, rf, gb, xgb, lgbm).
+    """
+    resolved = set()
+    for name in names:
+        full = MODEL_ALIASES.get(name.lower(), name)
+        if full not in MODEL_ALIASES.values():
+            raise ValueError(f"Modelo desconhecido: {name!r} (use {', '.join(MODEL_ALIASES)})")
+        resolved.add(full)
+    return resolved
+
+
+class ArtifactCache:
+    """
+    Resultados de estágios em <root>/<estágio>/<chave>.pkl e, em
+    <root>/outputs.json, a chave que produziu cada arquivo gerado.
+    """
+
+    def __init__(self, root: str = CACHE_DIR):
+        self.root = root
+        self._outputs_path = os.path.join(root, OUTPUTS_FILE)
+        self._outputs = {}
+        if os.path.exists(self._outputs_path):
+            with open(self._outputs_path, "r") as f:
+                self._outputs = json.load(f)
+
+    def path(self, stage: str, key: str) -> str:
+        return os.path.join(self.root, stage, f"{key}.pkl")
+
+    def load(self, stage: str, key: str):
+        path = self.path(stage, key)
+        return joblib.load(path) if os.path.exists(path) else None
+
+    def save(self, stage: str, key: str, value):
+        path = self.path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Escreve ao lado e troca: uma execução interrompida não deixa pickle pela metade
+        tmp = f"{path}.tmp"
+        joblib.dump(value, tmp)
+        os.replace(tmp, path)
+
+    def is_current(self, outputs, key: str) -> bool:
+        """
+        True se todos os arquivos existem e foram gerados com esta chave.
+        """
+        return all(os.path.exists(out) and self._outputs.get(out) == key for out in outputs)
+
+    def key(self, output: str):
+        """
+        Chave que gerou o arquivo (None se não registrado).
+        """
+        return self._outputs.get(output)
+
+    def mark(self, outputs, key: str):
+        for out in outputs:
+            self._outputs[out] = key
+        self._write_outputs()
+
+    def invalidate_outputs(self):
+        """
+        Esquece as chaves dos arquivos gerados: todos serão reescritos.
+        """
+        self._outputs = {}
+        self._write_outputs()
+
+    def _write_outputs(self):
+        os.makedirs(self.root, exist_ok=True)
+        with open(self._outputs_path, "w") as f:
+            json.dump(self._outputs, f, indent=2, sort_keys=True)
+
+
+def stage_preprocess(csv_path="data/raw/creditcard.csv", base_path="data/processed", force=False,
+                     balancing=None, sampling_ratio=None) -> str:
+    """
+    Pré-processa se houver CSV bruto e retorna o fingerprint dos dados
+    processados. Com manifesto, usa o modo e os parâmetros registrados nele
+    (--chunked, balanceamento, razão do SMOTE): o manifesto pula quando nada
+    mudou e um CSV novo é refeito do mesmo jeito. Sem manifesto, roda o
+    pré-processamento padrão em memória. `balancing`/`sampling_ratio`
+    trocam esses parâmetros (e refazem os dados se diferirem do manifesto).
+    """
+    if os.path.exists(csv_path):
+        manifest = read_manifest(base_path) or {}
+        params = dict(manifest.get("params", {}))
+        if balancing is not None:
+            params["balancing"] = balancing
+        if sampling_ratio is not None:
+            params["sampling_ratio"] = sampling_ratio
+        preprocess_with_params(csv_path, base_path, params, manifest.get("models_dir", "models"), force=force)
+    else:
+        print(f"ℹ {csv_path} não encontrado: usando os dados já processados em {base_path}")
+    return data_fingerprint(base_path)
+
+
+def stage_tune(data, data_fp: str, cache: ArtifactCache, jobs=None, rebuild=(), n_cores=None,
+               search="random", class_weight=None):
+    """
+    Resultados do tuning por modelo: do cache quando a chave bate, senão
+    tunados (em paralelo, via run_tuning) e guardados. `rebuild` força o
+    retuning dos modelos listados. Retorna (resultados, chaves, relatório
+    do tuning ou None se nada foi tunado).
+    """
+    from src.tuning_scheduler import DEFAULT_JOBS, run_tuning
+
+    jobs = jobs or DEFAULT_JOBS
+    keys = {job.name: tune_key(job, data_fp, search, class_weight) for job in jobs}
+
+    results, missing = {}, []
+    for job in jobs:
+        cached = None if job.name in rebuild else cache.load("tune", keys[job.name])
+        if cached is None:
+            missing.append(job)
+        else:
+            results[job.name] = cached
+            print(f"♻ {job.name}: tuning em cache ({keys[job.name][:12]})")
+
+    report = None
+    if missing:
+        tuned, report = run_tuning(*data, n_cores=n_cores, jobs=missing, search=search,
+                                    class_weight=class_weight)
+        for job in missing:
+            cache.save("tune", keys[job.name], tuned[job.name])
+            results[job.name] = tuned[job.name]
+
+    return {job.name: results[job.name] for job in jobs}, keys, report
+
+
+def stage_save_models(results, keys, cache: ArtifactCache, rebuild=(), paths=None):
+    """
+    Grava o pickle de cada modelo só quando a chave do tuning mudou (ou o
+    modelo foi retunado via `rebuild`).
+    """
+    from src.modeling import MODEL_PATHS, save_model
+
+    paths = paths or MODEL_PATHS
+    for name, result in results.items():
+        if name not in rebuild and cache.is_current([paths[name]], keys[name]):
+            continue
+        save_model(result["best_model"], paths[name])
+        cache.mark([paths[name]], keys[name])
+
+
+def stage_evaluate(results, keys):
+    """
+    Métricas de teste de cada modelo (calculadas no tuning e guardadas com
+    ele) e a chave do conjunto.
+    """
+    metrics = {name: result["final_metrics"] for name, result in results.items()}
+    return metrics, stable_hash({"stage": "evaluate", "tune": keys})
+
+
+def stage_select(df, keys, cache: ArtifactCache, rebuild=(), final_path="models/modelo_final.pkl"):
+    """
+    Escolhe o melhor modelo; cópia, versão compilada e publicação no
+    registro só acontecem quando o vencedor (ou o seu tuning) mudou ou foi
+    retunado via `rebuild`.
+    Retorna (info do melhor modelo, True se publicou nova versão).
+    """
+    from src.compiled_trees import save_compiled_model
+    from src.modeling import select_best_model
+
+    best = select_best_model(df)
+    key = stable_hash({"stage": "select", "model": best["best_model_name"],
+                       "tune": keys[best["best_model_name"]]})
+    if best["best_model_name"] not in rebuild and cache.is_current([final_path], key):
+        print(f"♻ Modelo final inalterado ({best['best_model_name']})")
+        return best, False
+
+    shutil.copy(best["best_model_path"], final_path)
+    print(f"✅ Modelo final salvo em {final_path}")
+    save_compiled_model(final_path)
+    cache.mark([final_path], key)
+    return best, True
+
+
+def stage_report(metrics, evaluate_key: str, cache: ArtifactCache, formats=("xlsx",), n_jobs=None):
+    """
+    Tabela de métricas (nos formatos pedidos), gráficos e PDF, refeitos só
+    quando as métricas mudaram. Dentro do estágio, cada figura e tabela tem
+    a própria chave (src.reporting): só as que mudaram são refeitas, e as
+    figuras em paralelo (n_jobs processos).
+    """
+    from src.modeling import build_metrics_dataframe, metrics_dataframe
+    from src.reporting import (DEFAULT_OUTPUT, FIGURES_DIR, METRICS_TABLE, curve_figures, generate_pdf_report,
+                               metric_figures, render_figures)
+
+    start = time.perf_counter()
+    df = metrics_dataframe(metrics)
+    # Só as figuras que serão de fato geradas (sem varredura de limiares, sem curvas)
+    figures = metric_figures(df) + curve_figures(metrics)
+    outputs = [f"{METRICS_TABLE}.{fmt}" for fmt in formats] + [DEFAULT_OUTPUT] + [
+        os.path.join(FIGURES_DIR, name) for name, _, _ in figures
+    ]
+    key = stable_hash({"stage": "report", "evaluate": evaluate_key, "formats": sorted(formats)})
+    if cache.is_current(outputs, key):
+        print("♻ Relatórios em dia")
+        return
+
+    # Chaves de cada figura/tabela/PDF: outro outputs.json, pois aqui os mesmos arquivos têm a chave do estágio
+    report_cache = ArtifactCache(os.path.join(cache.root, "report"))
+    df = build_metrics_dataframe(metrics, formats, cache=report_cache)
+    # Barras e curvas num único lote: todas as figuras pendentes em paralelo
+    render_figures(figures, FIGURES_DIR, n_jobs, cache=report_cache)
+    generate_pdf_report(df, build_started=start, cache=report_cache)
+    cache.mark(outputs, key)
@@ -0,0 +1,163 @@
+"""
+Cache de previsões em memória (LRU limitado por tamanho + TTL).
+
+A chave é o vetor de features bruto na ordem de feature_order.json, como
+bytes float64 (hash nativo do Python, sem colisão entre vetores diferentes).
+O valor é a probabilidade de fraude já calculada pelo modelo.
+
+Uso (normalmente via src.inference.load_inference_assets(cache_size=...)):
+    cache = PredictionCache(max_size=100_000, ttl_seconds=60)
+    prob = cache.get(chave)
+    cache.put(chave, prob)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    """
+    LRU com expiração, seguro para várias threads.
+    """
+
+    def __init__(self, max_size: int = 100_000, ttl_seconds: float = 60.0):
+        if max_size < 1:
+            raise ValueError("max_size deve ser >= 1")
+        if ttl_seconds <= 0:
+            raise ValueError("ttl_seconds deve ser > 0")
+
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.fingerprint = None
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def row_key(row: np.ndarray) -> bytes:
+        return np.ascontiguousarray(row, dtype=np.float64).tobytes()
+
+    def get(self, key: bytes):
+        """
+        Probabilidade guardada para a chave, ou None (ausente ou expirada).
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            prob, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return prob
+
+    def put(self, key: bytes, prob: float):
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (prob, expires_at)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def lookup_matrix(self, X: np.ndarray):
+        """
+        Consulta todas as linhas de X de uma vez.
+        Retorna (probabilidades com NaN nas faltantes, índices faltantes, chaves).
+        """
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        keys = [row.tobytes() for row in X]
+        prob = np.full(len(keys), np.nan)
+        missing = []
+
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries
+            for i, key in enumerate(keys):
+                entry = entries.get(key)
+                if entry is not None and entry[1] > now:
+                    entries.move_to_end(key)
+                    prob[i] = entry[0]
+                    continue
+                if entry is not None:
+                    del entries[key]
+                    self.expirations += 1
+                missing.append(i)
+
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        return prob, np.asarray(missing, dtype=np.intp), keys
+
+    def put_many(self, keys, probs):
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for key, prob in zip(keys, probs):
+                self._entries[key] = (prob, expires_at)
+                self._entries.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        # chamado com o lock já adquirido
+        overflow = len(self._entries) - self.max_size
+        for _ in range(max(overflow, 0)):
+            self._entries.popitem(last=False)
+        self.evictions += max(overflow, 0)
+
+    def clear(self, fingerprint=None):
+        """
+        Esvazia o cache (modelo ou scaler trocado) e registra a nova identidade.
+        """
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.fingerprint = fingerprint
+
+    def renewed(self, fingerprint):
+        """
+        Cache novo e vazio para outros artefatos, com a mesma configuração e os
+        contadores acumulados (a troca conta como uma invalidação).
+        """
+        cache = PredictionCache(self.max_size, self.ttl_seconds)
+        cache.fingerprint = fingerprint
+        with self._lock:
+            cache.hits = self.hits
+            cache.misses = self.misses
+            cache.evictions = self.evictions
+            cache.expirations = self.expirations
+            cache.invalidations = self.invalidations + 1
+        return cache
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
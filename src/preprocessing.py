@@ -1,17 +1,64 @@
+import argparse
+import datetime
+import hashlib
 import pandas as pd
 import numpy as np
 import os
 import joblib
 import json
+from joblib import Parallel, delayed
 from sklearn.model_selection import train_test_split
+from sklearn.neighbors import NearestNeighbors
 from sklearn.preprocessing import StandardScaler
 from imblearn.over_sampling import SMOTE
 
 
+TARGET = "Class"
+
+# Modo out-of-core: linhas por bloco lidas do CSV
+CHUNKSIZE = 200_000
+
+# Manifesto dos dados processados; mude a versão quando o pipeline mudar a saída
+MANIFEST_FILE = "manifest.json"
+PREPROCESSING_VERSION = 1
+PROCESSED_ARRAYS = ("X_train_bal", "y_train_bal", "X_test", "y_test")
+
+# Balanceamento do treino:
+#  - "smote": SMOTE do imblearn (original)
+#  - "smote_parallel": mesma interpolação do SMOTE gerada em blocos por
+#    threads direto no array de saída (sem as cópias do imblearn)
+#  - "weights": nenhuma linha sintética; o tuning compensa com
+#    class_weight/scale_pos_weight (ver src.tuning)
+# Nos modos SMOTE, sampling_ratio é a razão minoritária/majoritária final
+# (1.0 = paridade; 0.1 gera ~10x menos linhas sintéticas)
+BALANCING_MODES = ("smote", "smote_parallel", "weights")
+SMOTE_K_NEIGHBORS = 5
+# Linhas sintéticas por bloco no modo paralelo; fixo para o resultado não depender de n_jobs
+SMOTE_BLOCK = 32_768
+
+
 def load_data(path: str) -> pd.DataFrame:
     df = pd.read_csv(path)
     return df
 
+
+def csv_dtypes(path: str) -> dict:
+    """
+    Tipos explícitos para a leitura em blocos: features em float32, alvo em int8.
+    """
+    columns = pd.read_csv(path, nrows=0).columns
+    return {col: (np.int8 if col == TARGET else np.float32) for col in columns}
+
+
+def read_chunks(path: str, chunksize: int = CHUNKSIZE):
+    """
+    Lê o CSV em blocos de `chunksize` linhas; cada bloco vira (X float32, y int8).
+    """
+    dtypes = csv_dtypes(path)
+    features = [col for col in dtypes if col != TARGET]
+    for chunk in pd.read_csv(path, dtype=dtypes, chunksize=chunksize):
+        yield chunk[features].to_numpy(dtype=np.float32), chunk[TARGET].to_numpy(dtype=np.int8)
+
 def train_test_split_custom(X, y):
     return train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
 
@@ -21,11 +68,92 @@ def scale_features(X_train, X_test):
     X_test_scaled = scaler.transform(X_test)
     return X_train_scaled, X_test_scaled, scaler
 
-def balance_data_smote(X_train, y_train):
-    smote = SMOTE(random_state=42)
+def balance_data_smote(X_train, y_train, sampling_ratio=1.0):
+    smote = SMOTE(sampling_strategy=sampling_ratio, random_state=42)
     X_resampled, y_resampled = smote.fit_resample(X_train, y_train)
     return X_resampled, y_resampled
 
+
+def synthetic_count(y, sampling_ratio=1.0):
+    """
+    (rótulo minoritário, linhas sintéticas) para chegar à razão pedida.
+    """
+    counts = np.bincount(y, minlength=2)
+    minority_label = int(np.argmin(counts))
+    return minority_label, max(0, int(sampling_ratio * counts.max()) - int(counts.min()))
+
+
+def balance_data_smote_parallel(X_train, y_train, sampling_ratio=1.0, n_jobs=1, seed=42):
+    """
+    SMOTE com a interpolação do imblearn (ponto minoritário + passo
+    uniforme até um dos k vizinhos) gerada em blocos de SMOTE_BLOCK linhas,
+    em n_jobs threads, direto no array final: não há a cópia do treino nem
+    o vstack do imblearn. Os vizinhos (busca exata) também usam n_jobs.
+    """
+    X = np.asarray(X_train)
+    y = np.asarray(y_train)
+    minority_label, n_synthetic = synthetic_count(y, sampling_ratio)
+    minority = X[y == minority_label]
+
+    nn = NearestNeighbors(n_neighbors=SMOTE_K_NEIGHBORS + 1, n_jobs=n_jobs).fit(minority)
+    neighbors = nn.kneighbors(minority, return_distance=False)[:, 1:]
+
+    X_bal = np.empty((len(X) + n_synthetic, X.shape[1]), dtype=X.dtype)
+    X_bal[:len(X)] = X
+    y_bal = np.concatenate([y, np.full(n_synthetic, minority_label, dtype=y.dtype)])
+
+    def fill(block, start):
+        n = min(SMOTE_BLOCK, n_synthetic - start)
+        rng = np.random.default_rng([seed, block])
+        rows = rng.integers(0, len(minority), n)
+        cols = rng.integers(0, SMOTE_K_NEIGHBORS, n)
+        steps = rng.random((n, 1), dtype=np.float32 if X.dtype == np.float32 else np.float64)
+
+        out = X_bal[len(X) + start:len(X) + start + n]
+        np.subtract(minority[neighbors[rows, cols]], minority[rows], out=out)
+        out *= steps
+        out += minority[rows]
+
+    Parallel(n_jobs=n_jobs, prefer="threads")(
+        delayed(fill)(block, start) for block, start in enumerate(range(0, n_synthetic, SMOTE_BLOCK))
+    )
+    return X_bal, y_bal
+
+
+def balance_training_data(X_train, y_train, balancing="smote", sampling_ratio=1.0, n_jobs=1, seed=42):
+    """
+    Aplica o modo de balanceamento (BALANCING_MODES) ao treino escalado.
+    """
+    if balancing == "smote":
+        return balance_data_smote(X_train, y_train, sampling_ratio)
+    if balancing == "smote_parallel":
+        return balance_data_smote_parallel(X_train, y_train, sampling_ratio, n_jobs, seed)
+    if balancing == "weights":
+        return np.asarray(X_train), np.asarray(y_train)
+    raise ValueError(f"balancing deve ser um de {BALANCING_MODES}, recebeu {balancing!r}")
+
+
+def read_manifest(base_path: str = "data/processed"):
+    """
+    Manifesto dos dados processados (ver write_manifest), ou None se não existe.
+    """
+    manifest_path = os.path.join(base_path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r") as f:
+        return json.load(f)
+
+
+def balancing_mode(base_path: str = "data/processed") -> str:
+    """
+    Modo de balanceamento dos dados processados, lido do manifesto
+    ("smote" quando não há manifesto).
+    """
+    manifest = read_manifest(base_path)
+    if manifest is None:
+        return "smote"
+    return manifest["params"].get("balancing", "smote")
+
 ### Função para salvar os dados processados
 
 ''''Esta função cria automaticamente a pasta `data/processed/` e salva os arrays
@@ -54,25 +182,248 @@ def save_processed(X_train_bal, X_test, y_train_bal, y_test, base_path="data/pro
     for name, p in paths.items():
         print(f"   - {name}: {p}")
 
+def file_sha256(path: str, block_size: int = 8 * 1024 * 1024) -> str:
+    """
+    Hash do conteúdo do arquivo, lido em blocos (memória constante).
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _array_info(path: str) -> dict:
+    # mmap só lê o cabeçalho do .npy
+    array = np.load(path, mmap_mode="r")
+    return {"dtype": str(array.dtype), "shape": list(array.shape)}
+
+
+def write_manifest(base_path: str, raw_sha256: str, params: dict, models_dir: str = "models"):
+    """
+    Registra em base_path/manifest.json o que gerou os dados processados:
+    hash do CSV bruto, parâmetros, versão do pipeline e dtype/shape de cada array.
+    """
+    manifest = {
+        "raw_sha256": raw_sha256,
+        "params": params,
+        "version": PREPROCESSING_VERSION,
+        "arrays": {name: _array_info(os.path.join(base_path, f"{name}.npy")) for name in PROCESSED_ARRAYS},
+        "models_dir": str(models_dir),
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+    with open(os.path.join(base_path, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def cached_shapes(base_path: str, raw_sha256: str, params: dict, models_dir: str = "models"):
+    """
+    Shapes dos dados processados se o manifesto bate com a entrada e os
+    parâmetros atuais e todos os arquivos estão íntegros; senão None.
+    """
+    manifest = read_manifest(base_path)
+    if manifest is None:
+        return None
+
+    if (manifest.get("raw_sha256") != raw_sha256 or manifest.get("params") != params
+            or manifest.get("version") != PREPROCESSING_VERSION or manifest.get("models_dir") != str(models_dir)):
+        return None
+    for name in ("scaler.pkl", "feature_order.json"):
+        if not os.path.exists(os.path.join(models_dir, name)):
+            return None
+
+    shapes = {}
+    for name, info in manifest["arrays"].items():
+        path = os.path.join(base_path, f"{name}.npy")
+        try:
+            if _array_info(path) != info:
+                return None
+        except (OSError, ValueError):
+            return None
+        shapes[name] = tuple(info["shape"])
+    return shapes
+
+
+def _skip_if_cached(base_path, raw_sha256, params, models_dir, force):
+    if force:
+        return None
+    shapes = cached_shapes(base_path, raw_sha256, params, models_dir)
+    if shapes is not None:
+        print(f"✔ Dados processados em dia (entrada {raw_sha256[:12]}, mesmos parâmetros): pré-processamento pulado")
+    return shapes
+
+
 def save_scaler(scaler, path="models/scaler.pkl"):
     os.makedirs(os.path.dirname(path), exist_ok=True)
     joblib.dump(scaler, path)
     print("✔ Escalador salvo com sucesso em:", path)
 
-def preprocess_pipeline():
+def _test_mask(n_rows, chunk_index, test_size, seed):
+    """
+    Sorteio treino/teste por linha, reproduzível por bloco. Cada classe cai
+    no teste com a mesma probabilidade, então a proporção de fraudes fica a
+    mesma nos dois lados (estratificado em expectativa).
+    """
+    rng = np.random.default_rng([seed, chunk_index])
+    return rng.random(n_rows) < test_size
+
+
+def _smote_batches(minority, minority_label, majority_row, n_synthetic, batch_size, seed):
+    """
+    Amostras sintéticas do SMOTE em lotes de batch_size: os vizinhos vêm só
+    da classe minoritária, então cada lote precisa apenas dela em memória.
+    """
+    y_fit = np.r_[np.full(len(minority), minority_label), 1 - minority_label]
+    X_fit = np.vstack([minority, majority_row])
+
+    for b, start in enumerate(range(0, n_synthetic, batch_size)):
+        n = min(batch_size, n_synthetic - start)
+        smote = SMOTE(sampling_strategy={minority_label: len(minority) + n}, random_state=seed + b)
+        X_res, _ = smote.fit_resample(X_fit, y_fit)
+        # O imblearn acrescenta as amostras sintéticas no fim
+        yield X_res[-n:]
+
+
+def preprocess_out_of_core(csv_path="data/raw/creditcard.csv", base_path="data/processed",
+                           chunksize=CHUNKSIZE, test_size=0.2, seed=42, models_dir="models", force=False,
+                           balancing="smote", sampling_ratio=1.0):
+    """
+    Mesmo pipeline do preprocess_pipeline com memória limitada pelo tamanho
+    do bloco, para CSVs maiores que a RAM:
+
+     1ª leitura: divide treino/teste por sorteio e ajusta o StandardScaler
+        com partial_fit nas linhas de treino
+     2ª leitura: escala cada bloco e grava direto nos .npy de saída
+        (float32, abertos com open_memmap), guardando só as linhas de
+        treino da classe minoritária
+     SMOTE: gera as amostras sintéticas em lotes a partir da minoritária
+        (nenhuma com balancing="weights"; até sampling_ratio com razão < 1)
+
+    Os arquivos e o scaler são os mesmos do modo em memória (features em
+    float32). Se o manifesto mostra a mesma entrada e os mesmos parâmetros,
+    nada é refeito (force=True refaz). Retorna os shapes finais.
+    """
+    raw_sha256 = file_sha256(csv_path)
+    # O SMOTE aqui já é em lotes; smote_parallel é só do modo em memória
+    if balancing not in ("smote", "weights"):
+        raise ValueError(f"balancing deve ser 'smote' ou 'weights' no modo out-of-core, recebeu {balancing!r}")
+    params = {"mode": "out_of_core", "chunksize": chunksize, "test_size": test_size, "seed": seed,
+              "balancing": balancing, "sampling_ratio": sampling_ratio}
+    shapes = _skip_if_cached(base_path, raw_sha256, params, models_dir, force)
+    if shapes is not None:
+        return shapes
+
+    print(f"🚀 Pré-processamento out-of-core (blocos de {chunksize} linhas)...")
+    features = [col for col in csv_dtypes(csv_path) if col != TARGET]
+    os.makedirs(models_dir, exist_ok=True)
+    with open(os.path.join(models_dir, "feature_order.json"), "w") as f:
+        json.dump(features, f, indent=4)
+
+    # 1 — Divisão e ajuste incremental do scaler
+    scaler = StandardScaler()
+    n_test = 0
+    train_counts = np.zeros(2, dtype=np.int64)
+    for i, (X, y) in enumerate(read_chunks(csv_path, chunksize)):
+        test = _test_mask(len(y), i, test_size, seed)
+        if (~test).any():
+            scaler.partial_fit(X[~test])
+        train_counts += np.bincount(y[~test], minlength=2)
+        n_test += int(test.sum())
+    print(f"✔ Scaler ajustado; treino={train_counts.sum()} (classes {train_counts.tolist()}), teste={n_test}")
+    save_scaler(scaler, os.path.join(models_dir, "scaler.pkl"))
+
+    # 2 — Saídas pré-alocadas em disco; o treino já reserva espaço para o SMOTE
+    minority_label = int(np.argmin(train_counts))
+    n_synthetic = 0
+    if balancing != "weights":
+        n_synthetic = max(0, int(sampling_ratio * train_counts.max()) - int(train_counts.min()))
+    n_train = int(train_counts.sum())
+    n_features = len(features)
+
+    os.makedirs(base_path, exist_ok=True)
+    open_memmap = np.lib.format.open_memmap
+    X_train_bal = open_memmap(os.path.join(base_path, "X_train_bal.npy"), mode="w+",
+                              dtype=np.float32, shape=(n_train + n_synthetic, n_features))
+    y_train_bal = open_memmap(os.path.join(base_path, "y_train_bal.npy"), mode="w+",
+                              dtype=np.int64, shape=(n_train + n_synthetic,))
+    X_test = open_memmap(os.path.join(base_path, "X_test.npy"), mode="w+",
+                         dtype=np.float32, shape=(n_test, n_features))
+    y_test = open_memmap(os.path.join(base_path, "y_test.npy"), mode="w+",
+                         dtype=np.int64, shape=(n_test,))
+
+    minority = []
+    train_pos = test_pos = 0
+    for i, (X, y) in enumerate(read_chunks(csv_path, chunksize)):
+        test = _test_mask(len(y), i, test_size, seed)
+        X_scaled = scaler.transform(X).astype(np.float32, copy=False)
+
+        n = int((~test).sum())
+        X_train_bal[train_pos:train_pos + n] = X_scaled[~test]
+        y_train_bal[train_pos:train_pos + n] = y[~test]
+        train_pos += n
+
+        n = int(test.sum())
+        X_test[test_pos:test_pos + n] = X_scaled[test]
+        y_test[test_pos:test_pos + n] = y[test]
+        test_pos += n
+
+        minority.append(X_scaled[~test & (y == minority_label)])
+    print("✔ Dados divididos, escalados e gravados por bloco")
+
+    # 3 — SMOTE em lotes, gravado no fim do treino
+    minority = np.concatenate(minority)
+    majority_row = X_train_bal[int(np.argmax(y_train_bal[:n_train] != minority_label))]
+    for X_new in _smote_batches(minority, minority_label, majority_row, n_synthetic, chunksize, seed):
+        X_train_bal[train_pos:train_pos + len(X_new)] = X_new
+        y_train_bal[train_pos:train_pos + len(X_new)] = minority_label
+        train_pos += len(X_new)
+    print(f"✔ Dados balanceados ({balancing}, {n_synthetic} linhas sintéticas)")
+
+    shapes = {
+        "X_train_bal": X_train_bal.shape,
+        "y_train_bal": y_train_bal.shape,
+        "X_test": X_test.shape,
+        "y_test": y_test.shape
+    }
+    for array in (X_train_bal, y_train_bal, X_test, y_test):
+        array.flush()
+    del X_train_bal, y_train_bal, X_test, y_test
+    write_manifest(base_path, raw_sha256, params, models_dir)
+
+    print("✔ Dados processados salvos com sucesso em:", base_path)
+    print("\n📐 Shapes finais:")
+    for name, shape in shapes.items():
+        print(f"{name}:", shape)
+    return shapes
+
+
+def preprocess_pipeline(csv_path="data/raw/creditcard.csv", base_path="data/processed", models_dir="models",
+                        force=False, balancing="smote", sampling_ratio=1.0, n_jobs=1):
+    # 0 — Mesma entrada e mesmos parâmetros do manifesto: nada a refazer
+    # (n_jobs não muda a saída e fica fora do manifesto)
+    if balancing not in BALANCING_MODES:
+        raise ValueError(f"balancing deve ser um de {BALANCING_MODES}, recebeu {balancing!r}")
+    raw_sha256 = file_sha256(csv_path)
+    params = {"mode": "memory", "test_size": 0.2, "random_state": 42, "smote_random_state": 42,
+              "balancing": balancing, "sampling_ratio": sampling_ratio}
+    shapes = _skip_if_cached(base_path, raw_sha256, params, models_dir, force)
+    if shapes is not None:
+        return shapes
+
     print("🚀 Iniciando pipeline de pré-processamento...")
 
     # 1 — Carregar os dados (AGORA CERTO)
-    df = load_data("data/raw/creditcard.csv")
+    df = load_data(csv_path)
     print("✔ Dados carregados:", df.shape)
 
     # 2 — Separar X e y
     X = df.drop("Class", axis=1)
     y = df["Class"]
     feature_order = X.columns.tolist()
-    os.makedirs("models", exist_ok=True)
+    os.makedirs(models_dir, exist_ok=True)
 
-    with open("models/feature_order.json", "w") as f:
+    with open(os.path.join(models_dir, "feature_order.json"), "w") as f:
         json.dump(feature_order, f, indent=4)
     print("✔ X e y separados")
 
@@ -85,11 +436,11 @@ def preprocess_pipeline():
     print("✔ Dados escalados")
 
     # 5 - Salvar o escalador
-    save_scaler(scaler)
+    save_scaler(scaler, os.path.join(models_dir, "scaler.pkl"))
 
-    # 6 — Balancear com SMOTE
-    X_train_bal, y_train_bal = balance_data_smote(X_train_scaled, y_train)
-    print("✔ Dados balanceados com SMOTE")
+    # 6 — Balancear (SMOTE por padrão; "weights" mantém o treino original)
+    X_train_bal, y_train_bal = balance_training_data(X_train_scaled, y_train, balancing, sampling_ratio, n_jobs)
+    print(f"✔ Dados balanceados ({balancing}, {len(y_train_bal) - len(y_train)} linhas sintéticas)")
 
     # 7 — Salvar tudo (CAMINHO RELATIVO)
     save_processed(
@@ -97,8 +448,9 @@ def preprocess_pipeline():
         X_test_scaled, 
         y_train_bal, 
         y_test, 
-        base_path="data/processed"
+        base_path=base_path
     )
+    write_manifest(base_path, raw_sha256, params, models_dir)
 
     # 8 — Retornar shapes
     print("\n📐 Shapes finais:")
@@ -114,6 +466,42 @@ def preprocess_pipeline():
         "y_test": y_test.shape
     }
 
+def preprocess_with_params(csv_path, base_path, params: dict, models_dir="models", force=False):
+    """
+    Roda o pré-processamento no modo e com os parâmetros registrados num
+    manifesto (params): com a mesma entrada nada é refeito, e com um CSV novo
+    os dados são refeitos do mesmo jeito (out-of-core continua out-of-core,
+    o balanceamento escolhido continua o mesmo).
+    """
+    balancing = params.get("balancing", "smote")
+    sampling_ratio = params.get("sampling_ratio", 1.0)
+    if params.get("mode") == "out_of_core":
+        return preprocess_out_of_core(csv_path, base_path, chunksize=params["chunksize"],
+                                      test_size=params["test_size"], seed=params["seed"], models_dir=models_dir,
+                                      force=force, balancing=balancing, sampling_ratio=sampling_ratio)
+    return preprocess_pipeline(csv_path, base_path, models_dir, force=force, balancing=balancing,
+                               sampling_ratio=sampling_ratio)
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pré-processamento do dataset de fraude")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Out-of-core: leitura em blocos float32, memória limitada pelo bloco")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    parser.add_argument("--input", default="data/raw/creditcard.csv")
+    parser.add_argument("--force", action="store_true", help="Refaz mesmo com o manifesto em dia")
+    parser.add_argument("--balancing", choices=BALANCING_MODES, default="smote")
+    parser.add_argument("--sampling-ratio", type=float, default=1.0,
+                        help="Razão minoritária/majoritária após o SMOTE (1.0 = paridade)")
+    parser.add_argument("--n-jobs", type=int, default=1, help="Threads do modo smote_parallel")
+    args = parser.parse_args()
+
     print("Iniciando pipeline...")
-    preprocess_pipeline()
+    if args.chunked:
+        if args.balancing == "smote_parallel":
+            parser.error("--chunked já gera o SMOTE em lotes; use --balancing smote ou weights")
+        preprocess_out_of_core(args.input, chunksize=args.chunksize, force=args.force,
+                               balancing=args.balancing, sampling_ratio=args.sampling_ratio)
+    else:
+        preprocess_pipeline(args.input, force=args.force, balancing=args.balancing,
+                            sampling_ratio=args.sampling_ratio, n_jobs=args.n_jobs)
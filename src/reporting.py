@@ -5,10 +5,17 @@ Reporting module — gera um PDF profissional com:
  - Box com modelo escolhido
  - Gráficos (importados de reports/figures)
  - Conclusão automática
- - Rodapé com paginação
+ - Rodapé com paginação e tempo de montagem do relatório
+
+Geração incremental: cada figura, tabela de métricas e o PDF têm uma chave
+sha256 dos dados de entrada, guardada num ArtifactCache (src.pipeline) em
+models/cache/report/; o que não mudou não é refeito. As figuras pendentes são
+renderizadas em paralelo (processos com backend Agg, sem display). A tabela
+de métricas sai em xlsx, csv e/ou parquet (TABLE_FORMATS).
 
 Uso:
-    from src.reporting import generate_pdf_report
+    from src.reporting import generate_pdf_report, render_figures, metric_figures
+    render_figures(metric_figures(df_tuned))
     generate_pdf_report(df_tuned, model_name="XGBoost (Tuned)")
 """
 
@@ -20,9 +27,14 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from multiprocessing import get_context
 import os
 import glob
+import hashlib
+import pickle
+import time
 import pandas as pd
 from typing import Optional
 
@@ -31,6 +43,9 @@ DEFAULT_OUTPUT = "reports/model_report.pdf"
 FIGURES_DIR = "reports/plots"
 PAGE_WIDTH, PAGE_HEIGHT = A4
 AUTHOR_NAME = "Kayke Andrade"  # troque se quiser
+METRICS_TABLE = "reports/model_metrics"
+TABLE_FORMATS = ("xlsx", "csv", "parquet")
+REPORT_CACHE_DIR = "models/cache/report"
 
 # ---------- Helpers de estilo ----------
 styles = getSampleStyleSheet()
@@ -40,10 +55,154 @@ styles.add(ParagraphStyle(name="NormalSmall", fontSize=10, leading=12))
 styles.add(ParagraphStyle(name="TableHeader", fontSize=10, leading=12, alignment=1, textColor=colors.white))
 styles.add(ParagraphStyle(name="Footer", fontSize=8, leading=10, alignment=1, textColor=colors.grey))
 
+# ---------- Cache por conteúdo ----------
+def content_key(*parts) -> str:
+    """
+    sha256 das entradas de um artefato (valores, listas e arrays NumPy).
+    """
+    return hashlib.sha256(pickle.dumps(parts, protocol=4)).hexdigest()
+
+
+def _report_cache(cache=None):
+    """
+    Chaves dos arquivos do relatório (padrão: ArtifactCache em REPORT_CACHE_DIR,
+    separado do outputs.json do pipeline, que guarda a chave do estágio).
+    """
+    if cache is not None:
+        return cache
+    from src.pipeline import ArtifactCache
+
+    return ArtifactCache(REPORT_CACHE_DIR)
+
+
+# ---------- Figuras ----------
+def metric_figures(df: pd.DataFrame) -> list:
+    """
+    Especificações (arquivo, tipo, dados) dos gráficos de barras por métrica.
+    """
+    return [
+        (f"{metric}_comparison.png", "bar",
+         {"metric": metric, "models": df["model"].tolist(), "values": [float(v) for v in df[metric]]})
+        for metric in ("roc_auc", "recall", "precision")
+    ]
+
+
+def curve_figures(results: dict) -> list:
+    """
+    Especificações das curvas ROC e precision-recall, a partir da varredura
+    de limiares da avaliação (src.evaluation); vazio se não houver.
+    """
+    sweeps = {name: metrics["sweep"] for name, metrics in results.items() if "sweep" in metrics}
+    if not sweeps:
+        return []
+    roc = {name: sweep.roc_curve()[:2] + (sweep.roc_auc(),) for name, sweep in sweeps.items()}
+    pr = {name: sweep.pr_curve()[1::-1] + (sweep.average_precision(),) for name, sweep in sweeps.items()}
+    return [("roc_curves.png", "roc", roc), ("pr_curves.png", "pr", pr)]
+
+
+def _render_figure(kind: str, payload, path: str) -> str:
+    # Backend sem display: roda igual em servidor, CI e processos filhos
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=(12, 6))
+    if kind == "bar":
+        metric = payload["metric"]
+        sns.barplot(x=payload["models"], y=payload["values"])
+        plt.xlabel("Modelo")
+        plt.ylabel(metric.upper())
+        plt.title(f"{metric.upper()} — Comparação entre Modelos")
+    elif kind == "roc":
+        for name, (fpr, tpr, auc) in payload.items():
+            plt.plot(fpr, tpr, label=f"{name} (AUC {auc:.4f})")
+        plt.plot([0, 1], [0, 1], "k--", linewidth=0.8)
+        plt.xlabel("Taxa de falsos positivos")
+        plt.ylabel("Recall")
+        plt.title("Curvas ROC")
+        plt.legend(loc="lower right")
+    elif kind == "pr":
+        for name, (recall, precision, ap) in payload.items():
+            plt.plot(recall, precision, label=f"{name} (AP {ap:.4f})")
+        plt.xlabel("Recall")
+        plt.ylabel("Precision")
+        plt.title("Curvas Precision-Recall")
+        plt.legend(loc="lower left")
+    else:
+        raise ValueError(f"Tipo de figura desconhecido: {kind!r}")
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+    return path
+
+
+def render_figures(figures: list, figures_dir: str = FIGURES_DIR, n_jobs: Optional[int] = None,
+                   cache=None) -> list:
+    """
+    Renderiza só as figuras cujos dados mudaram, em até n_jobs processos
+    (padrão: uma por núcleo; 1 renderiza no próprio processo). Retorna os
+    caminhos de todas as figuras.
+    """
+    cache = _report_cache(cache)
+    os.makedirs(figures_dir, exist_ok=True)
+    pending = []
+    for name, kind, payload in figures:
+        path = os.path.join(figures_dir, name)
+        key = content_key(kind, payload)
+        if not cache.is_current([path], key):
+            pending.append((kind, payload, path, key))
+
+    n_jobs = min(len(pending), n_jobs or os.cpu_count() or 1)
+    if n_jobs <= 1:
+        for kind, payload, path, _ in pending:
+            _render_figure(kind, payload, path)
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=get_context("spawn")) as executor:
+            list(executor.map(_render_figure, *zip(*[(kind, payload, path) for kind, payload, path, _ in pending])))
+
+    for _, _, path, key in pending:
+        cache.mark([path], key)
+    print(f"✔ Figuras: {len(pending)} renderizada(s), {len(figures) - len(pending)} em dia")
+    return [os.path.join(figures_dir, name) for name, _, _ in figures]
+
+
+# ---------- Tabela de métricas ----------
+def save_metrics_table(df: pd.DataFrame, base_path: str = METRICS_TABLE, formats=("xlsx",), cache=None) -> list:
+    """
+    Grava a tabela em cada formato pedido (xlsx via openpyxl, csv, parquet
+    via pyarrow), pulando os arquivos gerados com os mesmos valores.
+    """
+    unknown = set(formats) - set(TABLE_FORMATS)
+    if unknown:
+        raise ValueError(f"Formatos de tabela desconhecidos: {sorted(unknown)} (use {TABLE_FORMATS})")
+
+    cache = _report_cache(cache)
+    os.makedirs(os.path.dirname(base_path) or ".", exist_ok=True)
+    key = content_key(df.to_dict("list"))
+    paths = []
+    for fmt in formats:
+        path = f"{base_path}.{fmt}"
+        paths.append(path)
+        if cache.is_current([path], key):
+            continue
+        if fmt == "xlsx":
+            df.to_excel(path, index=False)
+        elif fmt == "csv":
+            df.to_csv(path, index=False)
+        else:
+            df.to_parquet(path, index=False)
+        cache.mark([path], key)
+    return paths
+
+
 # ---------- Footer / Page numbering ----------
 def _footer(canvas_obj: canvas.Canvas, doc):
     canvas_obj.saveState()
     footer_text = f"Relatório gerado por {AUTHOR_NAME} — {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC"
+    build_seconds = getattr(doc, "build_seconds", None)
+    if build_seconds is not None:
+        footer_text += f" — montado em {build_seconds:.2f}s"
     page_num_text = f"Página {doc.page}"
     canvas_obj.setFont("Helvetica", 8)
     canvas_obj.setFillColor(colors.grey)
@@ -55,10 +214,13 @@ def _footer(canvas_obj: canvas.Canvas, doc):
 def build_metrics_table(df: pd.DataFrame):
     """
     Espera um DataFrame com colunas: model, roc_auc, recall, precision
+    (average_precision opcional, vira a coluna "Avg Precision").
     Retorna um reportlab Table com estilo aplicado.
     """
+    with_ap = "average_precision" in df.columns
+
     # Cabeçalho
-    cols = ["Modelo", "ROC-AUC", "Recall", "Precision"]
+    cols = ["Modelo", "ROC-AUC", "Recall", "Precision"] + (["Avg Precision"] if with_ap else [])
     data = [cols]
 
     # Linhas formatadas
@@ -68,10 +230,12 @@ def build_metrics_table(df: pd.DataFrame):
             f"{row.get('roc_auc', 0):.4f}",
             f"{row.get('recall', 0):.4f}",
             f"{row.get('precision', 0):.4f}"
-        ])
+        ] + ([f"{row['average_precision']:.4f}"] if with_ap else []))
 
     # Largura das colunas (em mm convertidos para points)
     col_widths = [100 * mm, 30 * mm, 30 * mm, 30 * mm]
+    if with_ap:
+        col_widths = [76 * mm, 24 * mm, 24 * mm, 24 * mm, 26 * mm]
 
     table = Table(data, colWidths=col_widths, hAlign="LEFT")
 
@@ -125,14 +289,22 @@ def _collect_figures(figures_dir=FIGURES_DIR):
 def generate_pdf_report(metrics_df: pd.DataFrame,
                         model_name: Optional[str] = None,
                         figures_dir: str = FIGURES_DIR,
-                        output_path: str = DEFAULT_OUTPUT):
+                        output_path: str = DEFAULT_OUTPUT,
+                        build_started: Optional[float] = None,
+                        cache=None):
     """
     Gera o PDF completo.
     - metrics_df: DataFrame com colunas (model, roc_auc, recall, precision)
     - model_name: string opcional para destacar modelo final
     - figures_dir: pasta com .png (roc_auc_comparison.png, recall_comparison.png, etc)
     - output_path: caminho do PDF final
+    - build_started: time.perf_counter() do início do relatório (figuras e
+      tabelas); o rodapé mostra o tempo de montagem a partir dele
+
+    Não refaz o PDF se métricas, modelo e figuras são os mesmos da última geração.
     """
+    start = time.perf_counter() if build_started is None else build_started
+    cache = _report_cache(cache)
 
     # Garantir pastas
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
@@ -147,8 +319,16 @@ def generate_pdf_report(metrics_df: pd.DataFrame,
     for c in ["roc_auc", "recall", "precision"]:
         if c not in df.columns:
             df[c] = 0.0
-    # garantir ordem desejada
-    df = df[["model", "roc_auc", "recall", "precision"]]
+    # garantir ordem desejada (average precision quando a avaliação traz)
+    df = df[["model", "roc_auc", "recall", "precision"] + (["average_precision"] if "average_precision" in df.columns else [])]
+
+    # Mesmas métricas, modelo e figuras: o PDF atual continua valendo
+    figures = _collect_figures(figures_dir)
+    figure_keys = {os.path.basename(fig): cache.key(fig) for fig in figures}
+    key = content_key(df.to_dict("list"), model_name, figure_keys)
+    if cache.is_current([output_path], key):
+        print(f"✔ Relatório PDF em dia: {output_path}")
+        return output_path
 
     # Documento
     doc = SimpleDocTemplate(output_path, pagesize=A4,
@@ -210,7 +390,6 @@ def generate_pdf_report(metrics_df: pd.DataFrame,
     story.append(Paragraph("Gráficos comparativos", styles["Heading"]))
     story.append(Spacer(1, 8))
 
-    figures = _collect_figures(figures_dir)
     if not figures:
         story.append(Paragraph("Nenhum gráfico encontrado em reports/figures. Salve PNGs com nomes como 'roc_auc_comparison.png'.", styles["NormalSmall"]))
     else:
@@ -234,7 +413,10 @@ def generate_pdf_report(metrics_df: pd.DataFrame,
     story.append(Spacer(1, 12))
 
     # --- Rodapé final e build ---
+    # Tempo até a renderização do PDF (figuras, tabelas e montagem do conteúdo)
+    doc.build_seconds = time.perf_counter() - start
     doc.build(story, onFirstPage=_footer, onLaterPages=_footer)
+    cache.mark([output_path], key)
 
     print(f"✔ Relatório PDF salvo em: {output_path}")
     return output_path
@@ -0,0 +1,190 @@
+"""
+Modelo compartilhado entre processos via arquivos mapeados em memória.
+
+Com vários workers (uvicorn --workers N, executor "process", bulk scoring),
+cada um fazia joblib.load do pickle e guardava uma cópia privada do modelo.
+Aqui o modelo é exportado uma vez para arrays .npy soltos numa pasta e cada
+worker abre esses arrays com np.load(mmap_mode="r"): as páginas ficam no page
+cache do sistema operacional e são compartilhadas, somente leitura, por
+todos os processos.
+
+Formas suportadas:
+ - ensembles de árvores: arrays do CompiledEnsemble (src.compiled_trees)
+ - LogisticRegression: coeficientes e intercepto (LinearModel)
+O scaler vira dois arrays (média e escala), ou é dobrado no modelo com
+fused=True. Carregar não importa sklearn, xgboost nem lightgbm.
+
+Para memória compartilhada POSIX, basta exportar para uma pasta em /dev/shm.
+
+Uso:
+    export_shared_model("models/modelo_final.pkl", "models/scaler.pkl", "models/shared")
+    model, scaler = load_shared_model("models/shared")
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+from src.compiled_trees import CompiledEnsemble, compile_model
+from src.fusion import fuse_scaler
+
+SHARED_MODEL_DIR = "models/shared"
+META_FILE = "meta.json"
+
+
+class LinearModel:
+    """
+    Regressão logística binária em arrays puros: sigmoid(X·coef + intercepto).
+    """
+
+    def __init__(self, coef, intercept):
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.n_features_in_ = len(self.coef)
+        self.classes_ = np.array([0, 1])
+
+    @classmethod
+    def from_sklearn(cls, model):
+        if model.coef_.shape[0] != 1:
+            raise ValueError("Apenas regressão logística binária é suportada.")
+        return cls(model.coef_[0], model.intercept_[:1])
+
+    def arrays(self, derived=False):
+        return {"coef": self.coef, "intercept": self.intercept}
+
+    def _meta(self):
+        return {}
+
+    def decision_function(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef + self.intercept[0]
+
+    def predict_proba(self, X):
+        with np.errstate(over="ignore"):
+            prob = 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1.0 - prob, prob])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+
+class ScalerArrays:
+    """
+    StandardScaler reduzido a média e escala (mesma interface usada na inferência).
+    """
+
+    with_mean = True
+    with_std = True
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+def to_array_model(model):
+    """
+    Converte o modelo da biblioteca na forma em arrays (árvores ou linear).
+    """
+    if type(model).__name__ == "LogisticRegression":
+        return LinearModel.from_sklearn(model)
+    return compile_model(model)
+
+
+def export_shared_model(model_path: str, scaler_path: str, output_dir: str = SHARED_MODEL_DIR,
+                        fused: bool = False):
+    """
+    Grava o modelo (e o scaler, se não for fundido) como arrays .npy em
+    output_dir. A pasta é montada ao lado e renomeada no fim; se outro
+    processo exportou antes, a cópia dele é mantida.
+    """
+    import joblib
+
+    model = joblib.load(model_path)
+    scaler = joblib.load(scaler_path)
+
+    if fused:
+        model = fuse_scaler(model, scaler)
+    array_model = to_array_model(model)
+
+    tmp_dir = f"{output_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    arrays = dict(array_model.arrays(derived=True))
+    if not fused:
+        arrays["scaler_mean"] = scaler.mean_ if scaler.with_mean else np.zeros(array_model.n_features_in_)
+        arrays["scaler_scale"] = scaler.scale_ if scaler.with_std else np.ones(array_model.n_features_in_)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(array))
+
+    meta = {
+        "kind": type(array_model).__name__,
+        "fused": fused,
+        "arrays": sorted(arrays),
+        "model": array_model._meta(),
+        "source_model": model_path,
+        "source_mtime_ns": os.stat(model_path).st_mtime_ns,
+        # O scaler entra nos arrays (ou no modelo fundido): mudou, exporta de novo
+        "source_scaler": scaler_path,
+        "scaler_mtime_ns": os.stat(scaler_path).st_mtime_ns,
+    }
+    with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    try:
+        os.rename(tmp_dir, output_dir)
+    except OSError:
+        if is_fresh(output_dir, model_path, scaler_path, fused):
+            # Outro worker exportou ao mesmo tempo: fica a versão dele
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        else:
+            # Exportação antiga: sai de lado (quem já mapeou continua lendo)
+            old_dir = f"{output_dir}.old-{os.getpid()}"
+            os.rename(output_dir, old_dir)
+            os.rename(tmp_dir, output_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+    print(f"✔ Modelo exportado para memória compartilhada: {output_dir}")
+    return output_dir
+
+
+def is_fresh(output_dir: str, model_path: str, scaler_path: str, fused: bool) -> bool:
+    """
+    A exportação existe, tem o mesmo modo e é dos pickles atuais do modelo e do scaler?
+    """
+    meta_path = os.path.join(output_dir, META_FILE)
+    if not os.path.exists(meta_path):
+        return False
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+    return (meta["fused"] == fused
+            and meta["source_mtime_ns"] == os.stat(model_path).st_mtime_ns
+            and meta.get("scaler_mtime_ns") == os.stat(scaler_path).st_mtime_ns)
+
+
+def load_shared_model(output_dir: str = SHARED_MODEL_DIR, mmap_mode: str = "r"):
+    """
+    Abre a exportação com os arrays mapeados (somente leitura).
+    Retorna (modelo, scaler); scaler é None quando o modelo é fundido.
+    """
+    with open(os.path.join(output_dir, META_FILE), "r") as f:
+        meta = json.load(f)
+
+    arrays = {
+        name: np.load(os.path.join(output_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+        for name in meta["arrays"]
+    }
+    scaler_mean = arrays.pop("scaler_mean", None)
+    scaler_scale = arrays.pop("scaler_scale", None)
+
+    if meta["kind"] == "LinearModel":
+        model = LinearModel(**arrays)
+    else:
+        model = CompiledEnsemble(**arrays, **meta["model"])
+
+    scaler = None if meta["fused"] else ScalerArrays(scaler_mean, scaler_scale)
+    return model, scaler
@@ -1,18 +1,243 @@
+"""
+Tuning de hiperparâmetros dos modelos.
+
+Dois modos de busca (argumento search de cada tune_*):
+ - "random": RandomizedSearchCV com N_ITER candidatos, todos treinados por
+   inteiro em CV_FOLDS folds
+ - "halving": HalvingRandomSearchCV com HALVING_CANDIDATES candidatos; cada
+   rodada dá 3x mais recurso (amostras, ou árvores na Random Forest) ao
+   terço melhor, então candidatos ruins custam pouco e o mesmo orçamento
+   cobre bem mais do espaço de parâmetros
+
+Com early_stopping (padrão no modo halving), XGBoost, LightGBM e Gradient
+Boosting param de adicionar árvores quando a métrica num fold de validação
+para de melhorar por EARLY_STOPPING_ROUNDS rodadas; o n_estimators do grid
+vira só o teto.
+
+Na busca aleatória, XGBoost e LightGBM usam src.native_search: os folds
+são calculados uma vez e cada fold vira um único dataset quantizado,
+reaproveitado por todos os candidatos (reuse_datasets=False volta ao
+RandomizedSearchCV).
+
+Com class_weight="balanced" (dados pré-processados com balancing="weights",
+sem linhas sintéticas do SMOTE) cada modelo compensa o desbalanceamento:
+class_weight na Logistic Regression, Random Forest e LightGBM,
+scale_pos_weight no XGBoost e sample_weight no fit do Gradient Boosting.
+
+O dict retornado é o mesmo nos dois modos (best_params, best_cv_score,
+final_metrics, best_model); best_model é sempre o estimador da biblioteca.
+"""
+
 import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.model_selection import RandomizedSearchCV
-from sklearn.metrics import roc_auc_score, precision_score, recall_score, confusion_matrix
+from sklearn.model_selection import HalvingRandomSearchCV, RandomizedSearchCV, train_test_split
+from sklearn.utils.class_weight import compute_sample_weight
 from xgboost import XGBClassifier
 from lightgbm import LGBMClassifier
 
+from src import native_search
+from src.evaluation import evaluate
+
+# Busca aleatória: candidatos e folds por modelo (N_ITER * CV_FOLDS ajustes)
+N_ITER = 5
+CV_FOLDS = 2
+
+# Successive halving: candidatos iniciais e fator de redução por rodada
+HALVING_CANDIDATES = 24
+HALVING_FACTOR = 3
+
+# Early stopping: rodadas sem melhora e fração do treino usada como validação
+EARLY_STOPPING_ROUNDS = 20
+VALIDATION_FRACTION = 0.1
+
+SEARCH_MODES = ("random", "halving")
+
+# Semente das buscas (amostragem de candidatos)
+RANDOM_STATE = 42
+
 
 def subsample_data(X_train, y_train, frac=0.1):
+    """
+    Amostra aleatória (semente fixa) de frac das linhas. As primeiras linhas
+    não servem: o SMOTE acrescenta as sintéticas no fim, então elas nunca
+    entrariam no tuning.
+    """
     size = int(len(X_train) * frac)
-    return X_train[:size], y_train[:size]
+    rng = np.random.default_rng(RANDOM_STATE)
+    # Índices em ordem: leitura sequencial quando o treino é um memmap
+    index = np.sort(rng.choice(len(X_train), size=size, replace=False))
+    return X_train[index], y_train[index]
+
+
+class EarlyStoppingClassifier(ClassifierMixin, BaseEstimator):
+    """
+    Envolve XGBClassifier/LGBMClassifier para o early stopping funcionar
+    dentro da validação cruzada: cada fit separa a própria validação do fold
+    de treino (estratificada), em vez de um eval_set fixo para todos os folds.
+    """
+
+    def __init__(self, estimator, rounds=EARLY_STOPPING_ROUNDS, validation_fraction=VALIDATION_FRACTION,
+                 random_state=42):
+        self.estimator = estimator
+        self.rounds = rounds
+        self.validation_fraction = validation_fraction
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        X_fit, X_val, y_fit, y_val = train_test_split(
+            X, y, test_size=self.validation_fraction, stratify=y, random_state=self.random_state
+        )
+        model = clone(self.estimator)
+
+        if isinstance(model, XGBClassifier):
+            model.set_params(early_stopping_rounds=self.rounds)
+            model.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False)
+        else:
+            import lightgbm
+
+            model.fit(X_fit, y_fit, eval_set=[(X_val, y_val)],
+                      callbacks=[lightgbm.early_stopping(self.rounds, verbose=False)])
+
+        self.estimator_ = model
+        self.classes_ = model.classes_
+        return self
+
+    def predict_proba(self, X):
+        return self.estimator_.predict_proba(X)
+
+    def predict(self, X):
+        return self.estimator_.predict(X)
+
+
+def boosting_rounds(model) -> int:
+    """
+    Árvores efetivamente usadas por um modelo de boosting após o early stopping.
+    """
+    if isinstance(model, XGBClassifier):
+        best = getattr(model, "best_iteration", None)
+        return model.n_estimators if best is None else best + 1
+    if isinstance(model, LGBMClassifier):
+        return model.best_iteration_ or model.n_estimators
+    return model.n_estimators_
+
+
+def _with_early_stopping(model, param_grid):
+    """
+    Tira n_estimators do grid (o maior valor vira o teto de árvores) e liga
+    o early stopping: nativo no GradientBoosting, pelo EarlyStoppingClassifier
+    no XGBoost/LightGBM. Retorna (modelo, grid).
+    """
+    param_grid = dict(param_grid)
+    max_rounds = max(param_grid.pop("n_estimators"))
+
+    if isinstance(model, GradientBoostingClassifier):
+        model.set_params(n_estimators=max_rounds, n_iter_no_change=EARLY_STOPPING_ROUNDS,
+                         validation_fraction=VALIDATION_FRACTION)
+        return model, param_grid
+
+    model.set_params(n_estimators=max_rounds)
+    return EarlyStoppingClassifier(model), {f"estimator__{k}": v for k, v in param_grid.items()}
+
+
+def _with_class_weight(model, y):
+    """
+    Pesos de classe "balanced" no modelo (ou no estimador envolvido pelo
+    early stopping). Retorna os parâmetros extras do fit: só o Gradient
+    Boosting, que não tem class_weight, recebe sample_weight.
+    """
+    target = model.estimator if isinstance(model, EarlyStoppingClassifier) else model
+    params = target.get_params()
+    if "class_weight" in params:
+        target.set_params(class_weight="balanced")
+        return {}
+    if "scale_pos_weight" in params:
+        # XGBoost: razão negativos/positivos
+        counts = np.bincount(np.asarray(y, dtype=np.int64), minlength=2)
+        target.set_params(scale_pos_weight=counts[0] / max(counts[1], 1))
+        return {}
+    return {"sample_weight": compute_sample_weight("balanced", y)}
+
+
+def _search_and_evaluate(model, param_grid, X_small, y_small, X_test, y_test, n_jobs=1,
+                         search="random", resource="n_samples", max_resources="auto", reuse_datasets=False,
+                         class_weight=None):
+    """
+    Busca de hiperparâmetros (n_jobs ajustes em paralelo) e métricas do melhor modelo no teste.
+    """
+    fit_params = _with_class_weight(model, y_small) if class_weight == "balanced" else {}
+
+    if search == "random" and reuse_datasets and native_search.supports(model):
+        # XGBoost/LightGBM: um dataset quantizado por fold para todos os candidatos
+        best_params, best_cv_score, best_model, _ = native_search.native_random_search(
+            model, param_grid, X_small, y_small, n_iter=N_ITER, cv=CV_FOLDS, n_jobs=n_jobs, random_state=RANDOM_STATE
+        )
+        return _evaluate(best_params, best_cv_score, best_model, X_test, y_test)
+
+    if search == "random":
+        searcher = RandomizedSearchCV(
+            estimator=model,
+            param_distributions=param_grid,
+            scoring="roc_auc",
+            n_iter=N_ITER,
+            cv=CV_FOLDS,
+            n_jobs=n_jobs,
+            verbose=1,
+            random_state=RANDOM_STATE
+        )
+    elif search == "halving":
+        searcher = HalvingRandomSearchCV(
+            estimator=model,
+            param_distributions=param_grid,
+            scoring="roc_auc",
+            n_candidates=HALVING_CANDIDATES,
+            factor=HALVING_FACTOR,
+            resource=resource,
+            max_resources=max_resources,
+            min_resources="exhaust",
+            cv=CV_FOLDS,
+            n_jobs=n_jobs,
+            verbose=1,
+            random_state=RANDOM_STATE
+        )
+    else:
+        raise ValueError(f"search deve ser um de {SEARCH_MODES}, recebeu {search!r}")
+
+    searcher.fit(X_small, y_small, **fit_params)
+
+    best_model = searcher.best_estimator_
+    best_params = dict(searcher.best_params_)
+
+    # Early stopping: devolve o estimador da biblioteca e as árvores que ficaram
+    early_stopped = isinstance(model, EarlyStoppingClassifier) or getattr(model, "n_iter_no_change", None)
+    if isinstance(best_model, EarlyStoppingClassifier):
+        best_model = best_model.estimator_
+        best_params = {k.removeprefix("estimator__"): v for k, v in best_params.items()}
+    if early_stopped:
+        best_params["n_estimators"] = boosting_rounds(best_model)
+
+    return _evaluate(best_params, searcher.best_score_, best_model, X_test, y_test)
+
+
+def _evaluate(best_params, best_cv_score, best_model, X_test, y_test):
+    # Uma passada de predict_proba; métricas, curvas e varredura de limiares (src.evaluation)
+    return {
+        "best_params": best_params,
+        "best_cv_score": best_cv_score,
+        "final_metrics": evaluate(best_model, X_test, y_test),
+        "best_model": best_model
+    }
+
+
+def _early_stopping(early_stopping, search):
+    # Padrão: ligado no halving, desligado na busca aleatória (comportamento original)
+    return search == "halving" if early_stopping is None else early_stopping
 
 
-def tune_logistic_regression(X_train, y_train, X_test, y_test):
+def tune_logistic_regression(X_train, y_train, X_test, y_test, n_jobs=1, model_threads=1,
+                             search="random", early_stopping=None, class_weight=None):
 
     X_small, y_small = subsample_data(X_train, y_train)
 
@@ -24,46 +249,18 @@ def tune_logistic_regression(X_train, y_train, X_test, y_test):
         "solver": ["lbfgs"],
     }
 
-    search = RandomizedSearchCV(
-        estimator=model,
-        param_distributions=param_grid,
-        scoring="roc_auc",
-        n_iter=5,
-        cv=2,
-        n_jobs=1,
-        verbose=1,
-        random_state=42
-    )
-
-    search.fit(X_small, y_small)
-
-    best_model = search.best_estimator_
-
-    y_pred = best_model.predict(X_test)
-    y_proba = best_model.predict_proba(X_test)[:, 1]
-
-    final_metrics = {
-        "roc_auc": roc_auc_score(y_test, y_proba),
-        "recall": recall_score(y_test, y_pred),
-        "precision": precision_score(y_test, y_pred),
-        "confusion_matrix": confusion_matrix(y_test, y_pred)
-    }
-
-    return {
-        "best_params": search.best_params_,
-        "best_cv_score": search.best_score_,
-        "final_metrics": final_metrics,
-        "best_model": best_model
-    }
+    return _search_and_evaluate(model, param_grid, X_small, y_small, X_test, y_test, n_jobs, search,
+                                class_weight=class_weight)
 
 
-def tune_random_forest(X_train, y_train, X_test, y_test):
+def tune_random_forest(X_train, y_train, X_test, y_test, n_jobs=1, model_threads=1,
+                       search="random", early_stopping=None, class_weight=None):
 
     X_small, y_small = subsample_data(X_train, y_train)
 
     model = RandomForestClassifier(
         random_state=42,
-        n_jobs=1
+        n_jobs=model_threads
     )
 
     param_grid = {
@@ -74,40 +271,18 @@ def tune_random_forest(X_train, y_train, X_test, y_test):
         "max_features": ["sqrt", "log2"]
     }
 
-    search = RandomizedSearchCV(
-        estimator=model,
-        param_distributions=param_grid,
-        scoring="roc_auc",
-        n_iter=5,
-        cv=2,
-        n_jobs=1,
-        verbose=1,
-        random_state=42
-    )
-
-    search.fit(X_small, y_small)
-
-    best_model = search.best_estimator_
-
-    y_pred = best_model.predict(X_test)
-    y_proba = best_model.predict_proba(X_test)[:, 1]
+    # No halving o recurso são as árvores: candidatos ruins são descartados com poucas
+    if search == "halving":
+        max_trees = max(param_grid.pop("n_estimators"))
+        return _search_and_evaluate(model, param_grid, X_small, y_small, X_test, y_test, n_jobs, search,
+                                    resource="n_estimators", max_resources=max_trees, class_weight=class_weight)
 
-    final_metrics = {
-        "roc_auc": roc_auc_score(y_test, y_proba),
-        "recall": recall_score(y_test, y_pred),
-        "precision": precision_score(y_test, y_pred),
-        "confusion_matrix": confusion_matrix(y_test, y_pred)
-    }
+    return _search_and_evaluate(model, param_grid, X_small, y_small, X_test, y_test, n_jobs, search,
+                                class_weight=class_weight)
 
-    return {
-        "best_params": search.best_params_,
-        "best_cv_score": search.best_score_,
-        "final_metrics": final_metrics,
-        "best_model": best_model
-    }
 
-
-def tune_gradient_boosting(X_train, y_train, X_test, y_test):
+def tune_gradient_boosting(X_train, y_train, X_test, y_test, n_jobs=1, model_threads=1,
+                           search="random", early_stopping=None, class_weight=None):
 
     X_small, y_small = subsample_data(X_train, y_train)
 
@@ -120,47 +295,22 @@ def tune_gradient_boosting(X_train, y_train, X_test, y_test):
         "subsample": [0.7, 1.0]
     }
 
-    search = RandomizedSearchCV(
-        estimator=model,
-        param_distributions=param_grid,
-        scoring="roc_auc",
-        n_iter=5,
-        cv=2,
-        n_jobs=1,
-        verbose=1,
-        random_state=42
-    )
-
-    search.fit(X_small, y_small)
-
-    best_model = search.best_estimator_
-
-    y_pred = best_model.predict(X_test)
-    y_proba = best_model.predict_proba(X_test)[:, 1]
-
-    final_metrics = {
-        "roc_auc": roc_auc_score(y_test, y_proba),
-        "recall": recall_score(y_test, y_pred),
-        "precision": precision_score(y_test, y_pred),
-        "confusion_matrix": confusion_matrix(y_test, y_pred)
-    }
+    if _early_stopping(early_stopping, search):
+        model, param_grid = _with_early_stopping(model, param_grid)
 
-    return {
-        "best_params": search.best_params_,
-        "best_cv_score": search.best_score_,
-        "final_metrics": final_metrics,
-        "best_model": best_model
-    }
+    return _search_and_evaluate(model, param_grid, X_small, y_small, X_test, y_test, n_jobs, search,
+                                class_weight=class_weight)
 
 
-def tune_XGboost(X_train, y_train, X_test, y_test):
+def tune_XGboost(X_train, y_train, X_test, y_test, n_jobs=1, model_threads=1,
+                 search="random", early_stopping=None, reuse_datasets=True, class_weight=None):
 
     X_small, y_small = subsample_data(X_train, y_train)
 
     model = XGBClassifier(
         eval_metric="logloss",
         tree_method="hist",
-        nthread=1,
+        nthread=model_threads,
         random_state=42,
         verbosity=0
     )
@@ -173,45 +323,20 @@ def tune_XGboost(X_train, y_train, X_test, y_test):
         "colsample_bytree": [0.7, 1.0]
     }
 
-    search = RandomizedSearchCV(
-        estimator=model,
-        param_distributions=param_grid,
-        scoring="roc_auc",
-        n_iter=5,
-        cv=2,
-        n_jobs=1,
-        verbose=1,
-        random_state=42
-    )
-
-    search.fit(X_small, y_small)
+    if _early_stopping(early_stopping, search):
+        model, param_grid = _with_early_stopping(model, param_grid)
 
-    best_model = search.best_estimator_
+    return _search_and_evaluate(model, param_grid, X_small, y_small, X_test, y_test, n_jobs, search,
+                                reuse_datasets=reuse_datasets, class_weight=class_weight)
 
-    y_pred = best_model.predict(X_test)
-    y_proba = best_model.predict_proba(X_test)[:, 1]
 
-    final_metrics = {
-        "roc_auc": roc_auc_score(y_test, y_proba),
-        "recall": recall_score(y_test, y_pred),
-        "precision": precision_score(y_test, y_pred),
-        "confusion_matrix": confusion_matrix(y_test, y_pred)
-    }
-
-    return {
-        "best_params": search.best_params_,
-        "best_cv_score": search.best_score_,
-        "final_metrics": final_metrics,
-        "best_model": best_model
-    }
-
-
-def tune_LightGBM(X_train, y_train, X_test, y_test):
+def tune_LightGBM(X_train, y_train, X_test, y_test, n_jobs=1, model_threads=1,
+                  search="random", early_stopping=None, reuse_datasets=True, class_weight=None):
 
     X_small, y_small = subsample_data(X_train, y_train)
 
     model = LGBMClassifier(
-        n_jobs=1,
+        n_jobs=model_threads,
         device="cpu",
         random_state=42
     )
@@ -224,34 +349,8 @@ def tune_LightGBM(X_train, y_train, X_test, y_test):
         "subsample": [0.7, 1.0]
     }
 
-    search = RandomizedSearchCV(
-        estimator=model,
-        param_distributions=param_grid,
-        scoring="roc_auc",
-        n_iter=5,
-        cv=2,
-        n_jobs=1,
-        verbose=1,
-        random_state=42
-    )
-
-    search.fit(X_small, y_small)
+    if _early_stopping(early_stopping, search):
+        model, param_grid = _with_early_stopping(model, param_grid)
 
-    best_model = search.best_estimator_
-
-    y_pred = best_model.predict(X_test)
-    y_proba = best_model.predict_proba(X_test)[:, 1]
-
-    final_metrics = {
-        "roc_auc": roc_auc_score(y_test, y_proba),
-        "recall": recall_score(y_test, y_pred),
-        "precision": precision_score(y_test, y_pred),
-        "confusion_matrix": confusion_matrix(y_test, y_pred)
-    }
-
-    return {
-        "best_params": search.best_params_,
-        "best_cv_score": search.best_score_,
-        "final_metrics": final_metrics,
-        "best_model": best_model
-    }
+    return _search_and_evaluate(model, param_grid, X_small, y_small, X_test, y_test, n_jobs, search,
+                                reuse_datasets=reuse_datasets, class_weight=class_weight)
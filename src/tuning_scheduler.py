@@ -0,0 +1,247 @@
+"""
+Tuning dos modelos em paralelo sob um orçamento global de núcleos.
+
+Cada modelo recebe uma fatia do orçamento proporcional ao custo esperado
+do seu tuning. A fatia de c núcleos é dividida entre:
+ - ajustes da busca em paralelo (n_jobs do RandomizedSearchCV), limitados
+   ao número de ajustes (N_ITER * CV_FOLDS)
+ - threads internas do estimador (xgboost, lightgbm, random forest), só
+   para modelos que as usam
+de modo que busca x threads nunca passe de c (sem oversubscription).
+
+Cada modelo roda num processo próprio; a busca usa o backend threading do
+joblib e as bibliotecas nativas (BLAS/OpenMP) ficam limitadas às threads
+do estimador, então todo o uso de CPU do modelo fica no processo e o tempo
+de CPU medido é completo. Um modelo só começa quando seus núcleos estão
+livres; os mais caros começam primeiro.
+
+Arrays carregados com load_processed_data(mmap_mode="r") vão para os
+processos como referência ao arquivo e são reabertos lá com mmap: todos
+os modelos leem as mesmas páginas do page cache em vez de cada processo
+receber uma cópia serializada dos dados.
+
+Uso:
+    results, report = run_tuning(X_train, y_train, X_test, y_test, n_cores=32)
+    print_tuning_report(report)
+"""
+
+import mmap
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+
+import numpy as np
+
+from src import tuning
+
+
+class TuningJob:
+    """
+    Um modelo a tunar: função de tuning, custo relativo esperado e se o
+    estimador usa threads internas.
+    """
+
+    def __init__(self, name, tune_fn, cost, threaded):
+        self.name = name
+        self.tune_fn = tune_fn
+        self.cost = cost
+        self.threaded = threaded
+
+    def __repr__(self):
+        return f"TuningJob({self.name!r})"
+
+
+# Custos relativos estimados de um tuning sequencial (n_jobs=1); só ordenam e dividem o orçamento
+DEFAULT_JOBS = [
+    TuningJob("Logistic Regression (Tuned)", tuning.tune_logistic_regression, cost=1, threaded=False),
+    TuningJob("Random Forest (Tuned)", tuning.tune_random_forest, cost=6, threaded=True),
+    TuningJob("Gradient Boosting (Tuned)", tuning.tune_gradient_boosting, cost=8, threaded=False),
+    TuningJob("XGBoost (Tuned)", tuning.tune_XGboost, cost=3, threaded=True),
+    TuningJob("LightGBM (Tuned)", tuning.tune_LightGBM, cost=2, threaded=True),
+]
+
+# Acima disso, mais threads por ajuste quase não aceleram com ~10% dos dados
+MAX_MODEL_THREADS = 8
+
+
+def split_cores(cores: int, n_fits: int, threaded: bool):
+    """
+    Divide `cores` em (ajustes paralelos, threads por ajuste) maximizando o
+    total usado; no empate, prefere mais ajustes (escala quase linear).
+    """
+    if not threaded:
+        return max(1, min(cores, n_fits)), 1
+
+    best = (1, 1)
+    for search_jobs in range(min(cores, n_fits), 0, -1):
+        threads = min(cores // search_jobs, MAX_MODEL_THREADS)
+        if search_jobs * threads > best[0] * best[1]:
+            best = (search_jobs, threads)
+    return best
+
+
+def max_useful_cores(job, n_fits):
+    return n_fits * (MAX_MODEL_THREADS if job.threaded else 1)
+
+
+def plan_cores(jobs, n_cores: int, n_fits: int = None):
+    """
+    Núcleos de cada modelo: proporcional ao custo, no mínimo 1, no máximo o
+    que o modelo consegue usar; sobras vão para quem ainda tem capacidade.
+    Retorna {nome: (núcleos, ajustes paralelos, threads por ajuste)}.
+    """
+    n_fits = n_fits or tuning.N_ITER * tuning.CV_FOLDS
+    total_cost = sum(job.cost for job in jobs)
+
+    cores = {}
+    for job in jobs:
+        share = int(n_cores * job.cost / total_cost)
+        cores[job.name] = max(1, min(share, max_useful_cores(job, n_fits), n_cores))
+
+    # O mínimo de 1 pode estourar o orçamento: tira dos maiores, se todos couberem juntos
+    while sum(cores.values()) > n_cores >= len(jobs):
+        largest = max(cores, key=cores.get)
+        cores[largest] -= 1
+
+    spare = n_cores - sum(cores.values())
+    for job in sorted(jobs, key=lambda j: j.cost, reverse=True):
+        if spare <= 0:
+            break
+        extra = min(spare, max_useful_cores(job, n_fits) - cores[job.name])
+        if extra > 0:
+            cores[job.name] += extra
+            spare -= extra
+
+    plan = {}
+    for job in jobs:
+        search_jobs, threads = split_cores(cores[job.name], n_fits, job.threaded)
+        plan[job.name] = (search_jobs * threads, search_jobs, threads)
+    return plan
+
+
+class MappedArray:
+    """
+    Referência picklável a um np.memmap somente leitura (arquivo, offset,
+    dtype, shape e ordem), reaberta no processo de destino.
+    """
+
+    def __init__(self, array: np.memmap):
+        self.filename = array.filename
+        self.offset = array.offset
+        self.dtype = array.dtype
+        self.shape = array.shape
+        self.order = "F" if array.flags.f_contiguous and not array.flags.c_contiguous else "C"
+
+    def open(self) -> np.memmap:
+        return np.memmap(self.filename, dtype=self.dtype, mode="r", offset=self.offset,
+                         shape=self.shape, order=self.order)
+
+
+def share_array(array):
+    """
+    MappedArray para um memmap que cobre o próprio arquivo mapeado; qualquer
+    outro array (inclusive fatias de memmap, cujo offset não é o do arquivo)
+    é devolvido como está e segue serializado.
+    """
+    if isinstance(array, np.memmap) and array.mode == "r" and isinstance(array.base, mmap.mmap):
+        return MappedArray(array)
+    return array
+
+
+def _open_array(array):
+    return array.open() if isinstance(array, MappedArray) else array
+
+
+def _run_job(tune_fn, data, search_jobs, threads, search, class_weight=None):
+    """
+    Executa um tuning medindo tempo de parede e de CPU (todas as threads do processo).
+    """
+    from joblib import parallel_config
+    from threadpoolctl import threadpool_limits
+
+    data = tuple(_open_array(array) for array in data)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    with threadpool_limits(limits=threads), parallel_config(backend="threading"):
+        result = tune_fn(*data, n_jobs=search_jobs, model_threads=threads, search=search,
+                         class_weight=class_weight)
+    return result, time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+
+def run_tuning(X_train, y_train, X_test, y_test, n_cores: int = None, jobs=None, search="random",
+               class_weight=None):
+    """
+    Tuna todos os modelos respeitando o orçamento de n_cores (padrão: todos
+    os núcleos). Retorna (resultados por modelo, relatório por modelo); os
+    resultados são os dicts das funções de src.tuning, na ordem de `jobs`.
+    search: "random" ou "halving"; class_weight="balanced" para dados sem
+    SMOTE (ver src.tuning).
+    """
+    jobs = jobs or DEFAULT_JOBS
+    n_cores = n_cores or os.cpu_count() or 1
+    # No halving a primeira rodada tem mais candidatos para paralelizar
+    n_candidates = tuning.HALVING_CANDIDATES if search == "halving" else tuning.N_ITER
+    plan = plan_cores(jobs, n_cores, n_candidates * tuning.CV_FOLDS)
+    data = tuple(share_array(array) for array in (X_train, y_train, X_test, y_test))
+
+    results, report = {}, {}
+    pending = sorted(jobs, key=lambda j: j.cost, reverse=True)
+    running = {}
+    free = n_cores
+    start = time.perf_counter()
+
+    print(f"⚙️ Tuning de {len(jobs)} modelos com {n_cores} núcleo(s), busca {search}")
+    with ProcessPoolExecutor(max_workers=len(jobs), mp_context=get_context("spawn")) as executor:
+        while pending or running:
+            # Primeiro que couber, na ordem de custo
+            for job in list(pending):
+                cores, search_jobs, threads = plan[job.name]
+                if cores <= free or not running:
+                    pending.remove(job)
+                    free -= cores
+                    future = executor.submit(_run_job, job.tune_fn, data, search_jobs, threads, search, class_weight)
+                    running[future] = job
+                    print(f"   ▶ {job.name}: {search_jobs} ajuste(s) x {threads} thread(s)")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = running.pop(future)
+                cores, search_jobs, threads = plan[job.name]
+                free += cores
+
+                result, wall, cpu = future.result()
+                results[job.name] = result
+                report[job.name] = {
+                    "cores": cores,
+                    "search_jobs": search_jobs,
+                    "model_threads": threads,
+                    "wall_s": wall,
+                    "cpu_s": cpu,
+                    "cpu_utilization": cpu / (wall * cores) if wall > 0 else 0.0,
+                }
+                print(f"✔ {job.name} tunado em {wall:.1f}s")
+
+    elapsed = time.perf_counter() - start
+    report["_total"] = {
+        "cores": n_cores,
+        "wall_s": elapsed,
+        "cpu_s": sum(r["cpu_s"] for r in report.values()),
+    }
+    report["_total"]["cpu_utilization"] = report["_total"]["cpu_s"] / (elapsed * n_cores)
+
+    return {job.name: results[job.name] for job in jobs}, report
+
+
+def print_tuning_report(report):
+    print("\n⏱️ Tuning por modelo:")
+    print(f"{'Modelo':30} {'núcleos':>7} {'busca x threads':>15} {'parede':>9} {'CPU':>9} {'uso CPU':>8}")
+    for name, stats in report.items():
+        if name == "_total":
+            continue
+        layout = f"{stats['search_jobs']} x {stats['model_threads']}"
+        print(f"{name:30} {stats['cores']:7d} {layout:>15} {stats['wall_s']:8.1f}s {stats['cpu_s']:8.1f}s "
+              f"{stats['cpu_utilization']:7.0%}")
+    total = report["_total"]
+    print(f"{'Total':30} {total['cores']:7d} {'':>15} {total['wall_s']:8.1f}s {total['cpu_s']:8.1f}s "
+          f"{total['cpu_utilization']:7.0%}")
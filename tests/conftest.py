@@ -0,0 +1,32 @@
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+
+from api import app as api_app
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def live_server():
+    """
+    API real (uvicorn) numa thread, para testes que precisam de sockets.
+    """
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(api_app.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    yield f"http://127.0.0.1:{port}"
+
+    server.should_exit = True
+    thread.join()
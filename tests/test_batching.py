@@ -0,0 +1,169 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import app as api_app
+from api import settings
+from api.batching import BatcherStopped, MicroBatcher
+from src import inference
+from tests.test_inference import TRANSACTION, random_transactions
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def echo_scores(records):
+    return [{"id": r["id"]} for r in records]
+
+
+def test_concurrent_requests_share_a_batch():
+    calls = []
+
+    def score(records):
+        calls.append(len(records))
+        return echo_scores(records)
+
+    async def scenario():
+        batcher = MicroBatcher(score, max_batch_size=8, max_wait_ms=50)
+        await batcher.start()
+        results = await asyncio.gather(*(batcher.submit({"id": i}) for i in range(20)))
+        await batcher.stop()
+        return results, batcher.metrics.snapshot()
+
+    results, metrics = run(scenario())
+
+    assert results == [{"id": i} for i in range(20)]
+    assert calls == [8, 8, 4]
+    assert metrics["batches"] == 3
+    assert metrics["requests"] == 20
+    assert metrics["batch_size_histogram"]["<=8"] == 2
+
+
+def test_single_request_flushes_after_max_wait():
+    async def scenario():
+        batcher = MicroBatcher(echo_scores, max_batch_size=64, max_wait_ms=5)
+        await batcher.start()
+        start = time.perf_counter()
+        result = await batcher.submit({"id": 1})
+        elapsed = time.perf_counter() - start
+        await batcher.stop()
+        return result, elapsed, batcher.metrics.snapshot()
+
+    result, elapsed, metrics = run(scenario())
+
+    assert result == {"id": 1}
+    assert elapsed < 1.0
+    assert metrics["queue_delay_ms"]["max"] >= 5
+
+
+def test_requests_arriving_at_the_deadline_are_not_lost():
+    # Chegadas espaçadas em torno do max_wait: um item perdido na corrida
+    # entre o get e o timeout deixaria a requisição esperando para sempre
+    async def scenario():
+        batcher = MicroBatcher(echo_scores, max_batch_size=4, max_wait_ms=1)
+        await batcher.start()
+
+        async def delayed(i):
+            await asyncio.sleep((i % 7) * 0.0005)
+            return await batcher.submit({"id": i})
+
+        results = await asyncio.wait_for(asyncio.gather(*(delayed(i) for i in range(300))), timeout=10)
+        await batcher.stop()
+        return results, batcher.metrics.snapshot()
+
+    results, metrics = run(scenario())
+
+    assert results == [{"id": i} for i in range(300)]
+    assert metrics["requests"] == 300
+
+
+def test_batches_are_scored_concurrently():
+    from concurrent.futures import ThreadPoolExecutor
+
+    active, peak = [0], [0]
+
+    def slow(records):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        active[0] -= 1
+        return echo_scores(records)
+
+    async def scenario():
+        with ThreadPoolExecutor(4) as pool:
+            batcher = MicroBatcher(slow, max_batch_size=2, max_wait_ms=1, executor=pool, max_in_flight=4)
+            await batcher.start()
+            start = time.perf_counter()
+            results = await asyncio.gather(*(batcher.submit({"id": i}) for i in range(8)))
+            elapsed = time.perf_counter() - start
+            await batcher.stop()
+        return results, elapsed
+
+    results, elapsed = run(scenario())
+
+    assert results == [{"id": i} for i in range(8)]
+    # 4 lotes de 2 em paralelo: ~1 rodada de 50 ms, não 4 em sequência
+    assert peak[0] > 1
+    assert elapsed < 0.15
+
+
+def test_stop_fails_pending_requests_instead_of_hanging():
+    async def scenario():
+        batcher = MicroBatcher(echo_scores, max_batch_size=1, max_wait_ms=1)
+        await batcher.start()
+        # Segura o único slot: as requisições ficam na fila até o stop()
+        await batcher._slots.acquire()
+        submits = [asyncio.create_task(batcher.submit({"id": i})) for i in range(3)]
+        await asyncio.sleep(0.01)
+        await batcher.stop()
+        results = await asyncio.wait_for(asyncio.gather(*submits, return_exceptions=True), timeout=5)
+
+        with pytest.raises(BatcherStopped):
+            await batcher.submit({"id": 99})
+        return results
+
+    results = run(scenario())
+    assert all(isinstance(r, BatcherStopped) for r in results)
+
+
+def test_scoring_error_reaches_every_request():
+    def fail(records):
+        raise RuntimeError("falhou")
+
+    async def scenario():
+        batcher = MicroBatcher(fail, max_batch_size=4, max_wait_ms=10)
+        await batcher.start()
+        results = await asyncio.gather(*(batcher.submit({"id": i}) for i in range(3)),
+                                       return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    assert all(isinstance(r, RuntimeError) for r in run(scenario()))
+
+
+def test_predict_endpoint_with_microbatching(monkeypatch):
+    monkeypatch.setattr(settings, "MICROBATCH_ENABLED", True)
+    rows = random_transactions(5)
+
+    with TestClient(api_app.app) as client:
+        responses = [client.post("/predict", json=row).json() for row in rows]
+        metrics = client.get("/metrics/batching").json()
+
+    expected = [inference.predict_single_transaction(row) for row in rows]
+    for got, exp in zip(responses, expected):
+        assert got["prediction"] == exp["prediction"]
+        assert got["fraud_probability"] == pytest.approx(exp["fraud_probability"])
+    assert metrics["enabled"] is True
+    assert metrics["requests"] == 5
+
+
+def test_predict_endpoint_without_microbatching():
+    with TestClient(api_app.app) as client:
+        response = client.post("/predict", json=TRANSACTION).json()
+        metrics = client.get("/metrics/batching").json()
+
+    assert response == inference.predict_single_transaction(TRANSACTION)
+    assert metrics == {"enabled": False}
@@ -0,0 +1,40 @@
+import json
+
+from benchmarks import bench_suite
+
+
+def result(p50_ms, rows_per_s):
+    return {"cases": {"bare/m/n=10": {"p50_ms": p50_ms, "rows_per_s": rows_per_s}}}
+
+
+def test_compare_flags_only_changes_beyond_threshold():
+    rows = bench_suite.compare(result(10.0, 1000.0), result(10.5, 960.0), threshold=0.10)
+    assert not any(row["regression"] for row in rows)
+
+    rows = bench_suite.compare(result(10.0, 1000.0), result(12.0, 800.0), threshold=0.10)
+    assert {row["metric"] for row in rows if row["regression"]} == {"p50_ms", "rows_per_s"}
+
+
+def test_faster_results_are_not_regressions():
+    rows = bench_suite.compare(result(10.0, 1000.0), result(5.0, 2000.0), threshold=0.10)
+    assert not any(row["regression"] for row in rows)
+
+
+def test_run_writes_baseline_and_compare_gates(tmp_path):
+    output = tmp_path / "base.json"
+    argv = ["run", "--sizes", "1", "10", "--models", "logistic_regression",
+            "--min-time", "0.01", "--output", str(output)]
+    assert bench_suite.main(argv) == 0
+
+    baseline = json.loads(output.read_text())
+    assert baseline["environment"]["python"]
+    stats = baseline["cases"]["bare/logistic_regression/n=10"]
+    assert stats["rows"] == 10 and stats["p50_ms"] <= stats["p99_ms"]
+    assert "pipeline/predict_batch/n=10" in baseline["cases"]
+
+    slower = json.loads(output.read_text())
+    slower["cases"]["bare/logistic_regression/n=10"]["p50_ms"] *= 2
+    current = tmp_path / "current.json"
+    current.write_text(json.dumps(slower))
+    assert bench_suite.main(["compare", str(output), str(output)]) == 0
+    assert bench_suite.main(["compare", str(output), str(current)]) == 1
@@ -0,0 +1,85 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import inference
+from src.bulk_scoring import PROGRESS_FILE, load_scores, score_file
+from tests.test_inference import random_transactions
+
+
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory):
+    df = pd.DataFrame(random_transactions(1000))
+    df["Class"] = 0
+    folder = tmp_path_factory.mktemp("bulk")
+    csv_path = folder / "transactions.csv"
+    parquet_path = folder / "transactions.parquet"
+    df.to_csv(csv_path, index=False)
+    df.to_parquet(parquet_path)
+
+    inference.load_inference_assets()
+    expected = inference.score_matrix(df[inference.feature_order].to_numpy())
+    return str(csv_path), str(parquet_path), expected
+
+
+@pytest.mark.parametrize("source", ["csv", "parquet"])
+@pytest.mark.parametrize("fmt", ["parquet", "npy"])
+def test_score_file_matches_inference(tmp_path, dataset, source, fmt):
+    csv_path, parquet_path, expected = dataset
+    input_path = csv_path if source == "csv" else parquet_path
+
+    summary = score_file(input_path, str(tmp_path), fmt=fmt, chunksize=150, workers=2)
+    scores = load_scores(str(tmp_path))
+
+    assert summary["chunks"] == 7
+    assert summary["rows_total"] == 1000
+    np.testing.assert_allclose(scores["fraud_probability"], expected, atol=1e-12)
+    np.testing.assert_array_equal(scores["prediction"], (expected >= 0.5).astype(int))
+
+
+def test_resume_scores_only_missing_chunks(tmp_path, dataset):
+    csv_path, _, expected = dataset
+    score_file(csv_path, str(tmp_path), chunksize=300, workers=1)
+
+    progress_path = tmp_path / PROGRESS_FILE
+    progress = json.loads(progress_path.read_text())
+    del progress["done"]["2"], progress["done"]["3"]
+    progress_path.write_text(json.dumps(progress))
+    os.remove(tmp_path / "part-00003.parquet")
+
+    summary = score_file(csv_path, str(tmp_path), chunksize=300, workers=1, resume=True)
+
+    assert summary["rows_scored"] == 300 + 100
+    assert summary["rows_total"] == 1000
+    np.testing.assert_allclose(load_scores(str(tmp_path))["fraud_probability"], expected, atol=1e-12)
+
+
+def test_resume_rejects_different_run(tmp_path, dataset):
+    csv_path, _, _ = dataset
+    score_file(csv_path, str(tmp_path), chunksize=500, workers=1)
+
+    with pytest.raises(ValueError):
+        score_file(csv_path, str(tmp_path), chunksize=250, workers=1, resume=True)
+
+
+def test_feature_order_comes_from_scored_version(tmp_path, dataset, monkeypatch):
+    from src import bulk_scoring, model_registry
+
+    # Versão cuja ordem de colunas é outro arquivo: é ele que tem de ser lido
+    order_path = tmp_path / "feature_order.json"
+    order_path.write_text(json.dumps(inference.read_feature_order()))
+    paths = {**model_registry.resolve_version(model_registry.LEGACY_VERSION), "feature_order_path": str(order_path)}
+    requested, read = [], []
+    monkeypatch.setattr(bulk_scoring, "resolve_version", lambda version=None: requested.append(version) or paths)
+    monkeypatch.setattr(bulk_scoring, "read_feature_order",
+                        lambda path: read.append(path) or inference.read_feature_order(path))
+
+    csv_path, _, expected = dataset
+    score_file(csv_path, str(tmp_path / "out"), chunksize=500, workers=1, load_kwargs={"version": "legacy"})
+
+    assert requested == ["legacy"]
+    assert read == [str(order_path)]
+    np.testing.assert_allclose(load_scores(str(tmp_path / "out"))["fraud_probability"], expected, atol=1e-9)
@@ -0,0 +1,114 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from xgboost import XGBClassifier
+from lightgbm import LGBMClassifier
+
+from src.compiled_trees import CompiledEnsemble, compile_model, file_sha256, save_compiled_model, source_sha256
+from src.fusion import fuse_scaler
+from tests.test_fusion import make_data
+
+
+MODELS = [
+    RandomForestClassifier(n_estimators=25, random_state=42),
+    RandomForestClassifier(n_estimators=10, max_depth=4, random_state=42),
+    GradientBoostingClassifier(n_estimators=30, max_depth=3, random_state=42),
+    XGBClassifier(n_estimators=30, max_depth=5, tree_method="hist", random_state=42, verbosity=0),
+    LGBMClassifier(n_estimators=30, num_leaves=20, random_state=42, verbose=-1),
+]
+
+
+@pytest.fixture(scope="module")
+def data():
+    _, X, y, scaler = make_data(n=3000)
+    X_new = scaler.transform(make_data(n=1000, seed=1)[0])
+    return X, y, X_new, scaler
+
+
+@pytest.mark.parametrize("model", MODELS, ids=lambda m: type(m).__name__)
+def test_compiled_matches_predict_proba(model, data):
+    X, y, X_new, _ = data
+    model.fit(X, y)
+    compiled = compile_model(model)
+
+    np.testing.assert_allclose(compiled.predict_proba(X_new), model.predict_proba(X_new), atol=1e-6)
+    np.testing.assert_allclose(compiled.predict_proba(X_new[:1]), model.predict_proba(X_new[:1]), atol=1e-6)
+
+
+def test_xgboost_missing_values_follow_default_direction(data):
+    X, y, X_new, _ = data
+    X_missing = X_new.copy()
+    X_missing[::3, 0] = np.nan
+    model = XGBClassifier(n_estimators=10, random_state=42, verbosity=0).fit(X, y)
+
+    np.testing.assert_allclose(compile_model(model).predict_proba(X_missing),
+                               model.predict_proba(X_missing), atol=1e-6)
+
+
+def test_save_and_load_roundtrip(tmp_path, data):
+    X, y, X_new, _ = data
+    model = LGBMClassifier(n_estimators=10, random_state=42, verbose=-1).fit(X, y)
+    path = tmp_path / "compiled.npz"
+    compile_model(model).save(str(path))
+
+    loaded = CompiledEnsemble.load(str(path))
+    np.testing.assert_allclose(loaded.predict_proba(X_new), model.predict_proba(X_new), atol=1e-6)
+
+
+def test_stale_compiled_file_is_rebuilt_even_if_newer(tmp_path, data):
+    import joblib
+
+    from src import inference
+
+    X, y, X_new, _ = data
+    model_path, compiled_path = str(tmp_path / "model.pkl"), str(tmp_path / "model_compiled.npz")
+    old = LGBMClassifier(n_estimators=5, random_state=1, verbose=-1).fit(X, y)
+    joblib.dump(old, model_path)
+    assert save_compiled_model(model_path, compiled_path) == compiled_path
+    assert source_sha256(compiled_path) == file_sha256(model_path)
+
+    # Retreino: o pickle muda, mas o .npz antigo fica com mtime mais novo (checkout, mesmo segundo)
+    new = LGBMClassifier(n_estimators=20, random_state=2, verbose=-1).fit(X, y)
+    joblib.dump(new, model_path)
+    later = os.stat(model_path).st_mtime_ns + 10**9
+    os.utime(compiled_path, ns=(later, later))
+
+    compiled = inference._load_compiled_model(model_path, compiled_path)
+    np.testing.assert_allclose(compiled.predict_proba(X_new), new.predict_proba(X_new), atol=1e-6)
+    assert source_sha256(compiled_path) == file_sha256(model_path)
+
+
+def test_fold_scaler_matches_fused_model(data):
+    X, y, _, scaler = data
+    X_raw = make_data(n=1000, seed=2)[0]
+    model = LGBMClassifier(n_estimators=10, random_state=42, verbose=-1).fit(X, y)
+    compiled = fuse_scaler(compile_model(model), scaler)
+
+    np.testing.assert_allclose(compiled.predict_proba(X_raw),
+                               model.predict_proba(scaler.transform(X_raw)), atol=1e-6)
+
+
+def test_unsupported_model(data):
+    X, y, _, _ = data
+    with pytest.raises(TypeError):
+        compile_model(LogisticRegression().fit(X, y))
+
+
+def test_compiled_inference_matches_library_model():
+    from src import inference
+    from tests.test_inference import random_transactions
+
+    rows = random_transactions(30)
+    inference.load_inference_assets()
+    expected = [inference.predict_single_transaction(r)["fraud_probability"] for r in rows]
+
+    inference.load_inference_assets(compiled=True)
+    try:
+        got = [inference.predict_single_transaction(r)["fraud_probability"] for r in rows]
+    finally:
+        inference.load_inference_assets()
+
+    np.testing.assert_allclose(got, expected, atol=1e-6)
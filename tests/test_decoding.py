@@ -0,0 +1,148 @@
+import io
+
+import numpy as np
+import pyarrow as pa
+import pytest
+from fastapi.testclient import TestClient
+
+from api import app as api_app
+from api.decoding import (
+    PayloadError,
+    decode_arrow,
+    decode_columnar_json,
+    decode_npy,
+)
+from src import inference
+from tests.test_inference import random_transactions
+
+FEATURES = ["a", "b", "c"]
+
+
+def npy_bytes(X):
+    buffer = io.BytesIO()
+    np.save(buffer, X)
+    return buffer.getvalue()
+
+
+def arrow_bytes(columns, file_format=False):
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    writer = pa.ipc.new_file(sink, table.schema) if file_format else pa.ipc.new_stream(sink, table.schema)
+    writer.write_table(table)
+    writer.close()
+    return sink.getvalue().to_pybytes()
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_decode_npy_is_zero_copy(dtype):
+    X = np.arange(12, dtype=dtype).reshape(4, 3)
+    body = npy_bytes(X)
+    decoded = decode_npy(body, 3)
+
+    np.testing.assert_array_equal(decoded, X)
+    assert decoded.dtype == dtype
+    assert not decoded.flags.owndata
+
+
+def test_decode_npy_fortran_order():
+    X = np.asfortranarray(np.arange(12, dtype=np.float64).reshape(4, 3))
+    np.testing.assert_array_equal(decode_npy(npy_bytes(X), 3), X)
+
+
+@pytest.mark.parametrize("X, message", [
+    (np.zeros((4, 2)), "formato"),
+    (np.zeros((4, 3), dtype=np.int64), "dtype"),
+    (np.array([[1.0, np.nan, 2.0]]), "NaN"),
+    (np.array([[1.0, np.inf, 2.0]]), "NaN"),
+])
+def test_decode_npy_rejects_invalid(X, message):
+    with pytest.raises(PayloadError, match=message):
+        decode_npy(npy_bytes(X), 3)
+
+
+def test_decode_npy_rejects_truncated_body():
+    with pytest.raises(PayloadError):
+        decode_npy(npy_bytes(np.zeros((4, 3)))[:-8], 3)
+
+
+@pytest.mark.parametrize("file_format", [False, True])
+def test_decode_arrow_reorders_columns(file_format):
+    columns = {"c": [3.0, 6.0], "a": [1.0, 4.0], "b": [2, 5], "extra": ["x", "y"]}
+    decoded = decode_arrow(arrow_bytes(columns, file_format), FEATURES, file_format=file_format)
+    np.testing.assert_array_equal(decoded, [[1, 2, 3], [4, 5, 6]])
+
+
+def test_decode_arrow_rejects_nulls_and_missing_columns():
+    with pytest.raises(PayloadError, match="nulos"):
+        decode_arrow(arrow_bytes({"a": [1.0, None], "b": [1.0, 2.0], "c": [1.0, 2.0]}), FEATURES)
+    with pytest.raises(PayloadError, match="ausentes"):
+        decode_arrow(arrow_bytes({"a": [1.0]}), FEATURES)
+
+
+def test_decode_columnar_json():
+    decoded = decode_columnar_json({"b": [2, 5], "a": [1, 4], "c": [3, 6]}, FEATURES)
+    np.testing.assert_array_equal(decoded, [[1, 2, 3], [4, 5, 6]])
+
+    with pytest.raises(PayloadError, match="tamanhos"):
+        decode_columnar_json({"a": [1], "b": [1, 2], "c": [1]}, FEATURES)
+    with pytest.raises(PayloadError, match="numéricos"):
+        decode_columnar_json({"a": [1], "b": ["x"], "c": [1]}, FEATURES)
+
+
+@pytest.fixture(scope="module")
+def batch():
+    rows = random_transactions(25)
+    inference.load_inference_assets()
+    order = inference.read_feature_order()
+    X = np.array([[row[name] for name in order] for row in rows])
+    return rows, order, X, inference.predict_records(rows)
+
+
+def check_results(results, expected):
+    assert [r["prediction"] for r in results] == [e["prediction"] for e in expected]
+    np.testing.assert_allclose([r["fraud_probability"] for r in results],
+                               [e["fraud_probability"] for e in expected], atol=1e-9)
+
+
+def test_predict_batch_binary_formats(batch):
+    rows, order, X, expected = batch
+    columns = {name: X[:, i].tolist() for i, name in enumerate(order)}
+
+    with TestClient(api_app.app) as client:
+        bodies = {
+            "application/x-npy": npy_bytes(X),
+            "application/vnd.apache.arrow.stream": arrow_bytes(columns),
+            "application/vnd.apache.arrow.file": arrow_bytes(columns, file_format=True),
+        }
+        for content_type, body in bodies.items():
+            response = client.post("/predict-batch", content=body, headers={"Content-Type": content_type})
+            assert response.status_code == 200, content_type
+            check_results(response.json()["results"], expected)
+
+        check_results(client.post("/predict-batch", json=columns).json()["results"], expected)
+        check_results(client.post("/predict-batch", json=rows).json()["results"], expected)
+
+
+def test_predict_batch_errors(batch):
+    rows, order, X, _ = batch
+    X_bad = X.copy()
+    X_bad[3, 4] = np.nan
+
+    with TestClient(api_app.app) as client:
+        response = client.post("/predict-batch", content=npy_bytes(X_bad),
+                               headers={"Content-Type": "application/x-npy"})
+        assert response.status_code == 422
+        assert "[3, 4]" in response.json()["detail"]
+
+        response = client.post("/predict-batch", content=b"abc", headers={"Content-Type": "text/csv"})
+        assert response.status_code == 415
+
+        # NDJSON é do /predict-stream, não do decodificador JSON colunar
+        response = client.post("/predict-batch", content=b'{"Time": [1.0]}\n',
+                               headers={"Content-Type": "application/x-ndjson"})
+        assert response.status_code == 415
+
+        response = client.post("/predict-batch", json=[{"Time": "x"}])
+        assert response.status_code == 422
+
+        assert "error" in client.post("/predict-batch", json=[]).json()
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import (
+    average_precision_score,
+    confusion_matrix,
+    precision_score,
+    recall_score,
+    roc_auc_score,
+    roc_curve,
+)
+
+from src.evaluation import evaluate, evaluate_scores
+
+
+@pytest.fixture(scope="module")
+def scored():
+    rng = np.random.default_rng(0)
+    y = (rng.random(5000) < 0.05).astype(int)
+    # Arredondado: muitos empates de score, como nas folhas das árvores
+    scores = np.round(rng.random(5000) * 0.6 + 0.3 * y, 2)
+    return y, scores
+
+
+def test_matches_sklearn(scored):
+    y, scores = scored
+    metrics = evaluate_scores(y, scores)
+    y_pred = (scores > 0.5).astype(int)
+
+    assert metrics["roc_auc"] == pytest.approx(roc_auc_score(y, scores))
+    assert metrics["average_precision"] == pytest.approx(average_precision_score(y, scores))
+    assert metrics["recall"] == recall_score(y, y_pred)
+    assert metrics["precision"] == precision_score(y, y_pred)
+    np.testing.assert_array_equal(metrics["confusion_matrix"], confusion_matrix(y, y_pred))
+
+    fpr, tpr, thresholds = roc_curve(y, scores, drop_intermediate=False)
+    sweep_fpr, sweep_tpr, sweep_thresholds = metrics["sweep"].roc_curve()
+    np.testing.assert_allclose(sweep_fpr, fpr)
+    np.testing.assert_allclose(sweep_tpr, tpr)
+    np.testing.assert_allclose(sweep_thresholds[1:], thresholds[1:])
+
+
+@pytest.mark.parametrize("threshold", [0.0, 0.3, 0.55, 0.9, 1.0])
+def test_any_threshold_from_the_same_sweep(scored, threshold):
+    y, scores = scored
+    sweep = evaluate_scores(y, scores)["sweep"]
+
+    strict = sweep.at(threshold)
+    np.testing.assert_array_equal(strict["confusion_matrix"], confusion_matrix(y, scores > threshold))
+    inclusive = sweep.at(threshold, strict=False)
+    np.testing.assert_array_equal(inclusive["confusion_matrix"], confusion_matrix(y, scores >= threshold))
+
+
+def test_sweep_table_has_one_row_per_distinct_score(scored):
+    y, scores = scored
+    table = evaluate_scores(y, scores)["sweep"].table()
+
+    assert len(table) == len(np.unique(scores))
+    assert table["threshold"].is_monotonic_decreasing
+    assert (table["tp"] + table["fn"] == y.sum()).all()
+    assert table["recall"].iloc[-1] == 1.0
+
+
+def test_single_chunked_predict_proba_pass():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(3000, 4))
+    y = (X[:, 0] + rng.normal(size=3000) > 1).astype(int)
+    model = LogisticRegression().fit(X, y)
+
+    calls = []
+    original = model.predict_proba
+    model.predict_proba = lambda X_chunk: calls.append(len(X_chunk)) or original(X_chunk)
+    model.predict = None  # a avaliação não pode chamar predict
+
+    metrics = evaluate(model, X, y, chunk_size=1000)
+    assert calls == [1000, 1000, 1000]
+    assert metrics["recall"] == recall_score(y, original(X)[:, 1] > 0.5)
@@ -0,0 +1,56 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import app as api_app
+from api import settings
+from api.executors import create_executor
+from src import inference
+from tests.test_inference import TRANSACTION, random_transactions
+
+
+def test_thread_executor():
+    executor = create_executor("thread", 2)
+    try:
+        assert isinstance(executor, ThreadPoolExecutor)
+        assert executor.submit(sum, [1, 2, 3]).result() == 6
+    finally:
+        executor.shutdown()
+
+
+def test_process_executor_preloads_model():
+    executor = create_executor("process", 1)
+    try:
+        assert isinstance(executor, ProcessPoolExecutor)
+        result = executor.submit(inference.predict_single_transaction, TRANSACTION).result()
+    finally:
+        executor.shutdown()
+
+    inference.load_inference_assets()
+    assert result == inference.predict_single_transaction(TRANSACTION)
+
+
+def test_invalid_executor():
+    with pytest.raises(ValueError):
+        create_executor("gpu", 1)
+    with pytest.raises(ValueError):
+        create_executor("thread", 0)
+
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+def test_api_uses_dedicated_pools(monkeypatch, kind):
+    monkeypatch.setattr(settings, "EXECUTOR_KIND", kind)
+    monkeypatch.setattr(settings, "PREDICT_WORKERS", 1)
+    monkeypatch.setattr(settings, "BATCH_WORKERS", 1)
+    rows = random_transactions(10)
+
+    with TestClient(api_app.app) as client:
+        assert api_app.predict_executor is not api_app.batch_executor
+        single = client.post("/predict", json=TRANSACTION).json()
+        batch = client.post("/predict-batch", json=rows).json()["results"]
+
+    inference.load_inference_assets()
+    assert single == inference.predict_single_transaction(TRANSACTION)
+    assert batch == inference.predict_records(rows)
+    assert api_app.predict_executor is None
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from api.client import AsyncFraudClient, FraudClient
+from src import inference
+from tests.test_inference import TRANSACTION, random_transactions
+
+
+@pytest.fixture(scope="module")
+def rows():
+    rows = random_transactions(53)
+    inference.load_inference_assets()
+    return rows, inference.predict_records(rows)
+
+
+def test_batch_is_chunked_and_reassembled_in_order(live_server, rows):
+    rows, expected = rows
+
+    with FraudClient(live_server, batch_chunk_size=10, max_concurrency=3) as client:
+        assert client.predict_batch(rows) == {"results": expected}
+        assert client.predict_single(TRANSACTION) == inference.predict_single_transaction(TRANSACTION)
+        assert "message" in client.healthcheck()
+
+
+def test_async_client(live_server, rows):
+    rows, expected = rows
+
+    async def scenario():
+        async with AsyncFraudClient(live_server, batch_chunk_size=7) as client:
+            batch = await client.predict_batch(rows)
+            singles = await asyncio.gather(*(client.predict_single(row) for row in rows[:5]))
+            health = await client.healthcheck()
+        return batch, singles, health
+
+    batch, singles, health = asyncio.run(scenario())
+
+    assert batch == {"results": expected}
+    assert singles == expected[:5]
+    assert "message" in health
+
+
+@pytest.fixture
+def flaky_server():
+    """
+    Servidor que responde 503 nas duas primeiras chamadas de cada caminho.
+    """
+    calls = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            calls[self.path] = calls.get(self.path, 0) + 1
+            status = 503 if calls[self.path] <= 2 else 200
+            body = json.dumps({"fraud_probability": 0.1, "prediction": 0}).encode()
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", calls
+    server.shutdown()
+
+
+def test_client_retries_unavailable(flaky_server):
+    url, calls = flaky_server
+
+    with FraudClient(url, max_retries=3, backoff_factor=0.01) as client:
+        assert client.predict_single(TRANSACTION)["prediction"] == 0
+    assert calls["/predict"] == 3
+
+
+def test_client_gives_up_after_max_retries(flaky_server):
+    url, _ = flaky_server
+
+    with FraudClient(url, max_retries=1, backoff_factor=0.01) as client:
+        with pytest.raises(Exception, match="Erro na API"):
+            client.predict_single(TRANSACTION)
+
+
+def test_async_client_retries_unavailable(flaky_server):
+    url, calls = flaky_server
+
+    async def scenario():
+        async with AsyncFraudClient(url, max_retries=3, backoff_factor=0.01) as client:
+            return await client.predict_single(TRANSACTION)
+
+    assert asyncio.run(scenario())["prediction"] == 0
+    assert calls["/predict"] == 3
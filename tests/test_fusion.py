@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBClassifier
+from lightgbm import LGBMClassifier
+
+from src import inference
+from src.compiled_trees import compile_model
+from src.fusion import fold_thresholds, fuse_scaler
+from tests.test_inference import random_transactions
+
+
+def make_data(n=2000, n_features=6, seed=0):
+    rng = np.random.default_rng(seed)
+    X_raw = rng.normal(loc=rng.uniform(-50, 50, n_features),
+                       scale=rng.uniform(0.1, 100, n_features),
+                       size=(n, n_features))
+    scaler = StandardScaler().fit(X_raw)
+    X = scaler.transform(X_raw)
+    y = (X[:, 0] + X[:, 1] * X[:, 2] + rng.normal(0, 0.5, n) > 0).astype(int)
+    return X_raw, X, y, scaler
+
+
+MODELS = [
+    LogisticRegression(max_iter=500),
+    RandomForestClassifier(n_estimators=20, max_depth=6, random_state=42),
+    GradientBoostingClassifier(n_estimators=20, max_depth=3, random_state=42),
+    XGBClassifier(n_estimators=20, max_depth=4, tree_method="hist", random_state=42, verbosity=0),
+    LGBMClassifier(n_estimators=20, num_leaves=15, random_state=42, verbose=-1),
+]
+
+
+@pytest.mark.parametrize("model", MODELS, ids=lambda m: type(m).__name__)
+def test_fused_model_matches_two_step_path(model):
+    X_raw, X, y, scaler = make_data()
+    model.fit(X, y)
+
+    X_new_raw = make_data(n=500, seed=1)[0]
+    expected = model.predict_proba(scaler.transform(X_new_raw))
+    fused = fuse_scaler(model, scaler)
+
+    np.testing.assert_allclose(fused.predict_proba(X_new_raw), expected, atol=1e-6)
+
+
+def split_rows(model, scaler, base_row):
+    """
+    Linhas brutas exatamente nos splits do modelo: t·s + m de cada split no
+    dtype em que a árvore compara (float32 no XGBoost e no sklearn) e os
+    vizinhos a até 2 ulps.
+    """
+    compiled = compile_model(model)
+    dtype = compiled.input_dtype.type
+    split = compiled.left != np.arange(len(compiled.left))
+    features = compiled.feature[split]
+    at_split = (compiled.threshold[split] * scaler.scale_[features] + scaler.mean_[features]).astype(dtype)
+
+    values = [at_split]
+    for direction in (np.inf, -np.inf):
+        step = at_split
+        for _ in range(2):
+            step = np.nextafter(step, dtype(direction))
+            values.append(step)
+
+    rows = np.tile(base_row, (len(at_split) * len(values), 1))
+    rows[np.arange(len(rows)), np.tile(features, len(values))] = np.concatenate(values)
+    return rows
+
+
+@pytest.mark.parametrize("model", MODELS[1:], ids=lambda m: type(m).__name__)
+@pytest.mark.parametrize("compiled", [False, True], ids=["native", "compiled"])
+def test_fused_splits_keep_rows_at_thresholds_on_their_branch(model, compiled):
+    X_raw, X, y, scaler = make_data()
+    model.fit(X, y)
+    rows = split_rows(model, scaler, X_raw[0])
+
+    scorer = compile_model(model) if compiled else model
+    expected = scorer.predict_proba(scaler.transform(rows))
+    fused = fuse_scaler(scorer, scaler)
+
+    np.testing.assert_allclose(fused.predict_proba(rows), expected, atol=1e-9)
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+@pytest.mark.parametrize("strict", [False, True])
+def test_fold_thresholds_is_exact_around_the_boundary(dtype, strict):
+    rng = np.random.default_rng(0)
+    t = rng.normal(size=500)
+    mean, scale = rng.normal(scale=1e4, size=500), rng.uniform(0.01, 5e4, size=500)
+    folded = fold_thresholds(t, mean, scale, dtype, strict).astype(dtype)
+
+    x = folded
+    for _ in range(3):
+        x = np.nextafter(x, dtype(-np.inf))
+    for _ in range(7):
+        z = ((x.astype(np.float64) - mean) / scale).astype(dtype)
+        original = z < t if strict else z <= t
+        np.testing.assert_array_equal(x < folded if strict else x <= folded, original)
+        x = np.nextafter(x, dtype(np.inf))
+
+
+def test_fuse_does_not_modify_original():
+    X_raw, X, y, scaler = make_data()
+    model = RandomForestClassifier(n_estimators=5, random_state=42).fit(X, y)
+    before = model.predict_proba(X)
+    fuse_scaler(model, scaler)
+    np.testing.assert_array_equal(model.predict_proba(X), before)
+
+
+def test_fuse_unsupported_model():
+    _, X, y, scaler = make_data()
+    with pytest.raises(TypeError):
+        fuse_scaler(StandardScaler().fit(X), scaler)
+
+
+def test_fused_inference_matches_default():
+    rows = random_transactions(50)
+
+    inference.load_inference_assets()
+    expected = [inference.predict_pipeline(r)[0]["fraud_probability"] for r in rows]
+
+    inference.load_inference_assets(fused=True)
+    try:
+        fast = [inference.predict_single_transaction(r)["fraud_probability"] for r in rows]
+        pipeline = [inference.predict_pipeline(r)[0]["fraud_probability"] for r in rows]
+    finally:
+        inference.load_inference_assets()
+
+    np.testing.assert_allclose(fast, expected, atol=1e-6)
+    np.testing.assert_allclose(pipeline, expected, atol=1e-6)
@@ -0,0 +1,15 @@
+import os
+
+from benchmarks.bench_import import import_profile, loaded_heavy_modules
+
+# Orçamento generoso para máquinas de CI lentas; o benchmark usa 1000 ms
+IMPORT_BUDGET_MS = float(os.getenv("FRAUD_IMPORT_BUDGET_MS", 2000))
+
+
+def test_api_import_skips_training_libraries():
+    assert loaded_heavy_modules("api.app") == []
+
+
+def test_api_import_within_budget():
+    totals = sorted(import_profile("api.app")[0] for _ in range(3))
+    assert totals[1] < IMPORT_BUDGET_MS
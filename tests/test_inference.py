@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import inference
+
+TRANSACTION = {
+    "Time": 1000,
+    "V1": -1.2, "V2": 0.4, "V3": 0.9, "V4": -0.7, "V5": 1.5,
+    "V6": -0.1, "V7": 0.3, "V8": 0.2, "V9": 0.0, "V10": -0.9,
+    "V11": 0.1, "V12": 0.6, "V13": -1.1, "V14": 0.7, "V15": 0.3,
+    "V16": 0.2, "V17": -0.4, "V18": 0.8, "V19": -0.2, "V20": 0.0,
+    "V21": 0.5, "V22": -0.3, "V23": 0.6, "V24": -0.1, "V25": 0.2,
+    "V26": -0.5, "V27": 0.7, "V28": -0.6,
+    "Amount": 120.55
+}
+
+
+def random_transactions(n, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(n):
+        row = {name: float(rng.normal(0, 3)) for name in TRANSACTION}
+        row["Time"] = float(rng.uniform(0, 172800))
+        row["Amount"] = float(rng.exponential(90))
+        rows.append(row)
+    return rows
+
+
+@pytest.fixture(scope="module", autouse=True)
+def assets():
+    inference.load_inference_assets()
+
+
+def test_fast_path_matches_dataframe_path():
+    for row in [TRANSACTION] + random_transactions(50):
+        assert inference.predict_single_transaction(row) == inference.predict_pipeline(row)[0]
+
+
+def test_fast_path_ignores_key_order_and_extra_keys():
+    shuffled = dict(reversed(list(TRANSACTION.items())))
+    shuffled["extra"] = 1.0
+    assert inference.predict_single_transaction(shuffled) == inference.predict_pipeline(TRANSACTION)[0]
+
+
+def test_fast_path_missing_feature_raises():
+    data = dict(TRANSACTION)
+    del data["V7"]
+    with pytest.raises(KeyError):
+        inference.predict_single_transaction(data)
+
+
+def test_batch_uses_dataframe_path():
+    rows = random_transactions(20)
+    results = inference.predict_batch(pd.DataFrame(rows))
+    assert results == [inference.predict_single_transaction(r) for r in rows]
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from benchmarks.bench_load import LocalServer, correct_coordinated_omission, main, run_load
+
+
+def test_coordinated_omission_fills_stalled_interval():
+    corrected = correct_coordinated_omission([0.01, 0.01, 0.05], expected_interval=0.01)
+    # A amostra de 50 ms esconde as de 40, 30, 20 e 10 ms que deixaram de ser enviadas
+    assert sorted(np.round(corrected * 1e3).astype(int).tolist()) == [10, 10, 10, 20, 30, 40, 50]
+    assert len(correct_coordinated_omission([0.005, 0.009], expected_interval=0.01)) == 2
+
+
+def test_closed_loop_against_live_server(live_server):
+    report = run_load(live_server, concurrency=2, duration=0.5, warmup=0)
+
+    assert report["requests"] > 0
+    assert report["error_rate"] == 0
+    assert report["scenario"]["mode"] == "closed"
+    assert report["latency_ms"]["p99"] >= report["service_ms"]["p50"]
+
+
+def test_open_loop_batch_against_live_server(live_server):
+    report = run_load(live_server, endpoint="predict-batch", batch_size=10, rate=20, duration=0.5,
+                      max_in_flight=4, warmup=0)
+
+    assert report["requests"] == 10
+    assert report["error_rate"] == 0
+    assert report["rows_per_s"] > 0
+    assert report["latency_ms"]["p50"] >= report["service_ms"]["p50"] - 1e-6
+
+
+def test_requires_exactly_one_load_mode():
+    with pytest.raises(ValueError):
+        run_load("http://127.0.0.1:1", duration=0.1)
+
+
+def test_env_is_rejected_for_inprocess_server():
+    # api.settings já foi lido no import: o env seria ignorado em silêncio
+    with pytest.raises(SystemExit):
+        main(["--server", "inprocess", "--env", "FRAUD_MICROBATCH=1", "--duration", "1"])
+    with pytest.raises(ValueError):
+        LocalServer("inprocess", env={"FRAUD_MICROBATCH": "1"})
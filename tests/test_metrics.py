@@ -0,0 +1,118 @@
+import math
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import app as api_app
+from api import settings
+from src import inference, metrics
+from tests.test_inference import TRANSACTION, random_transactions
+
+
+@pytest.fixture(scope="module", autouse=True)
+def assets():
+    inference.load_inference_assets()
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    metrics.configure(True)
+    yield
+    metrics.configure(True)
+
+
+def test_histogram_quantiles_interpolate_within_bucket():
+    histogram = metrics.Histogram(buckets=(1.0, 2.0, 4.0))
+    for value in (0.5, 1.5, 1.5, 3.0):
+        histogram.observe(value)
+
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(6.5)
+    assert histogram.quantile(0.5) == pytest.approx(1.5)
+    assert 2.0 < histogram.quantile(0.99) <= 4.0
+    assert math.isnan(metrics.Histogram().quantile(0.5))
+
+
+def test_prometheus_text_has_cumulative_buckets():
+    family = metrics.histogram("test_metric_seconds", "Teste", ("stage",), buckets=(0.1, 1.0))
+    family.labels("a").observe(0.05)
+    family.labels("a").observe(0.5)
+    family.labels("a").observe(5.0)
+
+    text = metrics.render_prometheus()
+    assert "# TYPE test_metric_seconds histogram" in text
+    assert 'test_metric_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 'test_metric_seconds_bucket{stage="a",le="1.0"} 2' in text
+    assert 'test_metric_seconds_bucket{stage="a",le="+Inf"} 3' in text
+    assert 'test_metric_seconds_count{stage="a"} 3' in text
+
+
+def _stage_counts(path):
+    return {
+        values[1]: child.count
+        for values, child in inference.STAGE_SECONDS.children()
+        if values[0] == path
+    }
+
+
+def test_inference_paths_record_stages():
+    inference.predict_single_transaction(TRANSACTION)
+    inference.predict_records(random_transactions(10))
+
+    assert {"extract", "predict_proba"} <= set(_stage_counts("row"))
+    assert {"build_matrix", "predict_proba", "format"} <= set(_stage_counts("records"))
+
+
+def test_disabled_metrics_record_nothing():
+    metrics.configure(False)
+    inference.predict_single_transaction(TRANSACTION)
+    inference.predict_records(random_transactions(10))
+
+    for family in (inference.STAGE_SECONDS, inference.BATCH_ROWS):
+        assert all(child.count == 0 for _, child in family.children())
+
+
+def test_metrics_endpoint_exposes_http_and_stage_latency(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+
+    with TestClient(api_app.app) as client:
+        client.post("/predict", json=TRANSACTION)
+        client.post("/predict-batch", json=random_transactions(5))
+        response = client.get("/metrics")
+        summary = client.get("/metrics/latency").json()
+
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'fraud_http_request_duration_seconds_count{method="POST",path="/predict",status="200"} 1' in text
+    assert 'fraud_api_stage_seconds_count{endpoint="/predict-batch",stage="score"} 1' in text
+    assert "fraud_inference_stage_seconds_bucket" in text
+    assert summary["enabled"] is True
+    assert summary["fraud_http_request_duration_seconds"]["POST//predict/200"]["count"] == 1
+
+
+def test_drain_and_merge_move_measurements():
+    inference.predict_single_transaction(TRANSACTION)
+    before = _stage_counts("row")
+
+    samples = metrics.drain()
+    assert all(count == 0 for count in _stage_counts("row").values())
+
+    metrics.merge(samples)
+    assert _stage_counts("row") == before
+
+
+def test_process_executor_stages_reach_metrics(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+    monkeypatch.setattr(settings, "EXECUTOR_KIND", "process")
+    monkeypatch.setattr(settings, "PREDICT_WORKERS", 1)
+    monkeypatch.setattr(settings, "BATCH_WORKERS", 1)
+
+    with TestClient(api_app.app) as client:
+        client.post("/predict", json=TRANSACTION)
+        client.post("/predict-batch", json=random_transactions(5))
+        text = client.get("/metrics").text
+
+    # Etapas medidas nos processos do pool voltam com o resultado
+    assert 'fraud_inference_stage_seconds_count{path="row",stage="predict_proba"} 1' in text
+    assert 'fraud_inference_stage_seconds_count{path="records",stage="build_matrix"} 1' in text
@@ -0,0 +1,133 @@
+import gc
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import app as api_app
+from api import settings
+from src import inference, model_registry
+from tests.test_inference import TRANSACTION, random_transactions
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """
+    Registro temporário com duas versões: floresta (v0001) e regressão logística (v0002).
+    """
+    monkeypatch.setattr(model_registry, "REGISTRY_DIR", str(tmp_path / "registry"))
+    model_registry.publish_version()
+    model_registry.publish_version(model_path="models/logistic_regression_tuned.pkl",
+                                   metadata={"model_name": "Logistic Regression (Tuned)"})
+    yield
+    inference.load_inference_assets(version=model_registry.LEGACY_VERSION)
+
+
+def test_empty_registry_falls_back_to_legacy(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_registry, "REGISTRY_DIR", str(tmp_path / "vazio"))
+    paths = model_registry.resolve_version()
+    assert paths["version"] == "legacy"
+    assert paths["model_path"] == "models/modelo_final.pkl"
+
+
+def test_publish_and_resolve(registry):
+    assert model_registry.list_versions() == ["v0001", "v0002"]
+    paths = model_registry.resolve_version()
+    assert paths["version"] == "v0002"
+    assert paths["metadata"]["model_name"] == "Logistic Regression (Tuned)"
+    assert len(paths["metadata"]["model_sha256"]) == 64
+
+    with pytest.raises(FileNotFoundError):
+        model_registry.resolve_version("v0099")
+    # Nada de caminhos arbitrários (pastas com metadata.json fora do padrão vNNNN)
+    for version in ("../v0001", "v0001/../v0002", "/tmp", "models"):
+        with pytest.raises(ValueError):
+            model_registry.resolve_version(version)
+
+
+def test_swap_is_atomic_and_old_version_is_freed(registry):
+    inference.load_inference_assets(version="v0001")
+    old = inference.active_bundle()
+    forest = inference.predict_single_transaction(TRANSACTION)
+
+    errors = []
+    stop = threading.Event()
+
+    def hammer():
+        rows = random_transactions(20)
+        while not stop.is_set():
+            try:
+                inference.predict_records(rows)
+                inference.predict_single_transaction(TRANSACTION)
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=hammer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for version in ["v0002", "v0001", "v0002"]:
+        inference.activate_bundle(inference.build_bundle(version))
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert inference.active_version() == "v0002"
+    assert inference.predict_single_transaction(TRANSACTION) != forest
+
+    # Enquanto alguém segura o bundle antigo ele aparece drenando; depois some
+    assert "v0001" in inference.draining_versions()
+    del old
+    gc.collect()
+    assert inference.draining_versions() == []
+
+
+ADMIN = {"X-Admin-Token": "segredo"}
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "segredo")
+
+
+def test_admin_reload_and_rollback(registry, admin_token):
+    with TestClient(api_app.app, headers=ADMIN) as client:
+        response = client.post("/predict", json=TRANSACTION)
+        assert response.headers["x-model-version"] == "v0002"
+        lr = response.json()
+
+        reload = client.post("/admin/reload", params={"version": "v0001"}).json()
+        assert reload == {"active_version": "v0001", "previous_version": "v0002"}
+        response = client.post("/predict", json=TRANSACTION)
+        assert response.headers["x-model-version"] == "v0001"
+        assert response.json() != lr
+
+        status = client.get("/admin/model").json()
+        assert status["history"] == ["v0002", "v0001"]
+        assert status["available_versions"] == ["v0001", "v0002"]
+
+        rollback = client.post("/admin/rollback").json()
+        assert rollback == {"active_version": "v0002", "previous_version": "v0001"}
+        assert client.post("/predict", json=TRANSACTION).json() == lr
+
+        assert client.post("/admin/rollback").status_code == 409
+        assert client.post("/admin/reload", params={"version": "v0099"}).status_code == 404
+        assert client.post("/admin/reload", params={"version": "../registry/v0001"}).status_code == 422
+
+
+def test_admin_requires_token(registry, admin_token):
+    with TestClient(api_app.app) as client:
+        assert client.post("/admin/reload").status_code == 403
+        assert client.post("/admin/reload", headers={"X-Admin-Token": "errado"}).status_code == 403
+        response = client.post("/admin/reload", headers=ADMIN)
+        assert response.status_code == 200
+
+
+def test_admin_disabled_without_token(registry, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", None)
+
+    with TestClient(api_app.app) as client:
+        for response in (client.post("/admin/reload", params={"version": "v0001"}),
+                         client.post("/admin/rollback"), client.get("/admin/model")):
+            assert response.status_code == 403
+        assert client.post("/predict", json=TRANSACTION).headers["x-model-version"] == "v0002"
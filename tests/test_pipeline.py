@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pytest
+
+from src import pipeline, tuning
+from src.pipeline import ArtifactCache, resolve_models, stage_report, stage_save_models, stage_tune, tune_key
+from src.tuning_scheduler import TuningJob
+
+LR = "Logistic Regression (Tuned)"
+JOBS = [TuningJob(LR, tuning.tune_logistic_regression, cost=1, threaded=False)]
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(6000, 6))
+    y = (X[:, 0] + rng.normal(size=6000) > 1.5).astype(int)
+    return X[:5000], y[:5000], X[5000:], y[5000:]
+
+
+def test_tune_key_tracks_inputs():
+    job = JOBS[0]
+    other = TuningJob(LR, tuning.tune_random_forest, cost=1, threaded=True)
+
+    assert tune_key(job, "dados", "random") == tune_key(job, "dados", "random")
+    assert tune_key(job, "dados", "random") != tune_key(job, "outros", "random")
+    assert tune_key(job, "dados", "random") != tune_key(job, "dados", "halving")
+    # Código da função (grid, modelo) faz parte da chave
+    assert tune_key(job, "dados", "random") != tune_key(other, "dados", "random")
+
+
+def test_tune_key_tracks_search_modules(monkeypatch):
+    job = JOBS[0]
+    before = tune_key(job, "dados", "random")
+    sources = pipeline.tuning_sources()
+    assert set(sources) == {"src.tuning", "src.native_search", "src.evaluation"}
+
+    # Mudança em um helper (ex.: src/native_search.py) troca a chave
+    changed = dict(sources, **{"src.native_search": "0" * 64})
+    monkeypatch.setattr(pipeline, "tuning_sources", lambda: changed)
+    assert tune_key(job, "dados", "random") != before
+
+
+def test_tuning_is_reused_until_rebuild(data, tmp_path):
+    cache = ArtifactCache(tmp_path / "cache")
+
+    first, keys, report = stage_tune(data, "dados", cache, jobs=JOBS, n_cores=1)
+    assert report is not None
+    assert os.path.exists(cache.path("tune", keys[LR]))
+
+    again, same_keys, report = stage_tune(data, "dados", cache, jobs=JOBS, n_cores=1)
+    assert report is None and same_keys == keys
+    assert again[LR]["best_params"] == first[LR]["best_params"]
+
+    _, _, report = stage_tune(data, "dados", cache, jobs=JOBS, n_cores=1, rebuild={LR})
+    assert report is not None
+    # Dados diferentes: outra chave, novo tuning
+    _, new_keys, report = stage_tune(data, "outros", cache, jobs=JOBS, n_cores=1)
+    assert report is not None and new_keys != keys
+
+
+def test_models_are_saved_only_when_key_changes(tmp_path):
+    cache = ArtifactCache(tmp_path / "cache")
+    paths = {LR: str(tmp_path / "lr.pkl")}
+    results = {LR: {"best_model": {"coef": 1}}}
+
+    stage_save_models(results, {LR: "a"}, cache, paths=paths)
+    mtime = os.stat(paths[LR]).st_mtime_ns
+
+    stage_save_models(results, {LR: "a"}, ArtifactCache(tmp_path / "cache"), paths=paths)
+    assert os.stat(paths[LR]).st_mtime_ns == mtime
+
+    stage_save_models(results, {LR: "b"}, cache, paths=paths)
+    assert cache.is_current([paths[LR]], "b")
+    cache.invalidate_outputs()
+    assert not cache.is_current([paths[LR]], "b")
+
+
+def test_report_without_sweeps_is_cached(tmp_path, monkeypatch, capsys):
+    # Métricas sem varredura de limiares (ex.: tuning antigo): não há curvas a gerar
+    monkeypatch.chdir(tmp_path)
+    metrics = {LR: {"roc_auc": 0.9, "recall": 0.8, "precision": 0.5}}
+    cache = ArtifactCache(tmp_path / "cache")
+
+    stage_report(metrics, "avaliação", cache, n_jobs=1)
+    assert not os.path.exists("reports/plots/roc_curves.png")
+    capsys.readouterr()
+
+    stage_report(metrics, "avaliação", cache, n_jobs=1)
+    assert "Relatórios em dia" in capsys.readouterr().out
+
+
+def test_resolve_models():
+    assert resolve_models(["xgb", "LightGBM (Tuned)"]) == {"XGBoost (Tuned)", "LightGBM (Tuned)"}
+    with pytest.raises(ValueError):
+        resolve_models(["svm"])
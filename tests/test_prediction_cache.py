@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import inference
+from src.prediction_cache import PredictionCache
+from tests.test_inference import TRANSACTION, random_transactions
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr("src.prediction_cache.time.monotonic", clock)
+    return clock
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = PredictionCache(max_size=2, ttl_seconds=60)
+    cache.put(b"a", 0.1)
+    cache.put(b"b", 0.2)
+    assert cache.get(b"a") == 0.1
+    cache.put(b"c", 0.3)
+
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") == 0.1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = PredictionCache(max_size=10, ttl_seconds=5)
+    cache.put(b"a", 0.1)
+    clock.now = 4.9
+    assert cache.get(b"a") == 0.1
+    clock.now = 5.0
+    assert cache.get(b"a") is None
+
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+@pytest.fixture
+def cached_assets():
+    inference.load_inference_assets(cache_size=1000, cache_ttl=60)
+    yield
+    inference.load_inference_assets()
+
+
+class CountingModel:
+    def __init__(self, model):
+        self.model = model
+        self.rows = 0
+
+    def predict_proba(self, X):
+        self.rows += len(X)
+        return self.model.predict_proba(X)
+
+
+def test_batch_scores_only_misses_in_order(cached_assets, monkeypatch):
+    rows = random_transactions(30, seed=3)
+    expected = inference.predict_records(rows)
+
+    bundle = inference.active_bundle()
+    counter = CountingModel(bundle.model)
+    monkeypatch.setattr(bundle, "model", counter)
+
+    fresh = random_transactions(10, seed=4)
+    mixed = rows[::2] + fresh + rows[1::2]
+    results = inference.predict_records(mixed)
+
+    assert counter.rows == 10
+    assert results[:15] == expected[::2]
+    assert results[25:] == expected[1::2]
+
+    X = pd.DataFrame(mixed)[inference.feature_order].to_numpy()
+    assert inference.predict_matrix(X) == results
+    assert inference.predict_single_transaction(fresh[0]) == results[15]
+    assert counter.rows == 10
+
+
+def test_single_path_uses_cache(cached_assets):
+    first = inference.predict_single_transaction(TRANSACTION)
+    second = inference.predict_single_transaction(TRANSACTION)
+
+    assert first == second
+    stats = inference.cache_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_reload_invalidates_only_on_change(cached_assets, monkeypatch):
+    inference.predict_single_transaction(TRANSACTION)
+    cache = inference.prediction_cache
+
+    inference.load_inference_assets(cache_size=1000, cache_ttl=60)
+    assert inference.prediction_cache is cache and len(cache) == 1
+
+    monkeypatch.setattr(inference, "_assets_fingerprint", lambda paths, fused, compiled: "novo modelo")
+    inference.load_inference_assets(cache_size=1000, cache_ttl=60)
+    assert inference.prediction_cache is not cache and len(inference.prediction_cache) == 0
+    assert inference.cache_stats()["invalidations"] == 1
+    assert inference.cache_stats()["misses"] == 1
+
+
+def test_fused_reload_invalidates(cached_assets):
+    inference.predict_single_transaction(TRANSACTION)
+    inference.load_inference_assets(fused=True, cache_size=1000, cache_ttl=60)
+    assert len(inference.prediction_cache) == 0
+
+
+def test_cache_disabled_by_default():
+    inference.load_inference_assets()
+    assert inference.prediction_cache is None
+    assert inference.cache_stats() is None
+    assert np.isfinite(inference.score_matrix(np.zeros((2, 30)))).all()
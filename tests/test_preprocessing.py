@@ -0,0 +1,227 @@
+import json
+import os
+import pickle
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.modeling import load_processed_data
+from src.pipeline import stage_preprocess
+from src.preprocessing import (
+    MANIFEST_FILE,
+    balance_training_data,
+    balancing_mode,
+    load_data,
+    preprocess_out_of_core,
+    preprocess_pipeline,
+)
+from src.tuning_scheduler import MappedArray, _open_array, share_array
+
+
+@pytest.fixture(scope="module")
+def raw_csv(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    n = 5000
+    df = pd.DataFrame({"Time": rng.uniform(0, 172800, n)})
+    for i in range(1, 29):
+        df[f"V{i}"] = rng.normal(0, 2, n)
+    df["Amount"] = rng.exponential(90, n)
+    df["Class"] = (rng.random(n) < 0.03).astype(int)
+    path = tmp_path_factory.mktemp("raw") / "creditcard.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture(scope="module")
+def processed(raw_csv, tmp_path_factory):
+    out = tmp_path_factory.mktemp("out")
+    shapes = preprocess_out_of_core(raw_csv, out / "processed", chunksize=700, models_dir=out / "models")
+    return out, shapes
+
+
+def test_outputs_are_float32_and_balanced(processed):
+    out, shapes = processed
+    X_train = np.load(out / "processed" / "X_train_bal.npy")
+    y_train = np.load(out / "processed" / "y_train_bal.npy")
+    X_test = np.load(out / "processed" / "X_test.npy")
+    y_test = np.load(out / "processed" / "y_test.npy")
+
+    assert X_train.dtype == X_test.dtype == np.float32
+    assert X_train.shape == shapes["X_train_bal"] and X_test.shape[1] == 30
+    assert np.bincount(y_train)[0] == np.bincount(y_train)[1]
+    assert len(y_test) == pytest.approx(1000, rel=0.1)
+    assert 0.01 < y_test.mean() < 0.06
+    assert np.isfinite(X_train).all()
+
+
+def test_incremental_scaler_matches_train_rows(raw_csv, processed):
+    out, shapes = processed
+    scaler = joblib.load(out / "models" / "scaler.pkl")
+    y_test = np.load(out / "processed" / "y_test.npy")
+    df = load_data(raw_csv)
+
+    n_train = len(df) - len(y_test)
+    assert scaler.n_samples_seen_ == n_train
+    # Linhas de treino reais (antes do SMOTE) saem com média ~0 e desvio ~1
+    X_train = np.load(out / "processed" / "X_train_bal.npy")[:n_train]
+    assert np.abs(X_train.mean(axis=0)).max() < 1e-3
+    assert np.abs(X_train.std(axis=0) - 1).max() < 1e-3
+    assert json.loads((out / "models" / "feature_order.json").read_text()) == df.columns[:-1].tolist()
+
+
+def test_split_is_reproducible(raw_csv, processed, tmp_path):
+    out, _ = processed
+    preprocess_out_of_core(raw_csv, tmp_path / "processed", chunksize=700, models_dir=tmp_path / "models")
+
+    for name in ("X_train_bal", "X_test", "y_test"):
+        np.testing.assert_array_equal(np.load(out / "processed" / f"{name}.npy"),
+                                      np.load(tmp_path / "processed" / f"{name}.npy"))
+
+
+def test_manifest_skips_unchanged_input(raw_csv, tmp_path, capsys):
+    kwargs = dict(chunksize=700, models_dir=tmp_path / "models")
+    shapes = preprocess_out_of_core(raw_csv, tmp_path / "processed", **kwargs)
+    manifest = json.loads((tmp_path / "processed" / MANIFEST_FILE).read_text())
+    assert manifest["arrays"]["X_test"] == {"dtype": "float32", "shape": list(shapes["X_test"])}
+
+    target = tmp_path / "processed" / "X_train_bal.npy"
+    mtime = os.stat(target).st_mtime_ns
+    capsys.readouterr()
+
+    assert preprocess_out_of_core(raw_csv, tmp_path / "processed", **kwargs) == shapes
+    assert "pulado" in capsys.readouterr().out
+    assert os.stat(target).st_mtime_ns == mtime
+
+    # force, parâmetros diferentes ou arquivo faltando refazem tudo
+    preprocess_out_of_core(raw_csv, tmp_path / "processed", force=True, **kwargs)
+    assert "pulado" not in capsys.readouterr().out
+    preprocess_out_of_core(raw_csv, tmp_path / "processed", chunksize=900, models_dir=tmp_path / "models")
+    assert "pulado" not in capsys.readouterr().out
+    os.remove(tmp_path / "models" / "scaler.pkl")
+    preprocess_out_of_core(raw_csv, tmp_path / "processed", chunksize=900, models_dir=tmp_path / "models")
+    assert "pulado" not in capsys.readouterr().out
+
+
+def test_stage_preprocess_keeps_manifest_mode(raw_csv, tmp_path, capsys):
+    base = tmp_path / "processed"
+    preprocess_out_of_core(raw_csv, base, chunksize=700, models_dir=tmp_path / "models")
+    target = base / "X_train_bal.npy"
+    mtime = os.stat(target).st_mtime_ns
+    capsys.readouterr()
+
+    # O treino não pode refazer em memória com os parâmetros padrão
+    stage_preprocess(raw_csv, base)
+    assert "pulado" in capsys.readouterr().out
+    assert os.stat(target).st_mtime_ns == mtime
+    assert np.load(target, mmap_mode="r").dtype == np.float32
+
+    # Com CSV novo, refaz no mesmo modo (out-of-core, float32)
+    csv = tmp_path / "creditcard.csv"
+    csv.write_bytes(raw_csv.read_bytes() + raw_csv.read_bytes().splitlines(keepends=True)[1])
+    stage_preprocess(csv, base)
+    manifest = json.loads((base / MANIFEST_FILE).read_text())
+    assert manifest["params"]["mode"] == "out_of_core" and manifest["params"]["chunksize"] == 700
+
+
+def test_stage_preprocess_keeps_weights_mode(raw_csv, tmp_path, capsys):
+    base = tmp_path / "processed"
+    shapes = preprocess_pipeline(raw_csv, base, tmp_path / "models", balancing="weights")
+    target = base / "X_train_bal.npy"
+    mtime = os.stat(target).st_mtime_ns
+    capsys.readouterr()
+
+    stage_preprocess(raw_csv, base)
+    assert "pulado" in capsys.readouterr().out
+    assert os.stat(target).st_mtime_ns == mtime
+    assert balancing_mode(base) == "weights"
+
+    # Trocar o balanceamento explicitamente refaz os dados
+    stage_preprocess(raw_csv, base, balancing="smote")
+    assert balancing_mode(base) == "smote"
+    assert np.load(target, mmap_mode="r").shape[0] > shapes["X_train_bal"][0]
+
+
+def test_manifest_detects_changed_input(raw_csv, tmp_path, capsys):
+    csv = tmp_path / "creditcard.csv"
+    csv.write_bytes(raw_csv.read_bytes())
+    kwargs = dict(base_path=tmp_path / "processed", models_dir=tmp_path / "models")
+    first = preprocess_pipeline(csv, **kwargs)
+
+    with open(csv, "a") as f:
+        f.write(open(raw_csv).read().splitlines()[1] + "\n")
+    capsys.readouterr()
+    second = preprocess_pipeline(csv, **kwargs)
+
+    assert "pulado" not in capsys.readouterr().out
+    assert second["X_test"] != first["X_test"] or second["X_train_bal"] != first["X_train_bal"]
+    assert preprocess_pipeline(csv, **kwargs) == second
+
+
+def test_mmap_loading_shares_file_pages(processed):
+    out, shapes = processed
+    X_train, y_train, X_test, y_test = load_processed_data(out / "processed", mmap_mode="r")
+
+    assert isinstance(X_train, np.memmap) and not X_train.flags.writeable
+    assert X_train.shape == shapes["X_train_bal"]
+
+    # Para os processos do tuning vai só a referência ao arquivo
+    shared = share_array(X_train)
+    assert isinstance(shared, MappedArray)
+    assert len(pickle.dumps(shared)) < 1000
+    np.testing.assert_array_equal(_open_array(pickle.loads(pickle.dumps(shared))), X_train)
+    # Fatias e arrays comuns seguem como estão
+    assert not isinstance(share_array(X_train[10:]), MappedArray)
+    assert not isinstance(share_array(np.asarray(y_test)), MappedArray)
+
+
+@pytest.fixture(scope="module")
+def imbalanced():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(20000, 5)).astype(np.float32)
+    y = (rng.random(20000) < 0.01).astype(np.int64)
+    X[y == 1] += 3
+    return X, y
+
+
+def test_parallel_smote_interpolates_minority(imbalanced):
+    X, y = imbalanced
+    X_ref, y_ref = balance_training_data(X, y, "smote")
+    X_bal, y_bal = balance_training_data(X, y, "smote_parallel", n_jobs=2)
+
+    assert X_bal.shape == X_ref.shape and X_bal.dtype == np.float32
+    np.testing.assert_array_equal(np.bincount(y_bal), np.bincount(y_ref))
+    np.testing.assert_array_equal(X_bal[:len(X)], X)
+    # Sintéticas ficam dentro da caixa da classe minoritária
+    minority, synthetic = X[y == 1], X_bal[len(X):]
+    assert (synthetic >= minority.min(axis=0) - 1e-5).all() and (synthetic <= minority.max(axis=0) + 1e-5).all()
+    # Os blocos têm tamanho fixo: o resultado não depende de n_jobs
+    np.testing.assert_array_equal(balance_training_data(X, y, "smote_parallel", n_jobs=1)[0], X_bal)
+
+
+def test_partial_ratio_and_weights_only(imbalanced):
+    X, y = imbalanced
+    n_major = int((y == 0).sum())
+
+    _, y_partial = balance_training_data(X, y, "smote", sampling_ratio=0.1)
+    assert (y_partial == 1).sum() == int(0.1 * n_major)
+    _, y_partial = balance_training_data(X, y, "smote_parallel", sampling_ratio=0.1)
+    assert (y_partial == 1).sum() == int(0.1 * n_major)
+
+    X_w, y_w = balance_training_data(X, y, "weights")
+    assert X_w is X and len(y_w) == len(y)
+    with pytest.raises(ValueError):
+        balance_training_data(X, y, "undersample")
+
+
+def test_out_of_core_weights_mode_has_no_synthetic_rows(raw_csv, processed, tmp_path):
+    _, smote_shapes = processed
+    shapes = preprocess_out_of_core(raw_csv, tmp_path / "processed", chunksize=700,
+                                    models_dir=tmp_path / "models", balancing="weights")
+
+    y_train = np.load(tmp_path / "processed" / "y_train_bal.npy")
+    assert shapes["X_test"] == smote_shapes["X_test"]
+    assert shapes["X_train_bal"][0] < smote_shapes["X_train_bal"][0]
+    assert 0.01 < y_train.mean() < 0.06
+    assert balancing_mode(tmp_path / "processed") == "weights"
@@ -0,0 +1,127 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import reporting
+from src.evaluation import evaluate_scores
+from src.reporting import (
+    curve_figures,
+    generate_pdf_report,
+    metric_figures,
+    render_figures,
+    save_metrics_table,
+)
+
+
+@pytest.fixture(autouse=True)
+def report_cache(tmp_path, monkeypatch):
+    # Chaves do relatório fora de models/cache do repositório
+    monkeypatch.setattr(reporting, "REPORT_CACHE_DIR", str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def metrics_df():
+    return pd.DataFrame({
+        "model": ["Logistic Regression (Tuned)", "XGBoost (Tuned)"],
+        "roc_auc": [0.95, 0.98],
+        "recall": [0.80, 0.85],
+        "precision": [0.10, 0.60],
+        "average_precision": [0.50, 0.80],
+    })
+
+
+@pytest.fixture
+def rendered(monkeypatch):
+    calls = []
+    original = reporting._render_figure
+
+    def spy(kind, payload, path):
+        calls.append(os.path.basename(path))
+        return original(kind, payload, path)
+
+    monkeypatch.setattr(reporting, "_render_figure", spy)
+    return calls
+
+
+def test_figures_skip_unchanged_and_rerender_changed(tmp_path, metrics_df, rendered):
+    render_figures(metric_figures(metrics_df), str(tmp_path / "plots"), n_jobs=1)
+    assert sorted(rendered) == ["precision_comparison.png", "recall_comparison.png", "roc_auc_comparison.png"]
+
+    rendered.clear()
+    render_figures(metric_figures(metrics_df), str(tmp_path / "plots"), n_jobs=1)
+    assert rendered == []
+
+    metrics_df.loc[1, "recall"] = 0.9
+    render_figures(metric_figures(metrics_df), str(tmp_path / "plots"), n_jobs=1)
+    assert rendered == ["recall_comparison.png"]
+    # Nenhum arquivo de controle junto das figuras (as chaves ficam no cache)
+    assert sorted(os.listdir(tmp_path / "plots")) == sorted(
+        ["precision_comparison.png", "recall_comparison.png", "roc_auc_comparison.png"])
+
+
+def test_parallel_render_writes_all_figures(tmp_path, metrics_df):
+    rng = np.random.default_rng(0)
+    y = (rng.random(500) < 0.1).astype(int)
+    results = {"A": evaluate_scores(y, rng.random(500) + 0.5 * y)}
+
+    paths = render_figures(metric_figures(metrics_df) + curve_figures(results), str(tmp_path), n_jobs=2)
+
+    assert len(paths) == 5
+    assert all(os.path.getsize(path) > 0 for path in paths)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_metrics_table_formats(tmp_path, metrics_df, fmt):
+    base = str(tmp_path / "model_metrics")
+    [path] = save_metrics_table(metrics_df, base, formats=(fmt,))
+
+    read = pd.read_csv if fmt == "csv" else pd.read_parquet
+    pd.testing.assert_frame_equal(read(path), metrics_df)
+    assert not os.path.exists(f"{base}.xlsx")
+
+    mtime = os.stat(path).st_mtime_ns
+    save_metrics_table(metrics_df, base, formats=(fmt,))
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_unknown_table_format(tmp_path, metrics_df):
+    with pytest.raises(ValueError):
+        save_metrics_table(metrics_df, str(tmp_path / "m"), formats=("json",))
+
+
+def test_pdf_skipped_when_inputs_unchanged(tmp_path, metrics_df):
+    output = str(tmp_path / "report.pdf")
+    figures_dir = str(tmp_path / "plots")
+    render_figures(metric_figures(metrics_df), figures_dir, n_jobs=1)
+
+    generate_pdf_report(metrics_df, figures_dir=figures_dir, output_path=output)
+    mtime = os.stat(output).st_mtime_ns
+    generate_pdf_report(metrics_df, figures_dir=figures_dir, output_path=output)
+    assert os.stat(output).st_mtime_ns == mtime
+
+    generate_pdf_report(metrics_df, model_name="XGBoost (Tuned)", figures_dir=figures_dir, output_path=output)
+    assert os.stat(output).st_mtime_ns != mtime
+
+
+def test_footer_shows_build_time():
+    class Canvas:
+        def __init__(self):
+            self.texts = []
+
+        def drawString(self, x, y, text):
+            self.texts.append(text)
+
+        drawRightString = drawCentredString = drawString
+
+        def __getattr__(self, name):
+            return lambda *args, **kwargs: None
+
+    class Doc:
+        build_seconds = 1.234
+        page = 1
+
+    canvas = Canvas()
+    reporting._footer(canvas, Doc())
+    assert any("montado em 1.23s" in text for text in canvas.texts)
@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from src import inference
+from src.shared_model import LinearModel, export_shared_model, is_fresh, load_shared_model
+from tests.test_fusion import make_data
+from tests.test_inference import random_transactions
+
+
+@pytest.fixture(scope="module")
+def linear_files(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("linear")
+    _, X, y, scaler = make_data(n=2000)
+    model = LogisticRegression(max_iter=1000).fit(X, y)
+    joblib.dump(model, folder / "model.pkl")
+    joblib.dump(scaler, folder / "scaler.pkl")
+    X_raw = make_data(n=500, seed=1)[0]
+    return folder, model, scaler, X_raw
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_linear_export_is_mapped_and_matches(linear_files, fused):
+    folder, model, scaler, X_raw = linear_files
+    output = str(folder / f"shared-{fused}")
+    export_shared_model(str(folder / "model.pkl"), str(folder / "scaler.pkl"), output, fused=fused)
+
+    shared, shared_scaler = load_shared_model(output)
+    assert isinstance(shared, LinearModel)
+    assert isinstance(shared.coef.base, np.memmap) and not shared.coef.flags.writeable
+
+    X = X_raw if fused else shared_scaler.transform(X_raw)
+    np.testing.assert_allclose(shared.predict_proba(X), model.predict_proba(scaler.transform(X_raw)), atol=1e-9)
+    model_path, scaler_path = str(folder / "model.pkl"), str(folder / "scaler.pkl")
+    assert is_fresh(output, model_path, scaler_path, fused)
+    assert not is_fresh(output, model_path, scaler_path, not fused)
+
+
+def test_export_is_stale_when_scaler_changes(linear_files, tmp_path):
+    folder, _, scaler, _ = linear_files
+    model_path, scaler_path = str(folder / "model.pkl"), str(tmp_path / "scaler.pkl")
+    joblib.dump(scaler, scaler_path)
+    output = str(tmp_path / "shared")
+    export_shared_model(model_path, scaler_path, output)
+    assert is_fresh(output, model_path, scaler_path, False)
+
+    # Novo pré-processamento: scaler regravado, modelo igual
+    changed = StandardScaler().fit(make_data(n=300, seed=3)[0])
+    joblib.dump(changed, scaler_path)
+    os.utime(scaler_path, ns=(os.stat(scaler_path).st_atime_ns, os.stat(scaler_path).st_mtime_ns + 10**9))
+    assert not is_fresh(output, model_path, scaler_path, False)
+
+    export_shared_model(model_path, scaler_path, output)
+    _, shared_scaler = load_shared_model(output)
+    np.testing.assert_allclose(shared_scaler.mean_, changed.mean_)
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_shared_inference_matches_pickle(fused):
+    rows = random_transactions(100)
+    inference.load_inference_assets()
+    expected = [r["fraud_probability"] for r in inference.predict_records(rows)]
+
+    inference.load_inference_assets(shared=True, fused=fused)
+    try:
+        assert isinstance(inference.model_final.threshold.base, np.memmap)
+        got = [r["fraud_probability"] for r in inference.predict_records(rows)]
+        single = inference.predict_single_transaction(rows[0])["fraud_probability"]
+    finally:
+        inference.load_inference_assets()
+
+    np.testing.assert_allclose(got, expected, atol=1e-6)
+    assert single == pytest.approx(expected[0], abs=1e-6)
+
+
+def test_shared_load_skips_model_libraries():
+    inference.build_bundle(shared=True)
+
+    code = (
+        "import sys; from src import inference; inference.load_inference_assets(shared=True); "
+        "print('HEAVY=' + ','.join(m for m in ('sklearn', 'joblib', 'xgboost', 'lightgbm') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == "HEAVY="
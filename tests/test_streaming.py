@@ -0,0 +1,157 @@
+import asyncio
+import json
+import socket
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import app as api_app
+from api import settings
+from api.client import FraudClient
+from api.streaming import StreamLineError, iter_ndjson_chunks
+from src import inference
+from tests.test_inference import random_transactions
+
+
+async def collect_chunks(pieces, chunk_size, **kwargs):
+    async def stream():
+        for piece in pieces:
+            yield piece
+
+    return [chunk async for chunk in iter_ndjson_chunks(stream(), chunk_size, **kwargs)]
+
+
+def test_chunks_split_across_pieces():
+    body = b'{"a": 1}\n\n{"a": 2}\n{"a": 3}\n{"a": 4}'
+    pieces = [body[i:i + 3] for i in range(0, len(body), 3)]
+
+    chunks = asyncio.run(collect_chunks(pieces, 2))
+
+    assert chunks == [
+        [(1, b'{"a": 1}'), (3, b'{"a": 2}')],
+        [(4, b'{"a": 3}'), (5, b'{"a": 4}')],
+    ]
+
+
+def test_line_longer_than_limit_is_rejected():
+    # Sem quebra de linha: o pendente não pode crescer sem limite
+    pieces = [b'{"a": 1}\n'] + [b"x" * 100] * 50
+
+    with pytest.raises(StreamLineError) as error:
+        asyncio.run(collect_chunks(pieces, 10, max_line_bytes=1000))
+    assert error.value.line_number == 2
+
+    # No limite exato ainda passa, inclusive dividida em vários pedaços
+    line = b"y" * 1000
+    chunks = asyncio.run(collect_chunks([line[:300], line[300:], b"\n"], 10, max_line_bytes=1000))
+    assert chunks == [[(1, line)]]
+
+
+def ndjson(rows):
+    return "".join(json.dumps(row) + "\n" for row in rows).encode()
+
+
+@pytest.fixture(scope="module")
+def rows():
+    rows = random_transactions(23)
+    inference.load_inference_assets()
+    return rows, inference.predict_records(rows)
+
+
+def test_predict_stream_endpoint(rows):
+    rows, expected = rows
+
+    with TestClient(api_app.app) as client:
+        response = client.post("/predict-stream?chunk_size=5", content=ndjson(rows),
+                               headers={"Content-Type": "application/x-ndjson"})
+        results = [json.loads(line) for line in response.iter_lines() if line]
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert results == expected
+
+
+def test_predict_stream_reports_bad_line(rows):
+    rows, expected = rows
+    body = ndjson(rows[:3]) + b"not json\n" + ndjson(rows[3:6])
+
+    with TestClient(api_app.app) as client:
+        response = client.post("/predict-stream?chunk_size=2", content=body)
+        results = [json.loads(line) for line in response.iter_lines() if line]
+        bad_chunk = client.post("/predict-stream?chunk_size=0", content=body)
+
+    assert results[:2] == expected[:2]
+    assert results[-1]["line"] == 4
+    assert "error" in results[-1]
+    assert bad_chunk.status_code == 422
+
+
+def test_client_streams_upload_and_results(live_server, rows):
+    rows, expected = rows
+    client = FraudClient(live_server)
+
+    results = list(client.predict_stream(iter(rows), chunk_size=4, lines_per_write=3))
+
+    assert results == expected
+
+
+def test_client_large_stream_does_not_deadlock(live_server):
+    client = FraudClient(live_server)
+    template = random_transactions(1)[0]
+
+    def transactions(n):
+        for i in range(n):
+            yield {**template, "Time": float(i)}
+
+    count = sum(1 for _ in client.predict_stream(transactions(60000), chunk_size=5000))
+    assert count == 60000
+
+
+@pytest.mark.parametrize("value, message", [("abc", "não numérico"), (None, "nulos"), ([1, 2], "não numérico")])
+def test_predict_stream_rejects_invalid_values(rows, value, message):
+    rows, expected = rows
+    bad = dict(rows[4], V3=value)
+    body = ndjson(rows[:4]) + ndjson([bad]) + ndjson(rows[5:8])
+
+    with TestClient(api_app.app) as client:
+        response = client.post("/predict-stream?chunk_size=3", content=body)
+        results = [json.loads(line) for line in response.iter_lines() if line]
+
+    # Primeiro bloco (linhas 1-3) pontuado; o erro aponta a linha 5, não o início do bloco
+    assert response.status_code == 200
+    assert results[:3] == expected[:3]
+    assert results[-1]["line"] == 5
+    assert message in results[-1]["error"]
+
+
+def test_client_stream_error(live_server):
+    client = FraudClient(live_server)
+    with pytest.raises(Exception, match="feature ausente"):
+        list(client.predict_stream([{"Time": 1.0}]))
+
+
+def test_predict_stream_rejects_oversized_line(rows, monkeypatch):
+    monkeypatch.setattr(settings, "STREAM_MAX_LINE_BYTES", 2048)
+    rows, expected = rows
+    body = ndjson(rows[:2]) + b'{"Time": "' + b"9" * 5000 + b'"}\n' + ndjson(rows[2:4])
+
+    with TestClient(api_app.app) as client:
+        response = client.post("/predict-stream?chunk_size=2", content=body)
+        results = [json.loads(line) for line in response.iter_lines() if line]
+
+    assert results[:2] == expected[:2]
+    assert results[-1]["line"] == 3 and "bytes" in results[-1]["error"]
+
+
+def test_client_stream_times_out_on_stalled_server():
+    # Aceita a conexão e nunca responde
+    with socket.socket() as server:
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        client = FraudClient(f"http://127.0.0.1:{server.getsockname()[1]}", timeout=(1, 0.5))
+
+        start = time.monotonic()
+        with pytest.raises(OSError):
+            list(client.predict_stream([{"Time": 1.0}]))
+        assert time.monotonic() - start < 5
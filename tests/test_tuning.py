@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+from lightgbm import LGBMClassifier
+from xgboost import XGBClassifier
+
+from src import tuning
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+
+    def make(n):
+        X = rng.normal(size=(n, 8))
+        y = (X[:, 0] + 0.5 * X[:, 1] + rng.normal(size=n) > 1.5).astype(int)
+        return X, y
+
+    X_train, y_train = make(20000)
+    X_test, y_test = make(2000)
+    return X_train, y_train, X_test, y_test
+
+
+RESULT_KEYS = {"best_params", "best_cv_score", "final_metrics", "best_model"}
+
+
+@pytest.mark.parametrize("tune_fn, model_type", [
+    (tuning.tune_XGboost, XGBClassifier),
+    (tuning.tune_LightGBM, LGBMClassifier),
+])
+def test_halving_with_early_stopping_returns_plain_booster(data, tune_fn, model_type):
+    result = tune_fn(*data, search="halving")
+
+    assert set(result) == RESULT_KEYS
+    assert type(result["best_model"]) is model_type
+    assert not any(k.startswith("estimator__") for k in result["best_params"])
+    # O teto do grid é 300 árvores; o early stopping decide quantas ficam
+    assert 1 <= result["best_params"]["n_estimators"] <= 300
+    assert result["final_metrics"]["roc_auc"] > 0.8
+
+
+def test_gradient_boosting_uses_native_early_stopping(data):
+    result = tuning.tune_gradient_boosting(*data, early_stopping=True)
+
+    model = result["best_model"]
+    assert model.n_iter_no_change == tuning.EARLY_STOPPING_ROUNDS
+    assert result["best_params"]["n_estimators"] == model.n_estimators_ <= 200
+
+
+def test_random_forest_halving_over_trees(data):
+    result = tuning.tune_random_forest(*data, search="halving")
+
+    # Rodadas com 3x mais árvores; a última chega perto do teto de 200
+    assert 150 <= result["best_model"].n_estimators <= 200
+    assert result["final_metrics"]["roc_auc"] > 0.8
+
+
+def test_random_search_keeps_original_behaviour(data):
+    result = tuning.tune_logistic_regression(*data)
+
+    assert set(result) == RESULT_KEYS
+    assert set(result["best_params"]) == {"C", "penalty", "solver"}
+
+
+def test_unknown_search_mode(data):
+    with pytest.raises(ValueError):
+        tuning.tune_logistic_regression(*data, search="grid")
+
+
+@pytest.mark.parametrize("tune_fn", [tuning.tune_XGboost, tuning.tune_LightGBM])
+def test_reused_datasets_match_randomized_search(data, tune_fn):
+    reused = tune_fn(*data)
+    original = tune_fn(*data, reuse_datasets=False)
+
+    assert reused["best_params"] == original["best_params"]
+    assert reused["best_cv_score"] == pytest.approx(original["best_cv_score"])
+    assert type(reused["best_model"]) is type(original["best_model"])
+
+
+def test_one_dataset_per_fold_shared_by_candidates(data):
+    from src.native_search import native_random_search
+
+    X, y = data[0][:4000], data[1][:4000]
+    grid = {"learning_rate": [0.05, 0.1, 0.2], "max_depth": [2, 3]}
+    _, _, model, builds = native_random_search(
+        XGBClassifier(tree_method="hist", n_estimators=20), grid, X, y, n_iter=4, cv=2, n_jobs=2, verbose=0
+    )
+
+    assert builds == 2
+    assert model.n_estimators == 20
+
+
+def test_subsample_reaches_appended_rows():
+    X = np.arange(1000).reshape(-1, 1)
+    X_small, y_small = tuning.subsample_data(X, np.arange(1000))
+
+    assert len(X_small) == 100 and (np.diff(X_small[:, 0]) > 0).all()
+    # Linhas do fim (onde o SMOTE põe as sintéticas) também entram
+    assert X_small.max() >= 500
+
+
+@pytest.mark.parametrize("tune_fn, expected", [
+    (tuning.tune_logistic_regression, {"class_weight": "balanced"}),
+    (tuning.tune_gradient_boosting, {}),
+    (tuning.tune_LightGBM, {"class_weight": "balanced"}),
+])
+def test_class_weight_balanced(data, tune_fn, expected):
+    result = tune_fn(*data, class_weight="balanced")
+    model = result["best_model"]
+
+    assert model.get_params().items() >= expected.items()
+    # Pesos compensam as ~5% de positivas: mais recall que sem pesos
+    assert result["final_metrics"]["recall"] >= tune_fn(*data)["final_metrics"]["recall"]
+
+
+def test_xgboost_weighting_matches_randomized_search(data):
+    reused = tuning.tune_XGboost(*data, class_weight="balanced")
+    original = tuning.tune_XGboost(*data, class_weight="balanced", reuse_datasets=False)
+
+    assert reused["best_model"].scale_pos_weight > 1
+    assert reused["best_cv_score"] == pytest.approx(original["best_cv_score"])
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from src import tuning
+from src.tuning_scheduler import DEFAULT_JOBS, TuningJob, plan_cores, run_tuning, split_cores
+
+
+@pytest.mark.parametrize("cores", [1, 2, 5, 12, 32, 64])
+def test_plan_never_oversubscribes(cores):
+    plan = plan_cores(DEFAULT_JOBS, cores)
+    n_fits = tuning.N_ITER * tuning.CV_FOLDS
+
+    for used, search_jobs, threads in plan.values():
+        assert used == search_jobs * threads <= cores
+        assert search_jobs <= n_fits
+    if cores >= len(DEFAULT_JOBS):
+        assert sum(used for used, _, _ in plan.values()) <= cores
+
+
+def test_split_prefers_search_parallelism():
+    assert split_cores(12, n_fits=10, threaded=True) == (6, 2)
+    assert split_cores(8, n_fits=10, threaded=True) == (8, 1)
+    assert split_cores(40, n_fits=10, threaded=True) == (10, 4)
+    assert split_cores(40, n_fits=10, threaded=False) == (10, 1)
+
+
+def test_plan_gives_costly_models_more_cores():
+    plan = plan_cores(DEFAULT_JOBS, 32)
+    assert plan["Random Forest (Tuned)"][0] > plan["Logistic Regression (Tuned)"][0]
+
+
+def test_run_tuning_reports_each_model():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 5))
+    y = (X[:, 0] + rng.normal(scale=0.5, size=2000) > 1.5).astype(int)
+    jobs = [
+        TuningJob("Logistic Regression (Tuned)", tuning.tune_logistic_regression, cost=1, threaded=False),
+        TuningJob("LightGBM (Tuned)", tuning.tune_LightGBM, cost=2, threaded=True),
+    ]
+
+    results, report = run_tuning(X[:1500], y[:1500], X[1500:], y[1500:], n_cores=2, jobs=jobs)
+
+    assert list(results) == [job.name for job in jobs]
+    for name, result in results.items():
+        assert {"best_params", "best_cv_score", "final_metrics", "best_model"} <= set(result)
+        assert report[name]["wall_s"] > 0 and report[name]["cpu_s"] > 0
+    assert report["_total"]["cores"] == 2
@@ -1,81 +1,73 @@
-import joblib
-import shutil
-from src.reporting import generate_pdf_report
-from src.tuning import (
-    tune_logistic_regression,
-    tune_random_forest,
-    tune_gradient_boosting,
-    tune_XGboost,
-    tune_LightGBM
+import argparse
+import os
+from src.model_registry import publish_version
+from src.pipeline import (
+    ArtifactCache,
+    resolve_models,
+    stage_preprocess,
+    stage_tune,
+    stage_save_models,
+    stage_evaluate,
+    stage_select,
+    stage_report
 )
-from src.modeling import (
-    load_processed_data,
-    save_model,
-    build_metrics_dataframe,
-    plot_model_metrics,
-    select_best_model
-)
-
-
-def main():
-    # Carregar dados processados
-    print("📂 Carregando dados processados...")
-    X_train, y_train, X_test, y_test = load_processed_data()
-
-    # Tuning dos modelos (opcional)
+from src.tuning_scheduler import DEFAULT_JOBS, print_tuning_report
+from src.modeling import load_processed_data, metrics_dataframe
+from src.preprocessing import BALANCING_MODES, balancing_mode
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Treino em estágios com cache (só refaz o que mudou)")
+    parser.add_argument("--force", action="store_true",
+                        help="Refaz todos os estágios (com --only: só os modelos listados)")
+    parser.add_argument("--only", nargs="+", metavar="MODELO",
+                        help="Retuna só estes modelos (lr, rf, gb, xgb, lgbm ou nome completo)")
+    parser.add_argument("--balancing", choices=BALANCING_MODES,
+                        help="Balanceamento do treino (padrão: o do manifesto dos dados processados)")
+    parser.add_argument("--sampling-ratio", type=float,
+                        help="Razão minoritária/majoritária após o SMOTE (padrão: a do manifesto)")
+    args = parser.parse_args(argv)
+
+    try:
+        only = resolve_models(args.only or [])
+    except ValueError as e:
+        parser.error(str(e))
+
+    cache = ArtifactCache()
+    force_all = args.force and not only
+    if force_all:
+        # Sem --only, --force refaz também os arquivos gerados e o modelo final
+        cache.invalidate_outputs()
+
+    # Pré-processamento (pulado se o manifesto mostra entrada e parâmetros iguais)
+    print("📂 Preparando dados processados...")
+    data_fp = stage_preprocess(force=force_all, balancing=args.balancing, sampling_ratio=args.sampling_ratio)
+    # Mapeados do disco: os processos do tuning compartilham as páginas
+    X_train, y_train, X_test, y_test = load_processed_data(mmap_mode="r")
+
+    # Tuning dos modelos em paralelo (FRAUD_TUNING_CORES limita os núcleos; padrão: todos)
+    # FRAUD_TUNING_SEARCH=halving usa successive halving + early stopping (src/tuning.py)
     print("\n⚙️ Iniciando tuning de hiperparâmetros...")
-
-    # 1) Logistic Regression
-    lr_tuned = tune_logistic_regression(X_train, y_train, X_test, y_test)
-    print("✔ Logistic Regression tunado.")
-
-    # 2) Random Forest
-    rf_tuned = tune_random_forest(X_train, y_train, X_test, y_test)
-    print("✔ Random Forest tunado.")
-
-    # 3) Gradient Boosting
-    gb_tuned = tune_gradient_boosting(X_train, y_train, X_test, y_test)
-    print("✔ Gradient Boosting tunado.")
-
-    # 4) XGBoost
-    xgb_tuned = tune_XGboost(X_train, y_train, X_test, y_test)
-    print("✔ XGBoost tunado.")
-
-    # 5) LightGBM
-    lgbm_tuned = tune_LightGBM(X_train, y_train, X_test, y_test)
-    print("✔ LightGBM tunado.")
+    n_cores = int(os.getenv("FRAUD_TUNING_CORES", 0)) or None
+    search = os.getenv("FRAUD_TUNING_SEARCH", "random")
+    # Dados sem SMOTE (balancing="weights"): os modelos compensam com pesos de classe
+    class_weight = "balanced" if balancing_mode() == "weights" else None
+    rebuild = only or ({job.name for job in DEFAULT_JOBS} if force_all else set())
+    tuned, tune_keys, tuning_report = stage_tune((X_train, y_train, X_test, y_test), data_fp, cache,
+                                                 rebuild=rebuild, n_cores=n_cores, search=search,
+                                                 class_weight=class_weight)
+    if tuning_report:
+        print_tuning_report(tuning_report)
     print("✔ Tuning de hiperparâmetros concluído.")
 
-    # Avaliação dos modelos
-    print("\n📊 Avaliando modelos...")
-
-    
-    lr_tuned_metrics = lr_tuned['final_metrics']
-    rf_tuned_metrics = rf_tuned['final_metrics']
-    gb_tuned_metrics = gb_tuned['final_metrics']
-    xgb_tuned_metrics = xgb_tuned['final_metrics']
-    lgbm_tuned_metrics = lgbm_tuned['final_metrics']
-
-
-    results_tuned = {
-    "Logistic Regression (Tuned)": lr_tuned_metrics,
-    "Random Forest (Tuned)": rf_tuned_metrics,
-    "Gradient Boosting (Tuned)": gb_tuned_metrics,
-    "XGBoost (Tuned)": xgb_tuned_metrics,
-    "LightGBM (Tuned)": lgbm_tuned_metrics
-    }
-
-    # Salvar modelos
+    # Salvar modelos (só os que mudaram)
     print("\n💾 Salvando modelos...")
-    save_model(lr_tuned['best_model'], "models/logistic_regression_tuned.pkl")
-    save_model(rf_tuned['best_model'], "models/random_forest_tuned.pkl")
-    save_model(gb_tuned['best_model'], "models/gradient_boosting_tuned.pkl")
-    save_model(xgb_tuned['best_model'], "models/xgboost_tuned.pkl")
-    save_model(lgbm_tuned['best_model'], "models/lightgbm_tuned.pkl")
-    
-
-    print("\n✔ Todos os modelos foram treinados e salvos com sucesso em /models/")
+    stage_save_models(tuned, tune_keys, cache, rebuild=rebuild)
+    print("\n✔ Todos os modelos estão em /models/")
 
+    # Avaliação dos modelos
+    print("\n📊 Avaliando modelos...")
+    results_tuned, evaluate_key = stage_evaluate(tuned, tune_keys)
 
     def print_model_comparison(results):
         print("\n📊 Comparação de Modelos:")
@@ -86,27 +78,28 @@ def main():
 
     print_model_comparison(results_tuned)
 
-    # Construir DataFrame de métricas
-    df_tuned = build_metrics_dataframe(results_tuned)
-    plot_model_metrics(df_tuned)
-
-    # Gerar relatórios PDF
-    generate_pdf_report(df_tuned)
+    # Tabela de métricas, gráficos e PDF (só se as métricas mudaram)
+    # FRAUD_REPORT_FORMATS: xlsx, csv e/ou parquet separados por vírgula (padrão: xlsx)
+    # FRAUD_REPORT_JOBS: processos para as figuras (padrão: todos os núcleos)
+    report_formats = tuple(fmt.strip() for fmt in os.getenv("FRAUD_REPORT_FORMATS", "xlsx").split(",") if fmt.strip())
+    report_jobs = int(os.getenv("FRAUD_REPORT_JOBS", 0)) or None
+    stage_report(results_tuned, evaluate_key, cache, formats=report_formats, n_jobs=report_jobs)
 
     # Mostrar o melhor modelo
-    best_model_info = select_best_model(df_tuned)
+    best_model_info, changed = stage_select(metrics_dataframe(results_tuned), tune_keys, cache,
+                                             rebuild=rebuild)
     print("\n🏆 Melhor modelo selecionado:")
     print(best_model_info)
 
-    # Copiar modelo vencedor para modelo_final.pkl
-    shutil.copy(
-        best_model_info["best_model_path"],
-        "models/modelo_final.pkl"
-    )
-
-    print("✅ Modelo final salvo em models/modelo_final.pkl")
+    # Nova versão imutável no registro (a API carrega com POST /admin/reload)
+    if changed:
+        publish_version(metadata={
+            "model_name": best_model_info["best_model_name"],
+            "composite_score": float(best_model_info["best_model_score"]),
+            "metrics": {k: float(v) for k, v in results_tuned[best_model_info["best_model_name"]].items()
+                        if isinstance(v, (int, float))}
+        })
 
-        
 
 if __name__ == "__main__":
     main()